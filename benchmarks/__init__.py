@@ -0,0 +1,13 @@
+"""Performance benchmarks of neurogym.
+
+Run the suite and save the results as JSON:
+
+    python -m benchmarks run -o results.json
+
+and compare two result files, e.g. of two commits:
+
+    python -m benchmarks compare base.json results.json
+
+Benchmarks are registered in benchmarks.suite with the `benchmark` decorator
+of benchmarks.runner.
+"""
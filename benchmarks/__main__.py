@@ -0,0 +1,44 @@
+"""Command line interface of the benchmarks, see benchmarks/__init__.py."""
+
+import argparse
+import sys
+
+from benchmarks import runner
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks of neurogym.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run benchmarks and save the results as JSON")
+    run.add_argument("patterns", nargs="*", help="glob patterns of the benchmarks to run, e.g. 'step[*]', default all")
+    run.add_argument("-o", "--output", help="JSON file of the results")
+    run.add_argument("--min-time", type=float, default=0.05, help="minimum duration of a repeat in seconds")
+    run.add_argument("--repeat", type=int, default=5, help="number of repeats")
+    run.add_argument("--list", action="store_true", help="list the benchmarks instead of running them")
+
+    compare = commands.add_parser("compare", help="compare two JSON result files")
+    compare.add_argument("base", help="JSON results of the reference run")
+    compare.add_argument("new", help="JSON results of the run to check")
+    compare.add_argument("--threshold", type=float, default=1.1, help="time ratio reported as a change")
+    compare.add_argument("--stat", choices=["min", "median"], default="min", help="statistic compared")
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        rows = runner.compare(runner.load(args.base), runner.load(args.new), args.threshold, args.stat)
+        runner.print_comparison(rows)
+        return int(any(status in ("slower", "error") for *_, status in rows))
+
+    from benchmarks import suite  # noqa: F401, PLC0415 - registers the benchmarks
+
+    if args.list:
+        print("\n".join(runner.BENCHMARKS))
+        return 0
+    results = runner.run(args.patterns, min_time=args.min_time, repeat=args.repeat)
+    if args.output:
+        runner.save(results, args.output)
+    return int(any("error" in result for result in results["benchmarks"].values()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
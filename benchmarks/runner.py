@@ -0,0 +1,196 @@
+"""Registry, timer and result files of the benchmarks."""
+
+import fnmatch
+import functools
+import gc
+import json
+import math
+import platform
+import statistics
+import subprocess
+import time
+import traceback
+from datetime import datetime, timezone
+from pathlib import Path
+
+BENCHMARKS: dict = {}
+
+
+def benchmark(name, params=None, self_timed=False):
+    """Register a benchmark.
+
+    The decorated function does the setup and returns a function that runs one
+    unit of work, e.g. one step.
+
+    Args:
+        name: str, name of the benchmark
+        params: list of parameters passed to the decorated function, one
+            benchmark named name[param] is registered for each
+        self_timed: bool, if True, the unit of work times itself and returns
+            its duration in seconds, e.g. to leave out its setup
+    """
+
+    def decorator(setup):
+        if params is None:
+            BENCHMARKS[name] = (setup, self_timed)
+        else:
+            for param in params:
+                BENCHMARKS[f"{name}[{param}]"] = (functools.partial(setup, param), self_timed)
+        return setup
+
+    return decorator
+
+
+def _time(fn, number, self_timed=False):
+    """Total duration of number calls of fn, with the garbage collector disabled."""
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        if self_timed:
+            return sum(fn() for _ in range(number))
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        return time.perf_counter() - start
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def measure(fn, min_time=0.05, repeat=5, self_timed=False):
+    """Time a function.
+
+    The number of calls per repeat is chosen so that each repeat lasts at least
+    min_time seconds. If self_timed, fn returns its own duration.
+
+    Returns:
+        stats: dict of the min, median, mean and stdev of the duration of one
+            call in seconds, and the number of calls and repeats
+    """
+    fn()  # warm up
+    number = 1
+    while (duration := _time(fn, number, self_timed)) < min_time:
+        # At most 10 times more calls at once, in case fn has amortized costs, e.g. refilling a cache
+        estimate = math.ceil(1.2 * number * min_time / duration) if duration > 0 else 10 * number
+        number = min(10 * number, max(2 * number, estimate))
+    times = [_time(fn, number, self_timed) / number for _ in range(repeat)]
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "stdev": statistics.stdev(times) if repeat > 1 else 0.0,
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def _git_commit():
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"],  # noqa: S607
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def _metadata():
+    import gymnasium as gym  # noqa: PLC0415
+    import numpy as np  # noqa: PLC0415
+
+    from neurogym.version import VERSION  # noqa: PLC0415
+
+    return {
+        "date": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "neurogym": VERSION,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "gymnasium": gym.__version__,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+    }
+
+
+def format_time(seconds):
+    for unit, scale in [("s", 1), ("ms", 1e-3), ("us", 1e-6)]:
+        if seconds >= scale:
+            return f"{seconds / scale:.3f}{unit}"
+    return f"{seconds / 1e-9:.1f}ns"
+
+
+def _selected(name, patterns):
+    # Names contain brackets, which are character sets in glob patterns
+    return not patterns or name in patterns or any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+
+
+def run(patterns=None, min_time=0.05, repeat=5, verbose=True):
+    """Run the benchmarks named or matching any of the glob patterns, default all.
+
+    A benchmark that raises is reported with its error instead of its timings,
+    the other benchmarks still run.
+
+    Returns:
+        results: dict with 'meta', the run metadata, and 'benchmarks', the
+            stats of measure or {'error': traceback} of each benchmark
+    """
+    results: dict = {}
+    for name, (setup, self_timed) in BENCHMARKS.items():
+        if not _selected(name, patterns):
+            continue
+        try:
+            results[name] = measure(setup(), min_time=min_time, repeat=repeat, self_timed=self_timed)
+            line = format_time(results[name]["min"])
+        except Exception:  # noqa: BLE001 - the error is recorded in the results
+            results[name] = {"error": traceback.format_exc()}
+            line = "ERROR " + results[name]["error"].strip().splitlines()[-1]
+        if verbose:
+            print(f"{name:60s} {line}")
+    return {"meta": _metadata(), "benchmarks": results}
+
+
+def save(results, path) -> None:
+    Path(path).write_text(json.dumps(results, indent=2) + "\n")
+
+
+def load(path):
+    return json.loads(Path(path).read_text())
+
+
+def compare(base, new, threshold=1.1, stat="min"):
+    """Compare the results of two runs.
+
+    Args:
+        base: dict, results of the reference run
+        new: dict, results of the run to check
+        threshold: float, ratio of times new / base above which a benchmark
+            is reported as slower, and below 1 / threshold as faster
+        stat: str, statistic compared, 'min' or 'median'
+
+    Returns:
+        rows: list of (name, base time, new time, ratio, status) of the
+            benchmarks in both runs, status is 'slower', 'faster', '' or 'error'
+    """
+    rows = []
+    base, new = base["benchmarks"], new["benchmarks"]
+    for name in base.keys() & new.keys():
+        if "error" in base[name] or "error" in new[name]:
+            rows.append((name, None, None, None, "error"))
+            continue
+        ratio = new[name][stat] / base[name][stat]
+        status = "slower" if ratio > threshold else "faster" if ratio < 1 / threshold else ""
+        rows.append((name, base[name][stat], new[name][stat], ratio, status))
+    return sorted(rows)
+
+
+def print_comparison(rows) -> None:
+    print(f"{'benchmark':60s} {'base':>10s} {'new':>10s} {'ratio':>7s}")
+    for name, base_time, new_time, ratio, status in rows:
+        if status == "error":
+            print(f"{name:60s} {'':>10s} {'':>10s} {'':>7s} error")
+        else:
+            print(f"{name:60s} {format_time(base_time):>10s} {format_time(new_time):>10s} {ratio:7.2f} {status}")
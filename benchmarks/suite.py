@@ -0,0 +1,167 @@
+"""Benchmarks of neurogym, see benchmarks.runner.benchmark."""
+
+import itertools
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import neurogym as ngym
+from benchmarks.runner import benchmark
+from neurogym.utils.scheduler import RandomSchedule
+from neurogym.vector import VectorTrialEnv
+from neurogym.wrappers import Monitor, Noise, PassAction, PassReward, ScheduleEnvs
+
+ENVS = ngym.all_envs(collections=True)
+# Envs that compute observations step by step, without ob and gt arrays of the trial, so Dataset cannot use them
+STEP_ONLY_ENVS = ["Bandit-v0", "DawTwoStep-v0", "EconomicDecisionMaking-v0", "Null-v0"]
+# Envs that declare a reward_rule, so VectorTrialEnv can step them
+VECTOR_ENVS = [
+    "AntiReach-v0",
+    "ContextDecisionMaking-v0",
+    "DelayComparison-v0",
+    "DelayMatchCategory-v0",
+    "DelayMatchSample-v0",
+    "IntervalDiscrimination-v0",
+    "MultiSensoryIntegration-v0",
+    "PerceptualDecisionMaking-v0",
+    "PulseDecisionMaking-v0",
+    "SingleContextDecisionMaking-v0",
+]
+
+warnings.filterwarnings("ignore", message=".*get variables from other wrappers is deprecated*")
+warnings.filterwarnings("ignore", message=".*The environment creator metadata doesn't include `render_modes`*")
+warnings.filterwarnings("ignore", message=".*is not within the observation space*")
+
+
+def _stepper(env, num_actions=1000):
+    """Return a function doing one step of env with pre-sampled actions."""
+    env.unwrapped.seed(0)
+    env.reset()
+    actions = itertools.cycle([env.action_space.sample() for _ in range(num_actions)])
+
+    def step() -> None:
+        _, _, terminated, truncated, _ = env.step(next(actions))
+        if terminated or truncated:
+            env.reset()
+
+    return step
+
+
+@benchmark("step", params=ENVS)
+def step(env_id):
+    return _stepper(ngym.make(env_id))
+
+
+@benchmark("new_trial", params=ENVS)
+def new_trial(env_id):
+    env = ngym.make(env_id)
+    env.unwrapped.seed(0)
+    env.reset()
+    return env.unwrapped._top.new_trial  # noqa: SLF001 - includes the TrialWrappers
+
+
+@benchmark("step_trial", params=["PerceptualDecisionMaking-v0", "yang19.dm1-v0"])
+def step_trial(env_id):
+    """Time step_trial through a whole trial of fixation, including the next new_trial."""
+    task = ngym.make(env_id).unwrapped
+    task.seed(0)
+    task.reset()
+    actions = [0] * 10000
+    return lambda: task.step_trial(actions)
+
+
+def _in_period(env_id, lookup=False):
+    """Return a function timing the in_period calls of all periods at one time step, then doing the step."""
+    task = ngym.make(env_id, dt=20).unwrapped
+    stepper = _stepper(task)
+
+    def call():
+        in_period = task.in_period
+        periods = task._trial_periods  # noqa: SLF001
+        if lookup:
+            t = task.t
+            start = time.perf_counter()
+            for period in periods:
+                in_period(period, t=t)
+        else:
+            start = time.perf_counter()
+            for period in periods:
+                in_period(period)
+        duration = time.perf_counter() - start
+        stepper()
+        return duration
+
+    return call
+
+
+@benchmark("in_period", params=ngym.all_envs(), self_timed=True)
+def in_period(env_id):
+    """Time the in_period calls of all periods at one time step, with the compiled period schedule."""
+    return _in_period(env_id)
+
+
+@benchmark("in_period_t", params=ngym.all_envs(), self_timed=True)
+def in_period_t(env_id):
+    """Time the in_period calls of all periods at one time step, with the start_t/end_t lookups of in_period(t=t)."""
+    return _in_period(env_id, lookup=True)
+
+
+@benchmark("vector_step", params=VECTOR_ENVS)
+def vector_step(env_id):
+    """Time one step of 64 copies with VectorTrialEnv.
+
+    64 * step[env_id] divided by this is the speedup over stepping the copies one by one.
+    """
+    venv = VectorTrialEnv(env_id, 64)
+    venv.reset(seed=0)
+    actions = itertools.cycle([venv.action_space.sample() for _ in range(1000)])
+    return lambda: venv.step(next(actions))
+
+
+@benchmark("dataset", params=[env_id for env_id in ENVS if env_id not in STEP_ONLY_ENVS])
+def dataset(env_id):
+    """Time one batch of 16 sequences of 100 steps."""
+    data = ngym.Dataset(env_id, batch_size=16, seq_len=100)
+    data.seed(0)
+    return data.__next__
+
+
+def _monitor(env):
+    folder = tempfile.mkdtemp(prefix="neurogym_benchmark_")
+    return Monitor(env, folder=folder + "/")
+
+
+def _schedule_envs(env):
+    envs = [env] + [ngym.make(env_id) for env_id in ngym.get_collection("yang19")[1:]]
+    return ScheduleEnvs(envs, RandomSchedule(len(envs)), env_input=True)
+
+
+WRAPPERS = {
+    "Monitor": _monitor,
+    "Noise": Noise,
+    "PassAction": PassAction,
+    "PassReward": PassReward,
+    "PassAction+PassReward+Noise": lambda env: Noise(PassReward(PassAction(env))),
+    "ScheduleEnvs": _schedule_envs,
+}
+
+
+@benchmark("wrapper_step", params=WRAPPERS)
+def wrapper_step(wrapper):
+    """Time one step of a wrapped task, yang19.go-v0 for ScheduleEnvs and PerceptualDecisionMaking-v0 otherwise."""
+    env_id = "yang19.go-v0" if wrapper == "ScheduleEnvs" else "PerceptualDecisionMaking-v0"
+    return _stepper(WRAPPERS[wrapper](ngym.make(env_id)))
+
+
+@benchmark("import_neurogym", self_timed=True)
+def import_neurogym():
+    """Time `import neurogym` in a new interpreter."""
+    code = "import time; start = time.perf_counter(); import neurogym; print(time.perf_counter() - start)"
+
+    def run():
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)  # noqa: S603
+        return float(result.stdout)
+
+    return run
@@ -5,6 +5,7 @@
 from neurogym.version import VERSION as __version__  # noqa: N811
 from neurogym.core import BaseEnv
 from neurogym.core import TrialEnv
+from neurogym.core import TrialBatch
 from neurogym.core import TrialWrapper
 from neurogym.utils import spaces
 from neurogym.envs.registration import make
@@ -14,4 +15,16 @@ from neurogym.envs.registration import all_tags
 from neurogym.envs.collections import get_collection
 from neurogym.wrappers import all_wrappers
 from neurogym.utils.data import Dataset
+from neurogym.utils.scoring import evaluate
 from neurogym.utils import random
+from neurogym.vector import VectorTrialEnv
+
+
+def __getattr__(name):
+    # plotting imports matplotlib, so it is only loaded when first used
+    if name == "plot_env":
+        from neurogym.utils.plotting import plot_env  # noqa: PLC0415
+
+        return plot_env
+    msg = f"module {__name__!r} has no attribute {name!r}"
+    raise AttributeError(msg)
@@ -1,10 +1,14 @@
 import contextlib
+import math
 from typing import Any, NoReturn
 
 import gymnasium as gym
 import numpy as np
 
-from neurogym.utils.random import trunc_exp
+from neurogym.utils.cache import LRUCache
+from neurogym.utils.profiling import summarize
+from neurogym.utils.random import int_seed, make_rng, spawn, standard_normal, trunc_exp
+from neurogym.utils.timing import compile_timing
 
 METADATA_DEF_KEYS = ["description", "paper_name", "paper_link", "timing", "tags"]
 
@@ -15,6 +19,70 @@ def _clean_string(string):
     return " ".join(string.replace("\n", "").split())
 
 
+def _as_column(value, n):
+    """Convert a trial attribute, either shared or per trial, into a column of length n."""
+    if isinstance(value, np.ndarray) and value.ndim > 0 and len(value) == n:
+        return value
+    if isinstance(value, list | tuple) and len(value) == n:
+        return _stack_column(list(value))
+    if np.isscalar(value):
+        return np.full(n, value)
+    column = np.empty(n, dtype=object)
+    for i in range(n):
+        column[i] = value
+    return column
+
+
+def _index_kwarg(value, i, n):
+    """Select the value of trial i from a scalar or per-trial kwarg."""
+    if isinstance(value, np.ndarray | list | tuple) and len(value) == n:
+        return value[i]
+    return value
+
+
+def _reserve(arena, shape, dtype):
+    """Return arena if it can hold an array of shape, else a larger new arena.
+
+    The capacity along the first axis grows geometrically so that trials of
+    varying length only rarely reallocate.
+    """
+    shape = tuple(shape)
+    if arena is not None and arena.dtype == dtype and arena.shape[1:] == shape[1:]:
+        if arena.shape[0] >= shape[0]:
+            return arena
+        return np.empty((max(shape[0], 2 * arena.shape[0]), *shape[1:]), dtype=dtype)
+    return np.empty(shape, dtype=dtype)
+
+
+def _freeze(args):
+    """Hashable version of the args of a recorded call, raises TypeError if there is none, e.g. for functions."""
+    frozen = []
+    for arg in args:
+        if isinstance(arg, np.ndarray):
+            frozen.append((arg.shape, arg.dtype.str, arg.tobytes()))
+        elif isinstance(arg, list):
+            frozen.append(tuple(arg))
+        elif callable(arg):
+            msg = f"{arg!r} cannot be frozen."
+            raise TypeError(msg)
+        else:
+            frozen.append(arg)
+    return tuple(frozen)
+
+
+def _stack_column(values):
+    """Stack per-trial values into one column, using dtype object if ragged."""
+    try:
+        column = np.asarray(values)
+    except ValueError:
+        column = None
+    if column is None or column.dtype == object or column.ndim == 0:
+        column = np.empty(len(values), dtype=object)
+        for i, value in enumerate(values):
+            column[i] = value
+    return column
+
+
 def env_string(env, short=False):
     if short:
         return f"<{type(env).__name__}>"
@@ -70,23 +138,30 @@ class BaseEnv(gym.Env):
         self.tmax = 10000  # maximum time steps
         self.performance = 0
         self.rewards: dict = {}
-        self.rng = np.random.RandomState()
+        self.rng = make_rng()
 
     def seed(self, seed=None):
-        """Set random seed."""
-        self.rng = np.random.RandomState(seed)
+        """Set random seed, an int, np.random.SeedSequence or None."""
+        self.rng = make_rng(seed)
         if self.action_space is not None:
-            self.action_space.seed(seed)
+            self.action_space.seed(int_seed(seed))
         return [seed]
 
 
 class TrialEnv(BaseEnv):
     """The main Neurogym class for trial-based envs."""
 
+    # Optional declarative description of _step, see utils.scoring.FixationDecisionRule.
+    # Vectorized engines use it to compute rewards without calling _step.
+    reward_rule = None
+
     def __init__(self, dt=100, num_trials_before_reset=10000000, r_tmax=0) -> None:
         super().__init__(dt=dt)
         self.r_tmax = r_tmax
         self.num_tr = 0
+        # Index of the next trial, which selects the block of draws of the rngs.
+        # Unlike num_tr, it is not reset by reset().
+        self.trial_index = 0
         self.num_tr_exp = num_trials_before_reset
         self.trial: dict | None = None
         self._ob_built = False
@@ -94,9 +169,21 @@ class TrialEnv(BaseEnv):
         self._has_gt = False  # check if the task ever defined gt
 
         self._default_ob_value = None  # default to 0
+        # Reused buffers that self.ob and self.gt are views into. Wrappers may
+        # reserve _ob_pad extra columns for inputs appended to 1-D observations.
+        self._ob_arena = None
+        self._gt_arena = None
+        self._ob_pad = 0
+        self._noise_arena = None  # reused buffer of add_randn
+        # Noiseless ob and gt of past trials, see enable_template_cache
+        self.template_cache: LRUCache | None = None
+        self._recording: list | None = None  # calls of _new_trial writing ob and gt
 
         # For optional periods
         self.timing: dict = {}
+        # Compiled timing of each period, (timing value, dt, sampler), see _sampler
+        self._samplers: dict = {}
+        self._timing_seed = None
         self.start_t: dict = {}
         self.end_t: dict = {}
         self.start_ind: dict = {}
@@ -105,6 +192,12 @@ class TrialEnv(BaseEnv):
 
         self._top = self
         self._duration: dict = {}
+        self._trial_periods: list = []  # periods added in the current trial
+        # Period schedule of the current trial, see _compile_periods
+        self._period_at: list | bool = []
+        self._period_index: dict = {}
+        self._period_steps: dict = {}  # first and end step of each period
+        self._perf_recorder = None  # see neurogym.utils.profiling
 
     def __str__(self) -> Any:
         """Information about task."""
@@ -120,6 +213,23 @@ class TrialEnv(BaseEnv):
         msg = "_new_trial is not defined by user."
         raise NotImplementedError(msg)
 
+    def _new_trials(self, batch, **kwargs) -> NoReturn:
+        """Private interface for generating a batch of trials at once.
+
+        Envs opt in to batched generation by overriding this method. It mirrors
+        `_new_trial`, but periods, observations and ground truth are written
+        through the `TrialBatch` methods with one value per trial.
+
+        Args:
+            batch: TrialBatch to be filled
+            kwargs: trial attributes, scalars or arrays of length batch.n
+
+        Returns:
+            trials: dict of arrays of length batch.n, the columnar trial info
+        """
+        msg = "_new_trials is not defined by user."
+        raise NotImplementedError(msg)
+
     def _step(self, _action) -> NoReturn:
         """Private interface for the environment.
 
@@ -131,15 +241,53 @@ class TrialEnv(BaseEnv):
         raise NotImplementedError(msg)
 
     def seed(self, seed=None):
-        """Set random seed."""
-        self.rng = np.random.RandomState(seed)
+        """Set random seed, an int, np.random.SeedSequence or None.
+
+        Timing samplers get independent child seeds, and the trial index is
+        reset to 0.
+        """
+        self.rng = make_rng(seed)
         if hasattr(self, "action_space") and self.action_space is not None:
-            self.action_space.seed(seed)
-        for val in self.timing.values():
+            self.action_space.seed(int_seed(seed))
+        for val, child in zip(self.timing.values(), spawn(seed, len(self.timing)), strict=True):
             with contextlib.suppress(AttributeError):
-                val.seed(seed)
+                val.seed(child)
+        self._timing_seed = seed
+        self._samplers = {}
+        self.set_trial_index(0)
         return [seed]
 
+    def set_trial_index(self, trial_index) -> None:
+        """Set the index of the next trial.
+
+        The rngs of the env and of its timing samplers are moved to the draws
+        of that trial, so that after seed(seed), set_trial_index(k) followed by
+        new_trial() regenerates trial k without generating trials 0, ..., k - 1.
+        No effect on the draws of legacy RandomState rngs.
+        """
+        self.trial_index = trial_index
+        if hasattr(self.rng, "seek_trial"):
+            self.rng.seek_trial(trial_index)
+        for val in self.timing.values():
+            if hasattr(val, "seek_trial"):
+                val.seek_trial(trial_index)
+        for _, _, sampler in self._samplers.values():
+            if sampler is not None:
+                sampler.reset_calls()
+
+    def perf_stats(self):
+        """Return the time spent in each phase of the task and its wrappers while profiled.
+
+        Phases are named 'Class.method'. See neurogym.utils.profiling.profile.
+
+        Returns:
+            stats: dict of phase name to dict of 'calls', 'time' and 'self_time'
+                in seconds, empty if the env was never profiled
+        """
+        if self._perf_recorder is None:
+            return {}
+        return summarize(self._perf_recorder.paths)
+
     def post_step(self, ob, reward, terminated, truncated, info):
         """Optional task-specific wrapper applied at the end of step.
 
@@ -158,12 +306,131 @@ class TrialEnv(BaseEnv):
         self._tmax = 0  # reset, self.tmax not reset so it can be used in step
         self._ob_built = False
         self._gt_built = False
+        self._trial_periods = []
+        self._recording = [] if self.template_cache is not None else None
+        # Draws while stepping the previous trial, e.g. by wrappers, must not shift the draws of this trial
+        self.set_trial_index(self.trial_index)
         trial = self._new_trial(**kwargs)
+        self._compile_periods()
+        if self._recording is not None:
+            self._apply_recording()
         self.trial = trial
         self.num_tr += 1  # Increment trial count
         self._has_gt = self._gt_built
+        self.trial_index += 1
         return trial
 
+    def enable_template_cache(self, maxsize=256) -> None:
+        """Reuse the noiseless observation and ground truth of trials of the same condition.
+
+        While enabled, the add_ob, set_ob, set_groundtruth and add_randn calls
+        of _new_trial are recorded and applied after it. Trials with the same
+        periods and the same calls, except add_randn, share a template: the
+        first one builds it, the next ones copy it and only add their noise.
+        The noise is drawn when add_randn is called but added last, so ob may
+        differ by rounding errors if add_ob is called after add_randn.
+        The least recently used templates beyond maxsize are evicted, e.g. for
+        tasks with continuous timing. Hits and misses are counted in
+        self.template_cache.
+
+        Only for tasks whose ob and gt only depend on these calls. A trial
+        that reads ob or gt with view_ob or view_groundtruth, passes functions
+        as values, or calls set_ob after add_randn, is built without the cache.
+        """
+        self.template_cache = LRUCache(maxsize)
+
+    def disable_template_cache(self) -> None:
+        self.template_cache = None
+
+    def _stop_recording(self) -> None:
+        """Apply the calls recorded so far and build the rest of the trial without the cache."""
+        calls, self._recording = self._recording, None
+        for name, args in calls:
+            getattr(self, name)(*args)
+
+    def _apply_recording(self) -> None:
+        """Build ob and gt of the trial from the recorded calls, through the template cache."""
+        calls, self._recording = self._recording, None
+        template, noise = [], []
+        key = None
+        for name, args in calls:
+            if name == "_add_noise":
+                noise.append((name, args))
+            elif noise and name == "_add_ob" and args[3]:
+                break  # set_ob after add_randn, the noise cannot be added last
+            else:
+                template.append((name, args))
+        else:
+            periods = tuple((p, self.start_ind[p], self.end_ind[p]) for p in self._trial_periods)
+            with contextlib.suppress(TypeError):
+                key = (int(self._tmax / self.dt), periods, tuple((name, _freeze(args)) for name, args in template))
+                hash(key)
+        if key is None:
+            for name, args in calls:
+                getattr(self, name)(*args)
+            return
+
+        cached = self.template_cache.get(key)
+        if cached is None:
+            for name, args in template:
+                getattr(self, name)(*args)
+            ob = self.ob.copy() if self._ob_built else None
+            gt = self.gt.copy() if self._gt_built else None
+            self.template_cache.put(key, (ob, gt))
+        else:
+            ob, gt = cached
+            if ob is not None:
+                self._init_ob()
+                self.ob[...] = ob
+            if gt is not None:
+                self._init_gt()
+                self.gt[...] = gt
+        for name, args in noise:
+            getattr(self, name)(*args)
+
+    def new_trials(self, n, **kwargs):
+        """Public interface for generating n trials at once.
+
+        Envs that implement `_new_trials` build the whole batch with vectorized
+        NumPy operations. Other envs, and envs wrapped by a TrialWrapper, fall
+        back to calling `new_trial` n times.
+
+        Args:
+            n: int, number of trials
+            kwargs: trial attributes, scalars or arrays of length n
+
+        Returns:
+            batch: TrialBatch with padded ob (n, T_max, ...), gt (n, T_max, ...),
+                lengths (n,) and the columnar trial info in batch.trials
+        """
+        if self._top is not self or type(self)._new_trials is TrialEnv._new_trials:  # noqa: SLF001
+            return self._new_trials_loop(n, **kwargs)
+        return self._new_trials_batch(n, **kwargs)
+
+    def _new_trials_batch(self, n, **kwargs):
+        """Generate n trials at once with _new_trials."""
+        batch = TrialBatch(self, n)
+        self.set_trial_index(self.trial_index)
+        kwargs = {key: _as_column(val, n) for key, val in kwargs.items()}
+        trials = self._new_trials(batch, **kwargs)
+        batch.trials = {key: _as_column(val, n) for key, val in trials.items()}
+        self.num_tr += n
+        self.trial_index += n
+        return batch
+
+    def _new_trials_loop(self, n, **kwargs):
+        """Generate n trials one at a time and stack them into a TrialBatch."""
+        records = []
+        for i in range(n):
+            trial_kwargs = {key: _index_kwarg(val, i, n) for key, val in kwargs.items()}
+            trial = self._top.new_trial(**trial_kwargs)
+            env = self._top.unwrapped  # for env schedules, the env that generated the trial
+            periods = {p: (env.start_t[p], env.end_t[p]) for p in env._trial_periods}  # noqa: SLF001
+            if not env._gt_built:  # noqa: SLF001
+                env._init_gt()  # noqa: SLF001
+            records.append((np.array(self._top.get_wrapper_attr("ob")), np.array(env.gt), trial, periods))
+        return TrialBatch.from_records(self, records)
+
     def step(self, action):
         """Public interface for the environment."""
         ob, reward, terminated, truncated, info = self._step(action)
@@ -175,6 +442,8 @@ class TrialEnv(BaseEnv):
             # If gt is built, default gt to gt_now
             # must run before incrementing t
             info["gt"] = self.gt_now
+            if isinstance(info["gt"], np.ndarray):
+                info["gt"] = info["gt"].copy()  # row of the reused gt arena
 
         self.t += self.dt  # increment within trial time count
         self.t_ind += 1
@@ -191,9 +460,102 @@ class TrialEnv(BaseEnv):
             self.performance = 0
             info["trial"] = trial
         if ob is OBNOW:
-            ob = self.ob[self.t_ind]
+            ob = self.ob[self.t_ind].copy()  # self.ob is reused by the next trial
         return self.post_step(ob, reward, terminated, truncated, info)
 
+    def step_trial(self, actions):
+        """Step through the current trial with a sequence of actions at once.
+
+        Equivalent to calling step with each action in turn, from the current
+        time step, until the trial ends or the actions run out. For tasks with
+        a reward_rule and a prebuilt observation, not wrapped by a TrialWrapper
+        and not overriding step or post_step, rewards are computed for all
+        steps at once. Other tasks fall back to calling step.
+
+        Args:
+            actions: sequence of actions
+
+        Returns:
+            ob: np array (k, *ob_shape), observation returned by each step, the
+                last one is the first of the next trial if the trial ended
+            reward: float np array (k,)
+            terminated: bool np array (k,)
+            truncated: bool np array (k,)
+            info: dict with 'new_trial', True if the trial ended at the last
+                step, 'gt', np array (k, ...) of the ground truth at each step,
+                and if the trial ended 'performance' and the next 'trial'
+            where k is the number of actions used.
+        """
+        if len(actions) == 0:
+            msg = "actions must not be empty."
+            raise ValueError(msg)
+        if not self._can_step_trial():
+            return self._step_trial_loop(actions)
+
+        start, dt = self.t_ind, self.dt
+        k = min(len(actions), len(self.ob) - start)
+        actions = np.asarray(actions[:k])
+        gt = self.gt[start : start + k]
+        fixation, decision = self.reward_rule.masks(self)
+        reward, new_trial, correct = self.reward_rule(
+            actions,
+            gt,
+            fixation[start : start + k],
+            decision[start : start + k],
+            self.rewards,
+            getattr(self, "abort", False),
+        )
+        # Same time accumulation and end-of-trial condition as step
+        t = np.full(k + 1, dt, dtype=float)
+        t[0] = self.t
+        t = np.cumsum(t)[1:]
+        timeout = (t + dt > self.tmax) & ~new_trial
+        ended = new_trial | timeout
+        if ended.any():
+            k = int(np.argmax(ended)) + 1
+        reward = reward[:k] + timeout[:k] * self.r_tmax
+
+        ob = np.empty((k, *self.ob.shape[1:]), dtype=self.ob.dtype)
+        ob[: k - 1] = self.ob[start + 1 : start + k]
+        info = {"new_trial": bool(ended[k - 1]), "gt": gt[:k].copy()}
+        if correct[:k].any():
+            self.performance = 1
+        if info["new_trial"]:
+            info["performance"] = self.performance
+            self.t = self.t_ind = 0
+            info["trial"] = self._top.new_trial()
+            self.performance = 0
+            ob[k - 1] = self.ob[0]
+        else:
+            self.t, self.t_ind = float(t[k - 1]), start + k
+            ob[k - 1] = self.ob[self.t_ind]
+        return ob, reward, np.zeros(k, dtype=bool), np.zeros(k, dtype=bool), info
+
+    def _can_step_trial(self):
+        """Whether step_trial can compute all steps at once, see step_trial."""
+        overridden = {"step", "_step", "post_step"} & vars(self).keys()  # e.g. while profiling
+        return (
+            self.reward_rule is not None
+            and self._top is self
+            and self._ob_built
+            and type(self).step is TrialEnv.step
+            and type(self).post_step is TrialEnv.post_step
+            and not overridden
+        )
+
+    def _step_trial_loop(self, actions):
+        """Step_trial by calling step with each action."""
+        steps = []
+        for action in actions:
+            steps.append(self._top.step(action))
+            if steps[-1][4]["new_trial"]:
+                break
+        obs, rewards, terminated, truncated, infos = zip(*steps, strict=True)
+        info = dict(infos[-1])
+        if all("gt" in step_info for step_info in infos):
+            info["gt"] = np.array([step_info["gt"] for step_info in infos])
+        return np.array(obs), np.array(rewards, dtype=float), np.array(terminated), np.array(truncated), info
+
     def reset(self, seed=None, options=None):
         """Reset the environment.
 
@@ -233,11 +595,29 @@ class TrialEnv(BaseEnv):
         """Set top to be wrapper."""
         self._top = wrapper
 
+    def _sampler(self, period):
+        """Return the compiled sampler of the timing of period, or None, see neurogym.utils.timing.
+
+        Samplers are compiled again when the timing value of period is
+        replaced, but not when a list value is modified in place.
+        """
+        timing = self.timing[period]
+        entry = self._samplers.get(period)
+        if entry is None or entry[0] is not timing or entry[1] != self.dt:
+            # Period i gets the i-th child seed, as the timing samplers of seed
+            periods = list(self.timing)
+            seed = None if self._timing_seed is None else spawn(self._timing_seed, len(periods))[periods.index(period)]
+            entry = self._samplers[period] = (timing, self.dt, compile_timing(timing, self.dt, seed))
+        return entry[2]
+
     def sample_time(self, period):
         timing = self.timing[period]
         if isinstance(timing, int | float):
-            t = timing
-        elif callable(timing):
+            return (timing // self.dt) * self.dt
+        sampler = self._sampler(period)
+        if sampler is not None:
+            return sampler(self.trial_index)
+        if callable(timing):
             t = timing()
         elif isinstance(timing[0], int | float):
             # Expect list of int/float, and use random choice
@@ -266,6 +646,45 @@ class TrialEnv(BaseEnv):
                 raise ValueError(msg)
         return (t // self.dt) * self.dt
 
+    def sample_times(self, period, n, tmax=None):
+        """Sample the duration of period for n trials at once.
+
+        Args:
+            period: string, name of the period
+            n: int, number of trials
+            tmax: array of length n, current end time of each trial.
+                Only needed for the 'until' distribution.
+        """
+        sampler = self._sampler(period)
+        if sampler is not None:
+            return sampler.sample(self.trial_index, n)
+        timing = self.timing[period]
+        if isinstance(timing, int | float):
+            t = np.full(n, timing)
+        elif callable(timing):
+            t = np.array([timing() for _ in range(n)])
+        elif isinstance(timing[0], int | float):
+            t = self.rng.choice(timing, size=n)
+        else:
+            dist, args = timing
+            if dist == "uniform":
+                t = self.rng.uniform(*args, size=n)
+            elif dist == "choice":
+                t = self.rng.choice(args, size=n)
+            elif dist == "truncated_exponential":
+                t = np.array([trunc_exp(self.rng, *args) for _ in range(n)])
+            elif dist == "constant":
+                t = np.full(n, args)
+            elif dist == "until":
+                t = args - (np.zeros(n) if tmax is None else tmax)
+                if np.any(t < 0):
+                    msg = f"Invalid 'until' time for period {period}. Requested end time: {args}"
+                    raise ValueError(msg)
+            else:
+                msg = f"Distribution {dist} not found."
+                raise ValueError(msg)
+        return (t // self.dt) * self.dt
+
     def add_period(
         self,
         period,
@@ -313,6 +732,8 @@ class TrialEnv(BaseEnv):
         if duration is None:
             duration = self.sample_time(period)
         self._duration[period] = duration
+        if period not in self._trial_periods:
+            self._trial_periods.append(period)
 
         if after is not None:
             start = self.end_t[after] if isinstance(after, str) else after
@@ -336,30 +757,48 @@ class TrialEnv(BaseEnv):
             msg = "observation_space.shape cannot be None"
             raise ValueError(msg)
         ob_shape = [tmax_ind, *list(self.observation_space.shape)]
+        pad = self._ob_pad if len(ob_shape) == 2 else 0
+        arena_shape = [tmax_ind, ob_shape[1] + pad] if pad else ob_shape
+        self._ob_arena = _reserve(self._ob_arena, arena_shape, self.observation_space.dtype)
+        # Padding columns are cleared by _pad_ob when used
+        self.ob = self._ob_arena[:tmax_ind, : ob_shape[1]] if pad else self._ob_arena[:tmax_ind]
         if self._default_ob_value is None:
-            self.ob = np.zeros(ob_shape, dtype=self.observation_space.dtype)
+            self.ob.fill(0)
         else:
-            self.ob = np.full(
-                ob_shape,
-                self._default_ob_value,
-                dtype=self.observation_space.dtype,
-            )
+            # e.g. the pixel of image observations, broadcast once and then copied row by row
+            self.ob[:1] = self._default_ob_value
+            self.ob[1:] = self.ob[:1]
         self._ob_built = True
 
+    def _pad_ob(self, n):
+        """Extend self.ob of 1-D observations by n zero columns and return it.
+
+        The columns are taken in place from the arena if reserved with _ob_pad.
+        """
+        ob = self.ob
+        if ob.ndim == 2 and ob.base is self._ob_arena and ob.shape[1] + n <= self._ob_arena.shape[1]:
+            self.ob = self._ob_arena[: ob.shape[0], : ob.shape[1] + n]
+            self.ob[:, -n:] = 0
+        else:
+            self.ob = np.concatenate((ob, np.zeros((ob.shape[0], n), dtype=ob.dtype)), axis=-1)
+        return self.ob
+
     def _init_gt(self) -> None:
         """Initialize trial with ground_truth."""
         tmax_ind = int(self._tmax / self.dt)
         if self.action_space.shape is None:
             msg = "action_space.shape cannot be None"
             raise ValueError(msg)
-        self.gt = np.zeros(
-            [tmax_ind, *list(self.action_space.shape)],
-            dtype=self.action_space.dtype,
-        )
+        gt_shape = [tmax_ind, *list(self.action_space.shape)]
+        self._gt_arena = _reserve(self._gt_arena, gt_shape, self.action_space.dtype)
+        self.gt = self._gt_arena[:tmax_ind]
+        self.gt.fill(0)
         self._gt_built = True
 
     def view_ob(self, period=None):
         """View observation of an period."""
+        if self._recording is not None:
+            self._stop_recording()
         if not self._ob_built:
             self._init_ob()
 
@@ -367,6 +806,31 @@ class TrialEnv(BaseEnv):
             return self.ob
         return self.ob[self.start_ind[period] : self.end_ind[period]]
 
+    def compact_ob(self):
+        """Observation of the trial as a table of its distinct steps and an index.
+
+        Identical steps, e.g. the background or static frames of image
+        observations, are stored once.
+
+        Returns:
+            frames: np array (n_frames, ob_space.shape), copy of the distinct steps
+            index: np array (tmax_ind,) of int, ob == frames[index]
+        """
+        ob = self.ob
+        flat = ob.reshape(len(ob), -1)
+        # Runs of identical consecutive steps, then runs identical to an earlier one
+        new_run = np.ones(len(ob), dtype=bool)
+        new_run[1:] = (flat[1:] != flat[:-1]).any(axis=1)
+        starts = np.flatnonzero(new_run)
+        table: dict[bytes, int] = {}
+        run_frames = np.empty(len(starts), dtype=np.intp)
+        for run, start in enumerate(starts):
+            run_frames[run] = table.setdefault(flat[start].tobytes(), len(table))
+        first = np.unique(run_frames, return_index=True)[1]
+        frames = ob[starts[first]]
+        index = np.repeat(run_frames, np.diff(starts, append=len(ob)))
+        return frames, index
+
     def _add_ob(self, value, period=None, where=None, reset=False) -> None:
         """Set observation in period to value.
 
@@ -376,6 +840,11 @@ class TrialEnv(BaseEnv):
             where: string or np array, location of stimulus to be added
             reset: # FIXME: add description
         """
+        if self._recording is not None:
+            # Copied in case the task changes the array before the call is applied
+            value = value.copy() if isinstance(value, np.ndarray) else value
+            self._recording.append(("_add_ob", (value, period, where, reset)))
+            return
         if isinstance(period, str) or period is None:
             pass
         else:
@@ -420,20 +889,58 @@ class TrialEnv(BaseEnv):
                 self.add_randn(mu, sigma, p, where)
             return
 
+        if isinstance(where, str):
+            where = self.observation_space.name[where]  # type: ignore[attr-defined]
+        if isinstance(where, range):
+            where = slice(where.start, where.stop, where.step)  # a view instead of a copy
+        if self._recording is not None:
+            # Drawn now to keep the order of the draws of the rng, added when the trial is built
+            start, end = (
+                (0, int(self._tmax / self.dt)) if period is None else (self.start_ind[period], self.end_ind[period])
+            )
+            features = np.empty((0, *self.observation_space.shape))  # type: ignore[misc]
+            shape = (end - start, *(features.shape[1:] if where is None else features[..., where].shape[1:]))
+            noise = self._randn(shape, self.observation_space.dtype)
+        else:
+            ob = self.view_ob(period=period)
+            # TODO: This only works if the slicing is one one-dimension
+            noise = self._randn(ob.shape if where is None else ob[..., where].shape, ob.dtype)
+        if sigma != 1:
+            noise *= sigma
+        if mu != 0:
+            noise += mu
+        if self._recording is not None:
+            self._recording.append(("_add_noise", (noise.copy(), period, where)))
+        else:
+            self._add_noise(noise, period, where)
+
+    def _add_noise(self, noise, period, where) -> None:
         ob = self.view_ob(period=period)
         if where is None:
-            ob += mu + self.rng.randn(*ob.shape) * sigma
+            ob += noise
         else:
-            if isinstance(where, str):
-                where = self.observation_space.name[where]  # type: ignore[attr-defined]
-            # TODO: This only works if the slicing is one one-dimension
-            ob[..., where] += mu + self.rng.randn(*ob[..., where].shape) * sigma
+            ob[..., where] += noise
+
+    def _randn(self, shape, dtype):
+        """Standard normal samples in a reused buffer, valid until the next call.
+
+        Samples are drawn in dtype if it is a float dtype, else in float64.
+        """
+        if not np.issubdtype(dtype, np.floating):
+            dtype = np.float64
+        size = math.prod(shape)
+        self._noise_arena = _reserve(self._noise_arena, (size,), dtype)
+        return standard_normal(self.rng, self._noise_arena[:size].reshape(shape))
 
     def set_ob(self, value, period=None, where=None) -> None:
         self._add_ob(value, period, where, reset=True)
 
     def set_groundtruth(self, value, period=None, where=None) -> None:
         """Set groundtruth value."""
+        if self._recording is not None:
+            value = value.copy() if isinstance(value, np.ndarray) else value
+            self._recording.append(("set_groundtruth", (value, period, where)))
+            return
         if not self._gt_built:
             self._init_gt()
 
@@ -450,16 +957,94 @@ class TrialEnv(BaseEnv):
 
     def view_groundtruth(self, period):
         """View observation of an period."""
+        if self._recording is not None:
+            self._stop_recording()
         if not self._gt_built:
             self._init_gt()
         return self.gt[self.start_ind[period] : self.end_ind[period]]
 
+    def _compile_periods(self):
+        """Compile the periods of the current trial into a per-step schedule.
+
+        Stores the list of the name of the period (None if none) at each time
+        step, or False if periods overlap and cannot be represented by one
+        period per step. Step i is at time i * dt, as accumulated by step. Must
+        be called again if start_t or end_t are changed after new_trial.
+        """
+        dt = self.dt
+        tmax_ind = int(self._tmax / dt)
+        period_at: list = [None] * tmax_ind
+        index = {}
+        steps = {}
+        for i, period in enumerate(self._trial_periods):
+            # First steps with t >= start_t and t >= end_t
+            start = min(max(0, int(-(-self.start_t[period] // dt))), tmax_ind)
+            end = min(max(0, int(-(-self.end_t[period] // dt))), tmax_ind)
+            if end > start:
+                if period_at[start:end].count(None) != end - start:
+                    self._period_at = False
+                    return
+                period_at[start:end] = [period] * (end - start)
+            index[period] = i
+            steps[period] = (start, end)
+        self._period_index = index
+        self._period_steps = steps
+        self._period_at = period_at
+
+    @property
+    def period_ids(self):
+        """Int array (tmax_ind,) of the index of the period at each time step.
+
+        Periods are numbered in the order they were added in the current
+        trial, -1 means no period. None if periods overlap.
+        """
+        if self._period_at is False:
+            return None
+        index = self._period_index
+        return np.array([index.get(period, -1) for period in self._period_at], dtype=np.int16)
+
     def in_period(self, period, t=None):
-        """Check if current time or time t is in period."""
+        """Check if current time or time t is in period.
+
+        The current time is looked up in the compiled period schedule of the
+        trial, so periods not added in the current trial are never current.
+        Falls back to comparing t with start_t and end_t if t is given or
+        periods overlap.
+        """
         if t is None:
+            period_at = self._period_at
+            if period_at:
+                try:  # faster than contextlib.suppress in this hot path
+                    return period_at[self.t_ind] == period
+                except IndexError:
+                    pass
             t = self.t  # Default
         return self.start_t[period] <= t < self.end_t[period]
 
+    def period_mask(self, period):
+        """Boolean mask (tmax_ind,), True at the time steps where in_period(period) is True."""
+        if self._period_at is not False:
+            mask = np.zeros(len(self._period_at), dtype=bool)
+            if period in self._period_steps:
+                start, end = self._period_steps[period]
+                mask[start:end] = True
+            return mask
+        t = np.arange(int(self._tmax / self.dt)) * self.dt
+        if period not in self.start_t:
+            return np.zeros(len(t), dtype=bool)
+        return (self.start_t[period] <= t) & (t < self.end_t[period])
+
+    @property
+    def current_period(self):
+        """Name of the period at the current time step, None if outside all periods."""
+        period_at = self._period_at
+        if period_at and self.t_ind < len(period_at):
+            return period_at[self.t_ind]
+        for period in self._trial_periods:
+            if self.in_period(period):
+                return period
+        return None
+
     @property
     def ob_now(self):
         return OBNOW
@@ -489,5 +1074,247 @@ class TrialWrapper(gym.Wrapper):
         raise NotImplementedError
 
 
+class TrialBatch:
+    """A batch of trials generated at once by TrialEnv.new_trials.
+
+    Trials are stored batch-first and padded to the longest trial. The methods
+    mirror the per-trial TrialEnv interface (add_period, add_ob, add_randn,
+    set_ob, set_groundtruth) but act on all trials with whole-batch NumPy
+    operations. Values are either shared by all trials, or given per trial
+    with one extra leading dimension of length n.
+
+    Args:
+        env: TrialEnv that defines the spaces, timing, dt and rng
+        n: int, number of trials
+
+    Attributes:
+        ob: np array (n, T_max, *observation_space.shape)
+        gt: np array (n, T_max, *action_space.shape)
+        lengths: np array (n,), number of time steps of each trial
+        trials: dict of arrays of length n, the trial info
+        start_t, end_t: dict of arrays (n,), period start and end time
+        start_ind, end_ind: dict of arrays (n,), period start and end index
+    """
+
+    def __init__(self, env, n) -> None:
+        self.env = env
+        self.n = n
+        self.dt = env.dt
+        self.trials: dict = {}
+        self.start_t: dict = {}
+        self.end_t: dict = {}
+        self.start_ind: dict = {}
+        self.end_ind: dict = {}
+        self._tmax = np.zeros(n)
+        self._ob = None
+        self._gt = None
+
+    def __len__(self) -> int:
+        return self.n
+
+    @classmethod
+    def from_records(cls, env, records):
+        """Stack per-trial (ob, gt, trial, periods) records into a batch."""
+        batch = cls(env, len(records))
+        lengths = np.array([len(ob) for ob, _, _, _ in records], dtype=int)
+        t_max = int(lengths.max(initial=0))
+        ob0, gt0 = records[0][0], records[0][1]
+        batch._ob = np.zeros((batch.n, t_max, *ob0.shape[1:]), dtype=ob0.dtype)
+        batch._gt = np.zeros((batch.n, t_max, *gt0.shape[1:]), dtype=gt0.dtype)
+        periods = []
+        for i, (ob, gt, _, trial_periods) in enumerate(records):
+            batch.ob[i, : len(ob)] = ob
+            batch.gt[i, : len(gt)] = gt
+            periods += [p for p in trial_periods if p not in periods]
+        for period in periods:
+            start = [rec[3].get(period, (0, 0))[0] for rec in records]
+            end = [rec[3].get(period, (0, 0))[1] for rec in records]
+            batch._set_period(period, np.array(start, dtype=float), np.array(end, dtype=float))
+        batch._tmax = lengths * batch.dt
+        keys = []
+        for _, _, trial, _ in records:
+            keys += [key for key in (trial or {}) if key not in keys]
+        batch.trials = {key: _stack_column([(rec[2] or {}).get(key) for rec in records]) for key in keys}
+        return batch
+
+    @property
+    def periods(self):
+        return list(self.start_t)
+
+    @property
+    def lengths(self):
+        return (self._tmax / self.dt).astype(int)
+
+    @property
+    def ob(self):
+        if self._ob is None:
+            self._init_ob()
+        return self._ob
+
+    @property
+    def gt(self):
+        if self._gt is None:
+            self._init_gt()
+        return self._gt
+
+    def _set_period(self, period, start, end) -> None:
+        self.start_t[period] = start
+        self.end_t[period] = end
+        self.start_ind[period] = (start / self.dt).astype(int)
+        self.end_ind[period] = (end / self.dt).astype(int)
+
+    def add_period(self, period, duration=None, before=None, after=None) -> None:
+        """Add a period to all trials, see TrialEnv.add_period.
+
+        Args:
+            period: string or list of strings, name of the period
+            duration: float, array (n,) or None, duration of the period.
+                If None, sampled for each trial from the env timing.
+            before: (optional) str, name of period that this period is before
+            after: (optional) str, name of period that this period is after
+                or float, time of period start
+        """
+        if self._ob is not None:
+            msg = "Cannot add period after ob is built, i.e. after running add_ob."
+            raise InvalidOperationError(msg)
+        if not isinstance(period, str):
+            if duration is None:
+                duration = [None] * len(period)
+            elif len(duration) != len(period):
+                msg = f"{len(duration)=} and {len(period)=} must be the same."
+                raise ValueError(msg)
+            self.add_period(period[0], duration=duration[0], after=after)
+            for i in range(1, len(period)):
+                self.add_period(period[i], duration=duration[i], after=period[i - 1])
+            return
+
+        if duration is None:
+            duration = self.env.sample_times(period, self.n, tmax=self._tmax)
+        duration = np.broadcast_to(np.asarray(duration, dtype=float), (self.n,))
+
+        if after is not None:
+            start = self.end_t[after] if isinstance(after, str) else np.full(self.n, float(after))
+        elif before is not None:
+            start = self.start_t[before] - duration
+        else:
+            start = np.zeros(self.n)
+
+        self._set_period(period, start, start + duration)
+        self._tmax = np.maximum(self._tmax, start + duration)
+
+    def _init_ob(self) -> None:
+        shape = self.env.observation_space.shape
+        if shape is None:
+            msg = "observation_space.shape cannot be None"
+            raise ValueError(msg)
+        lengths = self.lengths
+        t_max = int(lengths.max(initial=0))
+        self._ob = np.zeros((self.n, t_max, *shape), dtype=self.env.observation_space.dtype)
+        if self.env._default_ob_value is not None:  # noqa: SLF001
+            self._ob[np.arange(t_max) < lengths[:, None]] = self.env._default_ob_value  # noqa: SLF001
+
+    def _init_gt(self) -> None:
+        shape = self.env.action_space.shape
+        if shape is None:
+            msg = "action_space.shape cannot be None"
+            raise ValueError(msg)
+        t_max = self.ob.shape[1]
+        self._gt = np.zeros((self.n, t_max, *shape), dtype=self.env.action_space.dtype)
+
+    def view_mask(self, period=None):
+        """Boolean mask (n, T_max) of the time steps of period in each trial."""
+        t_ind = np.arange(self.ob.shape[1])
+        if period is None:
+            return t_ind < self.lengths[:, None]
+        return (self.start_ind[period][:, None] <= t_ind) & (t_ind < self.end_ind[period][:, None])
+
+    def period_mask(self, period):
+        """Boolean mask (n, T_max), True where TrialEnv.in_period(period) would be True."""
+        t = np.arange(self.ob.shape[1]) * self.dt
+        if period not in self.start_t:
+            return np.zeros((self.n, len(t)), dtype=bool)
+        return (self.start_t[period][:, None] <= t) & (t < self.end_t[period][:, None])
+
+    def _where(self, where, space):
+        if isinstance(where, str):
+            where = space.name[where]
+        if isinstance(where, range):
+            where = list(where)
+        return where
+
+    def _per_trial(self, value, feature_ndim):
+        """Return value with a leading trial dimension, or None if shared."""
+        value = np.asarray(value)
+        if value.ndim == feature_ndim + 1 and len(value) == self.n:
+            return value
+        return None
+
+    def _add_ob(self, value, period=None, where=None, reset=False) -> None:
+        if not (isinstance(period, str) or period is None):
+            for p in period:
+                self._add_ob(value, p, where, reset=reset)
+            return
+
+        b_ind, t_ind = np.nonzero(self.view_mask(period))
+        ob = self.ob
+        where = self._where(where, self.env.observation_space)
+        index = (b_ind, t_ind) if where is None else (b_ind[:, None], t_ind[:, None], np.atleast_1d(where)[None, :])
+        feature_ndim = ob.ndim - 2 if where is None else np.ndim(where)
+        value_trial = self._per_trial(value, feature_ndim)
+        if value_trial is not None:
+            value = value_trial[b_ind]
+            if where is not None and np.ndim(where) == 0:
+                value = value[:, None]
+        if reset:
+            ob[index] = value
+        else:
+            ob[index] += value
+
+    def add_ob(self, value, period=None, where=None) -> None:
+        """Add value to observation, see TrialEnv.add_ob."""
+        self._add_ob(value, period, where, reset=False)
+
+    def set_ob(self, value, period=None, where=None) -> None:
+        """Set observation to value, see TrialEnv.set_ob."""
+        self._add_ob(value, period, where, reset=True)
+
+    def add_randn(self, mu=0, sigma=1, period=None, where=None) -> None:
+        """Add Gaussian noise to observation, see TrialEnv.add_randn."""
+        if not (isinstance(period, str) or period is None):
+            for p in period:
+                self.add_randn(mu, sigma, p, where)
+            return
+
+        b_ind, t_ind = np.nonzero(self.view_mask(period))
+        ob = self.ob
+        where = self._where(where, self.env.observation_space)
+        if where is None:
+            noise = self.env._randn((len(b_ind), *ob.shape[2:]), ob.dtype)  # noqa: SLF001
+            noise *= sigma
+            noise += mu
+            ob[b_ind, t_ind] += noise
+        else:
+            where = np.atleast_1d(where)
+            noise = self.env._randn((len(b_ind), len(where)), ob.dtype)  # noqa: SLF001
+            noise *= sigma
+            noise += mu
+            ob[b_ind[:, None], t_ind[:, None], where[None, :]] += noise
+
+    def set_groundtruth(self, value, period=None, where=None) -> None:
+        """Set groundtruth value, see TrialEnv.set_groundtruth."""
+        if not (isinstance(period, str) or period is None):
+            for p in period:
+                self.set_groundtruth(value, p, where)
+            return
+
+        gt = self.gt
+        if where is not None:
+            # TODO: Only works for Discrete action_space, make it work for Box
+            value = np.asarray(list(self.env.action_space.name[where]))[value]
+        b_ind, t_ind = np.nonzero(self.view_mask(period))
+        value_trial = self._per_trial(value, gt.ndim - 2)
+        gt[b_ind, t_ind] = value if value_trial is None else value_trial[b_ind]
+
+
 class InvalidOperationError(Exception):
     """Raised when an operation is not allowed."""
@@ -4,6 +4,7 @@ import numpy as np
 
 import neurogym as ngym
 from neurogym import spaces
+from neurogym.utils.scoring import FixationDecisionRule
 
 
 class AntiReach(ngym.TrialEnv):
@@ -26,6 +27,8 @@ class AntiReach(ngym.TrialEnv):
         "tags": ["perceptual", "steps action space"],
     }
 
+    reward_rule = FixationDecisionRule()
+
     def __init__(self, dt=100, anti=True, rewards=None, timing=None, dim_ring=32) -> None:
         super().__init__(dt=dt)
 
@@ -82,6 +85,31 @@ class AntiReach(ngym.TrialEnv):
 
         return trial
 
+    def _new_trials(self, batch, **kwargs):
+        """Batched version of _new_trial, see TrialEnv.new_trials."""
+        # Trial info
+        trials = {
+            "ground_truth": self.rng.choice(self.choices, size=batch.n),
+            "anti": np.full(batch.n, self.anti),
+        }
+        trials.update(kwargs)
+
+        ground_truth = trials["ground_truth"].astype(int)
+        theta = self.theta[ground_truth]
+        stim_theta = np.where(trials["anti"].astype(bool), np.mod(theta + np.pi, 2 * np.pi), theta)
+
+        # Periods
+        periods = ["fixation", "stimulus", "delay", "decision"]
+        batch.add_period(periods)
+
+        batch.add_ob(1, period=["fixation", "stimulus", "delay"], where="fixation")
+        stim = np.cos(self.theta - stim_theta[:, None])
+        batch.add_ob(stim, "stimulus", where="stimulus")
+
+        batch.set_groundtruth(ground_truth, period="decision", where="choice")
+
+        return trials
+
     def _step(self, action):
         new_trial = False
         terminated = False
@@ -6,7 +6,9 @@ import neurogym as ngym
 from neurogym import spaces
 from neurogym.core import TrialWrapper
 from neurogym.utils import scheduler
-from neurogym.wrappers.block import ScheduleEnvs
+from neurogym.utils.random import make_rng, spawn
+from neurogym.utils.scoring import FixationDecisionRule
+from neurogym.wrappers.block import ScheduleEnvs, _have_equal_shape
 
 
 def _get_dist(original_dist):
@@ -50,6 +52,10 @@ class _MultiModalityStimulus(TrialWrapper):
     def new_trial(self, **kwargs):
         return self.env.new_trial(**kwargs)
 
+    def new_trials(self, n, **kwargs):
+        # The task writes its stimulus into the modality through its observation space, so it generates the batch
+        return self.unwrapped._new_trials_batch(n, **kwargs)  # noqa: SLF001
+
 
 class _Reach(ngym.TrialEnv):
     """Anti-response task.
@@ -65,6 +71,8 @@ class _Reach(ngym.TrialEnv):
         "tags": ["perceptual", "steps action space"],
     }
 
+    reward_rule = FixationDecisionRule()
+
     def __init__(
         self,
         dt=100,
@@ -136,6 +144,35 @@ class _Reach(ngym.TrialEnv):
 
         return trial
 
+    def _new_trials(self, batch, **kwargs):
+        """Batched version of _new_trial, see TrialEnv.new_trials."""
+        # Trial info
+        trials = {
+            "ground_truth": self.rng.choice(self.choices, size=batch.n),
+            "anti": np.full(batch.n, self.anti),
+        }
+        trials.update(kwargs)
+
+        ground_truth = trials["ground_truth"].astype(int)
+        stim_theta = self.theta[ground_truth]
+        stim_theta = np.where(trials["anti"].astype(bool), np.mod(stim_theta + np.pi, 2 * np.pi), stim_theta)
+        stim = _gaussianbump(stim_theta[:, None], self.theta, 1)
+
+        if not self.reaction:
+            batch.add_period(["fixation", "stimulus", "delay", "decision"])
+
+            batch.add_ob(1, period=["fixation", "stimulus", "delay"], where="fixation")
+            batch.add_ob(stim, "stimulus", where="stimulus")
+        else:
+            batch.add_period(["fixation", "decision"])
+
+            batch.add_ob(1, period="fixation", where="fixation")
+            batch.add_ob(stim, "decision", where="stimulus")
+
+        batch.set_groundtruth(ground_truth, period="decision", where="choice")
+
+        return trials
+
     def _step(self, action):
         new_trial = False
         terminated = False
@@ -173,6 +210,8 @@ class _DMFamily(ngym.TrialEnv):
     which one has a higher frequency.
     """
 
+    reward_rule = FixationDecisionRule()
+
     def __init__(
         self,
         dt=100,
@@ -304,6 +343,66 @@ class _DMFamily(ngym.TrialEnv):
 
         return trial
 
+    def _add_singlemods(self, batch, trials, mod=1) -> None:
+        """Batched version of _add_singlemod."""
+        mod = f"_mod{mod}"
+        cohs = np.asarray(self.cohs)
+
+        if self.delaycomparison:
+            period1, period2 = "stim1", "stim2"
+            # Two different coherences per trial, shifting the first by 1 to len(cohs) - 1 positions
+            i_coh1 = self.rng.choice(len(cohs), size=batch.n)
+            i_coh2 = (i_coh1 + self.rng.choice(np.arange(1, len(cohs)), size=batch.n)) % len(cohs)
+            trials[f"coh1{mod}"] = coh1 = cohs[i_coh1]
+            trials[f"coh2{mod}"] = coh2 = cohs[i_coh2]
+        else:
+            period1, period2 = "stimulus", "stimulus"
+            coh = self.rng.choice(cohs, size=batch.n) * self.rng.choice([-1, +1], size=batch.n)
+            trials[f"coh1{mod}"] = coh1 = 0.5 + coh / 2
+            trials[f"coh2{mod}"] = coh2 = 0.5 - coh / 2
+
+        stim = _gaussianbump(trials["theta1"][:, None], self.theta, coh1[:, None])
+        batch.add_ob(stim, period1, where=f"stimulus{mod}")
+        stim = _gaussianbump(trials["theta2"][:, None], self.theta, coh2[:, None])
+        batch.add_ob(stim, period2, where=f"stimulus{mod}")
+
+    def _new_trials(self, batch, **kwargs):
+        """Batched version of _new_trial, see TrialEnv.new_trials."""
+        # Two different directions per trial, shifting the first by 1 to dim_ring - 1 positions
+        n_choices = len(self.choices)
+        i_theta1 = self.rng.choice(self.choices, size=batch.n)
+        i_theta2 = (i_theta1 + self.rng.choice(np.arange(1, n_choices), size=batch.n)) % n_choices
+        trials = {"theta1": self.theta[i_theta1], "theta2": self.theta[i_theta2]}
+
+        # Periods
+        if self.delaycomparison:
+            periods = ["fixation", "stim1", "delay", "stim2", "decision"]
+        else:
+            periods = ["fixation", "stimulus", "decision"]
+        batch.add_period(periods)
+
+        batch.add_ob(1, where="fixation")
+        batch.set_ob(0, "decision")
+        if self.delaycomparison:
+            batch.add_randn(0, self.sigma, ["stim1", "stim2"])
+        else:
+            batch.add_randn(0, self.sigma, ["stimulus"])
+
+        coh1, coh2 = np.zeros(batch.n), np.zeros(batch.n)
+        if self.stim_mod1:
+            self._add_singlemods(batch, trials, mod=1)
+            coh1 += self.w_mod1 * trials["coh1_mod1"]
+            coh2 += self.w_mod1 * trials["coh2_mod1"]
+        if self.stim_mod2:
+            self._add_singlemods(batch, trials, mod=2)
+            coh1 += self.w_mod2 * trials["coh1_mod2"]
+            coh2 += self.w_mod2 * trials["coh2_mod2"]
+
+        i_target = np.where(coh1 + self.rng.uniform(-1e-6, 1e-6, size=batch.n) > coh2, i_theta1, i_theta2)
+        batch.set_groundtruth(i_target, period="decision", where="choice")
+
+        return trials
+
     def _step(self, action):
         # ---------------------------------------------------------------------
         # Reward and inputs
@@ -349,6 +448,8 @@ class _DelayMatch1DResponse(ngym.TrialEnv):
         "tags": ["perceptual", "working memory", "two-alternative", "supervised"],
     }
 
+    reward_rule = FixationDecisionRule()
+
     def __init__(
         self,
         dt=100,
@@ -447,6 +548,47 @@ class _DelayMatch1DResponse(ngym.TrialEnv):
 
         return trial
 
+    def _new_trials(self, batch, **kwargs):
+        """Batched version of _new_trial, see TrialEnv.new_trials."""
+        # Trial info
+        trials = {
+            "ground_truth": self.rng.choice(self.choices, size=batch.n),
+        }
+        trials.update(kwargs)
+
+        match = trials["ground_truth"] == "match"
+        i_sample_theta = self.rng.choice(self.dim_ring, size=batch.n)
+        if self.matchto == "category":
+            sample_category = (i_sample_theta > self.half_ring) * 1
+            test_category = np.where(match, sample_category, 1 - sample_category)
+            i_test_theta = self.rng.choice(self.half_ring, size=batch.n)
+            i_test_theta += test_category * self.half_ring
+        else:
+            # non-match is 180 degree apart
+            i_test_theta = np.where(match, i_sample_theta, np.mod(i_sample_theta + self.half_ring, self.dim_ring))
+
+        trials["sample_theta"] = sample_theta = self.theta[i_sample_theta]
+        trials["test_theta"] = test_theta = self.theta[i_test_theta]
+
+        stim_sample = _gaussianbump(sample_theta[:, None], self.theta, 1)
+        stim_test = _gaussianbump(test_theta[:, None], self.theta, 1)
+
+        # Periods
+        batch.add_period(["fixation", "sample", "delay", "test", "decision"])
+
+        batch.add_ob(1, where="fixation")
+        batch.set_ob(0, "decision", where="fixation")
+        batch.add_ob(stim_sample, "sample", where="stimulus")
+        batch.add_ob(stim_test, "test", where="stimulus")
+        batch.add_randn(0, self.sigma, ["sample", "test"], where="stimulus")
+
+        # Respond to the test stimulus in go trials, keep fixating otherwise
+        go = match == self.matchgo
+        choice = np.asarray(list(self.action_space.name["choice"]))
+        batch.set_groundtruth(np.where(go, choice[i_test_theta], 0), period="decision")
+
+        return trials
+
     def _step(self, action, **kwargs):
         new_trial = False
         terminated = False
@@ -625,3 +767,247 @@ def dmc(**kwargs):
 
 def dnmc(**kwargs):
     return _dlymatch(matchto="category", matchgo=False, **kwargs)
+
+
+class MixedTaskDataset:
+    """Iterable dataset of batches mixing the tasks of the collection.
+
+    Returns the same arrays as neurogym.Dataset over ScheduleEnvs(envs,
+    schedule, env_input=True), with one rule input per task appended to the
+    observations, but the trials of each batch are generated at once: the
+    task of each trial is sampled from p, and the trials of each task, and
+    modality for the tasks with two, are generated together with
+    TrialEnv.new_trials. The rule inputs are then set in place.
+
+    Unlike the schedules of ScheduleEnvs, the tasks, and the modalities of a
+    task, are sampled independently for each trial.
+
+    Args:
+        tasks: list of env ids of the yang19 collection, default all of them,
+            in the order of their rule inputs
+        env_kwargs: dict, kwargs of all tasks, e.g. dt or dim_ring
+        p: array of the probability of each task, default uniform
+        batch_size: int, batch size
+        seq_len: int, sequence length in 'stream' mode, default the length of
+            the longest of 100 trials
+        batch_first: bool, if True, return (batch, seq_len, n_units)
+        cache_len: int, number of steps of each batch element in the cache in
+            'stream' mode, default as many as fit in cache_bytes
+        cache_bytes: int, memory budget of the cache in bytes
+        trial_info: bool, if True, also return the trial_start, trial_id and
+            mask arrays, see neurogym.Dataset. Implied by mode='trial'.
+        mode: str, 'stream' or 'trial', see neurogym.Dataset. In 'trial' mode,
+            each batch holds batch_size new trials, not bucketed by length.
+        seed: seed of the tasks and of the sampling of tasks, see seed
+
+    Attributes:
+        task_ids: np array, in 'trial' mode, index in tasks of the task of each
+            trial of the last batch
+    """
+
+    def __init__(
+        self,
+        tasks=None,
+        env_kwargs=None,
+        p=None,
+        batch_size=1,
+        seq_len=None,
+        batch_first=False,
+        cache_len=None,
+        cache_bytes=2**20,
+        trial_info=False,
+        mode="stream",
+        seed=None,
+    ) -> None:
+        if mode not in ("stream", "trial"):
+            msg = f"{mode=} must be 'stream' or 'trial'."
+            raise ValueError(msg)
+        collection = ngym.get_collection("yang19")
+        self.tasks = collection if tasks is None else list(tasks)
+        for task in self.tasks:
+            if task not in collection:
+                msg = f"{task=} must be one of {collection}."
+                raise ValueError(msg)
+        self.p = None if p is None else np.asarray(p, dtype=float)
+        if self.p is not None and self.p.shape != (len(self.tasks),):
+            msg = f"p must have one probability per task, got {self.p.shape=} for {len(self.tasks)} tasks."
+            raise ValueError(msg)
+
+        # TrialEnvs of each task, one per modality, that write their stimulus into their modality
+        self._envs = []
+        for task in self.tasks:
+            env = globals()[task.removeprefix("yang19.").removesuffix("-v0")](**(env_kwargs or {}))
+            self._envs.append(env.envs if isinstance(env, ScheduleEnvs) else [env])
+        envs = [env for task_envs in self._envs for env in task_envs]
+        _have_equal_shape(envs)
+        env = envs[0]
+        self._ob_dim = env.observation_space.shape[0]
+        self.observation_space = spaces.Box(
+            -np.inf,
+            np.inf,
+            shape=(self._ob_dim + len(self.tasks),),
+            dtype=env.observation_space.dtype,
+        )
+        self.action_space = env.action_space
+
+        self.batch_size = batch_size
+        self.batch_first = batch_first
+        self.mode = mode
+        self.trial_info = trial_info or mode == "trial"
+        self.task_ids = None
+        self._cache_arrays = None
+        self.seed(seed)
+
+        if mode == "trial":
+            return
+        # Lengths of 100 trials, then seed again so that they do not shift the trials of the batches
+        lengths = self._trials(100)[2]
+        self.seed(seed)
+        self._mean_length = lengths.mean()
+        if seq_len is None:
+            seq_len = int(lengths.max())
+        obs_shape = self.observation_space.shape
+        action_shape = self.action_space.shape
+        if cache_len is None:
+            step_bytes = np.prod(obs_shape) * self.observation_space.dtype.itemsize
+            step_bytes += np.prod(action_shape) * self.action_space.dtype.itemsize
+            if self.trial_info:
+                step_bytes += np.dtype(bool).itemsize + np.dtype(np.int64).itemsize
+            cache_len = cache_bytes / step_bytes / batch_size
+        self.seq_len = seq_len
+        self._cache_len = int((1 + (cache_len // seq_len)) * seq_len)
+        if batch_first:
+            shape1, shape = [batch_size, seq_len], [batch_size, self._cache_len]
+        else:
+            shape1, shape = [seq_len, batch_size], [self._cache_len, batch_size]
+        cache_arrays = [
+            np.zeros(shape + list(obs_shape), dtype=self.observation_space.dtype),
+            np.zeros(shape + list(action_shape), dtype=self.action_space.dtype),
+        ]
+        if self.trial_info:
+            cache_arrays += [np.zeros(shape, dtype=bool), np.zeros(shape, dtype=np.int64)]
+            self._mask = np.ones(shape1, dtype=bool)  # no padding in 'stream' mode
+        self._cache_arrays = cache_arrays
+        self._cache()
+
+    def seed(self, seed=None) -> None:
+        """Seed the tasks, with independent child seeds, and the sampling of tasks.
+
+        In 'stream' mode, the cache is refilled, so that the next batch is the
+        first one of seed.
+        """
+        envs = [env for task_envs in self._envs for env in task_envs]
+        *seeds, seed_sampling = spawn(seed, len(envs) + 1)
+        for env, seed_env in zip(envs, seeds, strict=True):
+            env.unwrapped.seed(seed_env)
+        self._rng = make_rng(seed_sampling)
+        self._num_trials = 0
+        self._trial_counts = np.zeros(self.batch_size, dtype=np.int64)
+        if self._cache_arrays is not None:
+            self._cache()
+
+    def _trials(self, n):
+        """Generate n trials of sampled tasks.
+
+        Returns:
+            inputs: np array (n, T_max, ob_dim + len(tasks)), zero padded
+            target: np array (n, T_max, *action_shape), zero padded
+            lengths: np array (n,), number of steps of each trial
+            task_ids: np array (n,), index of the task of each trial
+        """
+        task_ids = self._rng.choice(len(self.tasks), size=n, p=self.p)
+        groups = []
+        lengths = np.zeros(n, dtype=int)
+        for i_task in np.unique(task_ids):
+            ind = np.flatnonzero(task_ids == i_task)
+            task_envs = self._envs[i_task]
+            i_envs = self._rng.choice(len(task_envs), size=len(ind))
+            for i_env, env in enumerate(task_envs):
+                ind_env = ind[i_envs == i_env]
+                if len(ind_env):
+                    batch = env.new_trials(len(ind_env))
+                    groups.append((ind_env, batch))
+                    lengths[ind_env] = batch.lengths
+
+        t_max = int(lengths.max(initial=0))
+        inputs = np.zeros((n, t_max, *self.observation_space.shape), dtype=self.observation_space.dtype)
+        target = np.zeros((n, t_max, *self.action_space.shape), dtype=self.action_space.dtype)
+        for ind, batch in groups:
+            t_batch = batch.ob.shape[1]
+            inputs[ind, :t_batch, : self._ob_dim] = batch.ob
+            target[ind, :t_batch] = batch.gt
+        # Rule inputs, 1 in the column of the task during the trial
+        mask = np.arange(t_max) < lengths[:, None]
+        inputs[np.arange(n)[:, None], np.arange(t_max), (self._ob_dim + task_ids)[:, None]] = mask
+        return inputs, target, lengths, task_ids
+
+    def _cache(self) -> None:
+        """Fill the cache with trials, concatenated along each batch element.
+
+        Each round generates enough trials for the batch elements that are not
+        full, given the mean trial length, in a single call of _trials. Trials
+        are cut at the end of the cache, and those past it are dropped.
+        """
+        inputs, target, *trial_info = self._cache_arrays
+        seq_start = np.zeros(self.batch_size, dtype=int)
+        while len(active := np.flatnonzero(seq_start < self._cache_len)):
+            counts = np.ceil((self._cache_len - seq_start[active]) / self._mean_length).astype(int)
+            owner = np.repeat(active, counts)
+            trial_inputs, trial_target, lengths, _ = self._trials(len(owner))
+            # Start of each trial in the sequence of its batch element
+            ends = np.cumsum(lengths)
+            first = np.repeat(np.cumsum(counts) - counts, counts)
+            starts = seq_start[owner] + ends - lengths - (ends[first] - lengths[first])
+            lengths = np.clip(self._cache_len - starts, 0, lengths)
+            i_trial, t_trial = np.nonzero(np.arange(trial_target.shape[1]) < lengths[:, None])
+            b_ind, t_ind = owner[i_trial], starts[i_trial] + t_trial
+            index = (b_ind, t_ind) if self.batch_first else (t_ind, b_ind)
+            inputs[index] = trial_inputs[i_trial, t_trial]
+            target[index] = trial_target[i_trial, t_trial]
+            kept = lengths > 0
+            if trial_info:
+                trial_start, trial_id = trial_info
+                numbers = self._trial_counts[owner] + np.arange(len(owner)) - first
+                trial_start[index] = t_trial == 0
+                trial_id[index] = numbers[i_trial]
+                np.add.at(self._trial_counts, owner[kept], 1)
+            np.add.at(seq_start, owner, lengths)
+        self._seq_start = 0
+
+    def __iter__(self):
+        return self
+
+    def __call__(self):
+        return self.__next__()
+
+    def __next__(self):
+        if self.mode == "trial":
+            return self._trial_batch()
+
+        seq_end = self._seq_start + self.seq_len
+        if seq_end >= self._cache_len:
+            self._cache()
+            seq_end = self.seq_len
+        seq = slice(self._seq_start, seq_end)
+        arrays = [array[:, seq] if self.batch_first else array[seq] for array in self._cache_arrays]
+        self._seq_start = seq_end
+        if not self.trial_info:
+            return arrays[0], arrays[1]
+        inputs, target, trial_start, trial_id = arrays
+        return inputs, target, {"trial_start": trial_start, "trial_id": trial_id, "mask": self._mask}
+
+    def _trial_batch(self):
+        """Batch of batch_size new trials, padded with zeros to the longest trial."""
+        inputs, target, lengths, self.task_ids = self._trials(self.batch_size)
+        seq_len = target.shape[1]
+        mask = np.arange(seq_len) < lengths[:, None]
+        trial_start = np.zeros_like(mask)
+        trial_start[:, 0] = True
+        ids = self._num_trials + np.arange(self.batch_size)
+        self._num_trials += self.batch_size
+        trial_id = np.repeat(ids[:, None], seq_len, axis=1)
+        arrays = [inputs, target, trial_start, trial_id, mask]
+        if not self.batch_first:
+            arrays = [array.swapaxes(0, 1) for array in arrays]
+        inputs, target, trial_start, trial_id, mask = arrays
+        return inputs, target, {"trial_start": trial_start, "trial_id": trial_id, "mask": mask}
@@ -2,6 +2,7 @@ import numpy as np
 
 import neurogym as ngym
 from neurogym import spaces
+from neurogym.utils.scoring import FixationDecisionRule
 
 
 class SingleContextDecisionMaking(ngym.TrialEnv):
@@ -27,6 +28,8 @@ class SingleContextDecisionMaking(ngym.TrialEnv):
         "tags": ["perceptual", "context dependent", "two-alternative", "supervised"],
     }
 
+    reward_rule = FixationDecisionRule(reward_fail=False)
+
     def __init__(
         self,
         dt=100,
@@ -117,6 +120,45 @@ class SingleContextDecisionMaking(ngym.TrialEnv):
 
         return trial
 
+    def _new_trials(self, batch, **kwargs):
+        """Batched version of _new_trial, see TrialEnv.new_trials."""
+        # Trial
+        trials = {
+            "ground_truth": self.rng.choice(self.choices, size=batch.n),
+            "other_choice": self.rng.choice(self.choices, size=batch.n),
+            "context": np.full(batch.n, self.context),
+            "coh_0": self.rng.choice(self.cohs, size=batch.n),
+            "coh_1": self.rng.choice(self.cohs, size=batch.n),
+        }
+        trials.update(kwargs)
+
+        ground_truth = trials["ground_truth"].astype(int)
+        other_choice = trials["other_choice"].astype(int)
+        swap = trials["context"] == 1
+        choice_0 = np.where(swap, other_choice, ground_truth)
+        choice_1 = np.where(swap, ground_truth, other_choice)
+        coh_0 = trials["coh_0"].astype(float)
+        coh_1 = trials["coh_1"].astype(float)
+
+        stim_theta_0 = self.theta[choice_0]
+        stim_theta_1 = self.theta[choice_1]
+
+        # Periods
+        periods = ["fixation", "stimulus", "delay", "decision"]
+        batch.add_period(periods)
+
+        batch.add_ob(1, where="fixation")
+        stim = np.cos(self.theta - stim_theta_0[:, None]) * (coh_0[:, None] / 200) + 0.5
+        batch.add_ob(stim, "stimulus", where="stimulus_mod1")
+        stim = np.cos(self.theta - stim_theta_1[:, None]) * (coh_1[:, None] / 200) + 0.5
+        batch.add_ob(stim, "stimulus", where="stimulus_mod2")
+        batch.add_randn(0, self.sigma, "stimulus")
+        batch.set_ob(0, "decision")
+
+        batch.set_groundtruth(ground_truth, period="decision", where="choice")
+
+        return trials
+
     def _step(self, action):
         ob = self.ob_now
         gt = self.gt_now
@@ -155,6 +197,8 @@ class ContextDecisionMaking(ngym.TrialEnv):
         "tags": ["perceptual", "context dependent", "two-alternative", "supervised"],
     }
 
+    reward_rule = FixationDecisionRule(reward_fail=False)
+
     def __init__(self, dt=100, rewards=None, timing=None, sigma=1.0) -> None:
         super().__init__(dt=dt)
 
@@ -246,6 +290,48 @@ class ContextDecisionMaking(ngym.TrialEnv):
 
         return trial
 
+    def _new_trials(self, batch, **kwargs):
+        """Batched version of _new_trial, see TrialEnv.new_trials."""
+        # Trial
+        trials = {
+            "ground_truth": self.rng.choice(self.choices, size=batch.n),
+            "other_choice": self.rng.choice(self.choices, size=batch.n),
+            "context": self.rng.choice(self.contexts, size=batch.n),
+            "coh_0": self.rng.choice(self.cohs, size=batch.n),
+            "coh_1": self.rng.choice(self.cohs, size=batch.n),
+        }
+        trials.update(kwargs)
+
+        ground_truth = trials["ground_truth"].astype(int)
+        other_choice = trials["other_choice"].astype(int)
+        context = trials["context"].astype(int)
+        choice_0 = np.where(context == 1, other_choice, ground_truth)
+        choice_1 = np.where(context == 1, ground_truth, other_choice)
+        coh_0 = trials["coh_0"].astype(float)
+        coh_1 = trials["coh_1"].astype(float)
+
+        signed_coh_0 = np.where(choice_0 == 1, coh_0, -coh_0)
+        signed_coh_1 = np.where(choice_1 == 1, coh_1, -coh_1)
+
+        # Periods
+        periods = ["fixation", "stimulus", "delay", "decision"]
+        batch.add_period(periods)
+
+        batch.add_ob(1, where="fixation")
+        batch.add_ob((1 + signed_coh_0 / 100) / 2, period="stimulus", where="stim1_mod1")
+        batch.add_ob((1 - signed_coh_0 / 100) / 2, period="stimulus", where="stim2_mod1")
+        batch.add_ob((1 + signed_coh_1 / 100) / 2, period="stimulus", where="stim1_mod2")
+        batch.add_ob((1 - signed_coh_1 / 100) / 2, period="stimulus", where="stim2_mod2")
+        batch.add_randn(0, self.sigma, "stimulus")
+        batch.set_ob(0, "decision")
+
+        batch.add_ob((context == 0) * 1.0, where="context1")
+        batch.add_ob((context == 1) * 1.0, where="context2")
+
+        batch.set_groundtruth(ground_truth, "decision")
+
+        return trials
+
     def _step(self, action):
         ob = self.ob_now
         gt = self.gt_now
@@ -2,6 +2,7 @@ import numpy as np
 
 import neurogym as ngym
 from neurogym import spaces
+from neurogym.utils.scoring import FixationDecisionRule
 
 
 class DelayComparison(ngym.TrialEnv):
@@ -19,6 +20,8 @@ class DelayComparison(ngym.TrialEnv):
         "tags": ["perceptual", "working memory", "two-alternative", "supervised"],
     }
 
+    reward_rule = FixationDecisionRule()
+
     def __init__(self, dt=100, vpairs=None, rewards=None, timing=None, sigma=1.0) -> None:
         super().__init__(dt=dt)
 
@@ -93,6 +96,35 @@ class DelayComparison(ngym.TrialEnv):
 
         return trial
 
+    def _new_trials(self, batch, **kwargs):
+        """Batched version of _new_trial, see TrialEnv.new_trials."""
+        trials = {
+            "ground_truth": self.rng.choice(self.choices, size=batch.n),
+            "vpair": np.asarray(self.vpairs)[self.rng.choice(len(self.vpairs), size=batch.n)],
+        }
+        trials.update(kwargs)
+
+        ground_truth = trials["ground_truth"].astype(int)
+        vpair = np.asarray(trials["vpair"].tolist(), dtype=float)
+        v1 = np.where(ground_truth == 2, vpair[:, 1], vpair[:, 0])
+        v2 = np.where(ground_truth == 2, vpair[:, 0], vpair[:, 1])
+        trials["v1"] = v1
+        trials["v2"] = v2
+
+        # Periods
+        periods = ["fixation", "stimulus1", "delay", "stimulus2", "decision"]
+        batch.add_period(periods)
+
+        batch.add_ob(1, where="fixation")
+        batch.add_ob(self.represent(v1), "stimulus1", where="stimulus")
+        batch.add_ob(self.represent(v2), "stimulus2", where="stimulus")
+        batch.set_ob(0, "decision")
+        batch.add_randn(0, self.sigma, ["stimulus1", "stimulus2"])
+
+        batch.set_groundtruth(ground_truth, "decision")
+
+        return trials
+
     def represent(self, v):
         """Input representation of stimulus value."""
         # Scale to be between 0 and 1
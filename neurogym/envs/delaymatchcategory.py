@@ -2,6 +2,7 @@ import numpy as np
 
 import neurogym as ngym
 from neurogym import spaces
+from neurogym.utils.scoring import FixationDecisionRule
 
 
 class DelayMatchCategory(ngym.TrialEnv):
@@ -23,6 +24,8 @@ class DelayMatchCategory(ngym.TrialEnv):
         "tags": ["perceptual", "working memory", "two-alternative", "supervised"],
     }
 
+    reward_rule = FixationDecisionRule(decision="test")
+
     def __init__(self, dt=100, rewards=None, timing=None, sigma=1.0, dim_ring=2) -> None:
         super().__init__(dt=dt)
         self.choices = ["match", "non-match"]  # match, non-match
@@ -87,6 +90,40 @@ class DelayMatchCategory(ngym.TrialEnv):
 
         return trial
 
+    def _new_trials(self, batch, **kwargs):
+        """Batched version of _new_trial, see TrialEnv.new_trials."""
+        # Trial info
+        trials = {
+            "ground_truth": self.rng.choice(self.choices, size=batch.n),
+            "sample_category": self.rng.choice([0, 1], size=batch.n),
+        }
+        trials.update(**kwargs)
+
+        match = trials["ground_truth"] == "match"
+        sample_category = trials["sample_category"].astype(int)
+        test_category = np.where(match, sample_category, 1 - sample_category)
+
+        sample_theta = (sample_category + self.rng.rand(batch.n)) * np.pi
+        test_theta = (test_category + self.rng.rand(batch.n)) * np.pi
+
+        stim_sample = np.cos(self.theta - sample_theta[:, None]) * 0.5 + 0.5
+        stim_test = np.cos(self.theta - test_theta[:, None]) * 0.5 + 0.5
+
+        # Periods
+        periods = ["fixation", "sample", "first_delay", "test"]
+        batch.add_period(periods)
+
+        batch.add_ob(1, where="fixation")
+        batch.set_ob(0, "test", where="fixation")
+        batch.add_ob(stim_sample, "sample", where="stimulus")
+        batch.add_ob(stim_test, "test", where="stimulus")
+        batch.add_randn(0, self.sigma, ["sample", "test"], where="stimulus")
+
+        name = self.action_space.name
+        batch.set_groundtruth(np.where(match, name["match"], name["non-match"]), "test")
+
+        return trials
+
     def _step(self, action, **kwargs):
         new_trial = False
         terminated = False
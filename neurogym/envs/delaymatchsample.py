@@ -2,6 +2,7 @@ import numpy as np
 
 import neurogym as ngym
 from neurogym import spaces
+from neurogym.utils.scoring import FixationDecisionRule
 
 
 class DelayMatchSample(ngym.TrialEnv):
@@ -21,6 +22,8 @@ class DelayMatchSample(ngym.TrialEnv):
         "tags": ["perceptual", "working memory", "two-alternative", "supervised"],
     }
 
+    reward_rule = FixationDecisionRule()
+
     def __init__(self, dt=100, rewards=None, timing=None, sigma=1.0, dim_ring=2) -> None:
         super().__init__(dt=dt)
         self.choices = [1, 2]
@@ -86,6 +89,36 @@ class DelayMatchSample(ngym.TrialEnv):
 
         return trial
 
+    def _new_trials(self, batch, **kwargs):
+        """Batched version of _new_trial, see TrialEnv.new_trials."""
+        # Trial
+        trials = {
+            "ground_truth": self.rng.choice(self.choices, size=batch.n),
+            "sample_theta": self.rng.choice(self.theta, size=batch.n),
+        }
+        trials.update(kwargs)
+
+        ground_truth = trials["ground_truth"].astype(int)
+        sample_theta = trials["sample_theta"].astype(float)
+        test_theta = np.where(ground_truth == 1, sample_theta, np.mod(sample_theta + np.pi, 2 * np.pi))
+        trials["test_theta"] = test_theta
+
+        stim_sample = np.cos(self.theta - sample_theta[:, None]) * 0.5 + 0.5
+        stim_test = np.cos(self.theta - test_theta[:, None]) * 0.5 + 0.5
+
+        # Periods
+        batch.add_period(["fixation", "sample", "delay", "test", "decision"])
+
+        batch.add_ob(1, where="fixation")
+        batch.set_ob(0, "decision", where="fixation")
+        batch.add_ob(stim_sample, "sample", where="stimulus")
+        batch.add_ob(stim_test, "test", where="stimulus")
+        batch.add_randn(0, self.sigma, ["sample", "test"], where="stimulus")
+
+        batch.set_groundtruth(ground_truth, "decision")
+
+        return trials
+
     def _step(self, action):
         new_trial = False
         terminated = False
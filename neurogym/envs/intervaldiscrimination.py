@@ -2,6 +2,7 @@ import numpy as np
 
 import neurogym as ngym
 from neurogym import spaces
+from neurogym.utils.scoring import FixationDecisionRule
 
 
 # TODO: Getting duration is not intuitive, not clear to people
@@ -28,6 +29,8 @@ class IntervalDiscrimination(ngym.TrialEnv):
         ],
     }
 
+    reward_rule = FixationDecisionRule()
+
     def __init__(self, dt=80, rewards=None, timing=None) -> None:
         super().__init__(dt=dt)
         # Rewards
@@ -82,6 +85,30 @@ class IntervalDiscrimination(ngym.TrialEnv):
 
         return trial
 
+    def _new_trials(self, batch, **kwargs):
+        """Batched version of _new_trial, see TrialEnv.new_trials."""
+        duration1 = self.sample_times("stim1", batch.n)
+        duration2 = self.sample_times("stim2", batch.n)
+        ground_truth = np.where(duration1 > duration2, 1, 2)
+        trials = {
+            "duration1": duration1,
+            "duration2": duration2,
+            "ground_truth": ground_truth,
+        }
+
+        periods = ["fixation", "stim1", "delay1", "stim2", "delay2", "decision"]
+        durations = [None, duration1, None, duration2, None, None]
+        batch.add_period(periods, duration=durations)
+
+        batch.add_ob(1, where="fixation")
+        batch.add_ob(1, "stim1", where="stim1")
+        batch.add_ob(1, "stim2", where="stim2")
+        batch.set_ob(0, "decision")
+
+        batch.set_groundtruth(ground_truth, "decision")
+
+        return trials
+
     def _step(self, action):
         # ---------------------------------------------------------------------
         # Reward and inputs
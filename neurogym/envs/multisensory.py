@@ -4,6 +4,7 @@ import numpy as np
 
 import neurogym as ngym
 from neurogym import spaces
+from neurogym.utils.scoring import FixationDecisionRule
 
 
 # TODO: This is not finished yet. Need to compare with original paper
@@ -26,6 +27,8 @@ class MultiSensoryIntegration(ngym.TrialEnv):
         "tags": ["perceptual", "two-alternative", "supervised"],
     }
 
+    reward_rule = FixationDecisionRule(reward_fail=False)
+
     def __init__(self, dt=100, rewards=None, timing=None, sigma=1.0, dim_ring=2) -> None:
         super().__init__(dt=dt)
 
@@ -94,6 +97,38 @@ class MultiSensoryIntegration(ngym.TrialEnv):
 
         return trial
 
+    def _new_trials(self, batch, **kwargs):
+        """Batched version of _new_trial, see TrialEnv.new_trials."""
+        # Trial info
+        trials = {
+            "ground_truth": self.rng.choice(self.choices, size=batch.n),
+            "coh": self.rng.choice(self.cohs, size=batch.n),
+            "coh_prop": self.rng.rand(batch.n),
+        }
+        trials.update(kwargs)
+
+        coh = trials["coh"].astype(float)
+        coh_0 = coh * trials["coh_prop"]
+        coh_1 = coh * (1 - trials["coh_prop"])
+        ground_truth = trials["ground_truth"].astype(int)
+        stim_theta = self.theta[ground_truth]
+
+        # Periods
+        periods = ["fixation", "stimulus", "decision"]
+        batch.add_period(periods)
+
+        batch.add_ob(1, where="fixation")
+        stim = np.cos(self.theta - stim_theta[:, None]) * (coh_0[:, None] / 200) + 0.5
+        batch.add_ob(stim, "stimulus", where="stimulus_mod1")
+        stim = np.cos(self.theta - stim_theta[:, None]) * (coh_1[:, None] / 200) + 0.5
+        batch.add_ob(stim, "stimulus", where="stimulus_mod2")
+        batch.add_randn(0, self.sigma, "stimulus")
+        batch.set_ob(0, "decision")
+
+        batch.set_groundtruth(ground_truth, period="decision", where="choice")
+
+        return trials
+
     def _step(self, action):
         ob = self.ob_now
         gt = self.gt_now
@@ -2,6 +2,7 @@ import numpy as np
 
 import neurogym as ngym
 from neurogym import spaces
+from neurogym.utils.scoring import FixationDecisionRule
 
 
 class PerceptualDecisionMaking(ngym.TrialEnv):
@@ -26,6 +27,8 @@ class PerceptualDecisionMaking(ngym.TrialEnv):
         "tags": ["perceptual", "two-alternative", "supervised"],
     }
 
+    reward_rule = FixationDecisionRule()
+
     def __init__(
         self,
         dt=100,
@@ -103,6 +106,33 @@ class PerceptualDecisionMaking(ngym.TrialEnv):
 
         return trial
 
+    def _new_trials(self, batch, **kwargs):
+        """Batched version of _new_trial, see TrialEnv.new_trials."""
+        # Trial info
+        trials = {
+            "ground_truth": self.rng.choice(self.choices, size=batch.n),
+            "coh": self.rng.choice(self.cohs, size=batch.n),
+        }
+        trials.update(kwargs)
+
+        coh = trials["coh"].astype(float)
+        ground_truth = trials["ground_truth"].astype(int)
+        stim_theta = self.theta[ground_truth]
+
+        # Periods
+        batch.add_period(["fixation", "stimulus", "delay", "decision"])
+
+        # Observations
+        batch.add_ob(1, period=["fixation", "stimulus", "delay"], where="fixation")
+        stim = np.cos(self.theta - stim_theta[:, None]) * (coh[:, None] / 200) + 0.5
+        batch.add_ob(stim, "stimulus", where="stimulus")
+        batch.add_randn(0, self.sigma, "stimulus", where="stimulus")
+
+        # Ground truth
+        batch.set_groundtruth(ground_truth, period="decision", where="choice")
+
+        return trials
+
     def _step(self, action):
         new_trial = False
         terminated = False
@@ -259,6 +289,8 @@ class PulseDecisionMaking(ngym.TrialEnv):
         "tags": ["perceptual", "two-alternative", "supervised"],
     }
 
+    reward_rule = FixationDecisionRule(fixation=None)
+
     def __init__(self, dt=10, rewards=None, timing=None, p_pulse=(0.3, 0.7), n_bin=6) -> None:
         super().__init__(dt=dt)
         self.p_pulse = p_pulse
@@ -323,6 +355,41 @@ class PulseDecisionMaking(ngym.TrialEnv):
 
         return trial
 
+    def _new_trials(self, batch, **kwargs):
+        """Batched version of _new_trial, see TrialEnv.new_trials."""
+        # Trial info
+        p1, p2 = self.p_pulse
+        swap = self.rng.rand(batch.n) < 0.5
+        p1, p2 = np.where(swap, p2, p1), np.where(swap, p1, p2)
+        pulse1 = (self.rng.random((batch.n, self.n_bin)) < p1[:, None]) * 1.0
+        pulse2 = (self.rng.random((batch.n, self.n_bin)) < p2[:, None]) * 1.0
+        trials = {"pulse1": pulse1, "pulse2": pulse2}
+        trials.update(kwargs)
+
+        n_pulse1 = pulse1.sum(axis=1)
+        n_pulse2 = pulse2.sum(axis=1) + self.rng.uniform(-0.1, 0.1, size=batch.n)
+        ground_truth = (n_pulse1 < n_pulse2).astype(int)
+        trials["ground_truth"] = ground_truth
+
+        # Periods
+        periods = ["fixation"]
+        for i in range(self.n_bin):
+            periods += [f"cue{i}", f"bin{i}"]
+        periods += ["decision"]
+        batch.add_period(periods)
+
+        # Observations
+        batch.add_ob(1, where="fixation")
+        for i in range(self.n_bin):
+            batch.add_ob(pulse1[:, i], f"cue{i}", where=1)
+            batch.add_ob(pulse2[:, i], f"cue{i}", where=2)
+        batch.set_ob(0, "decision")
+
+        # Ground truth
+        batch.set_groundtruth(ground_truth, period="decision", where="choice")
+
+        return trials
+
     def _step(self, action):
         new_trial = False
         terminated = False
@@ -1,7 +1,6 @@
 """Random dot motion task."""
 
 import numpy as np
-from psychopy import visual
 
 from neurogym import spaces
 
@@ -14,6 +13,7 @@ class RandomDotMotion(PsychopyEnv):
     Args:
         stim_scale: Controls the difficulty of the experiment. (def: 1., float)
         dim_ring: int, dimension of ring input and output
+        backend: 'psychopy' or 'numpy', see PsychopyEnv
     """
 
     metadata = {  # noqa: RUF012
@@ -31,10 +31,11 @@ class RandomDotMotion(PsychopyEnv):
         timing=None,
         stim_scale=1.0,
         dim_ring=2,
+        backend=None,
     ) -> None:
         if win_kwargs is None:
             win_kwargs = {"size": (100, 100)}
-        super().__init__(dt=dt, win_kwargs=win_kwargs)
+        super().__init__(dt=dt, win_kwargs=win_kwargs, backend=backend)
         # The strength of evidence, modulated by stim_scale
         self.cohs = np.array([0, 6.4, 12.8, 25.6, 51.2]) * stim_scale
 
@@ -75,7 +76,7 @@ class RandomDotMotion(PsychopyEnv):
         self.add_period(["fixation", "stimulus", "decision"])
 
         # Observations
-        stim = visual.DotStim(
+        stim = self.visual.DotStim(
             self.win,
             nDots=30,
             dotSize=1,
@@ -1,52 +1,164 @@
+import importlib.util
 import sys
 from typing import Any
 
 import numpy as np
-
-try:
-    from psychopy import visual
-except ImportError as e:
-    msg = "Psychopy is not installed."
-    raise ImportError(msg) from e
-
 from gymnasium import spaces
 
 import neurogym as ngym
+from neurogym.envs.psychopy import raster
+from neurogym.utils.cache import LRUCache
+
+BACKENDS = ["psychopy", "numpy"]
+# Default memory budget of the cache of frames of static stimuli, about 2000 frames of 100x100 pixels
+FRAME_CACHE_BYTES = 2**26
+# Attributes of psychopy stimuli that determine their static frame
+_PSYCHOPY_ATTRIBUTES = [
+    "start",
+    "end",
+    "lineWidth",
+    "lineColor",
+    "fillColor",
+    "color",
+    "pos",
+    "size",
+    "ori",
+    "sf",
+    "phase",
+    "contrast",
+    "opacity",
+    "tex",
+    "mask",
+    "vertices",
+    "text",
+    "height",
+]
+
+
+def _psychopy_visual():
+    try:
+        from psychopy import visual  # noqa: PLC0415
+    except ImportError as e:
+        msg = "Psychopy is not installed."
+        raise ImportError(msg) from e
+    return visual
+
+
+def _freeze(value):
+    if isinstance(value, np.ndarray):
+        return value.shape, tuple(value.ravel().tolist())
+    if isinstance(value, list | tuple):
+        return tuple(_freeze(item) for item in value)
+    return value
 
 
 class PsychopyEnv(ngym.TrialEnv):
-    """Superclass for environments with psychopy stimuli."""
+    """Superclass for environments with psychopy stimuli.
+
+    Args:
+        win_kwargs: dict, arguments of the window, e.g. size and color
+        backend: 'psychopy' to draw stimuli in a hidden psychopy window, or
+            'numpy' to render them with neurogym.envs.psychopy.raster, without
+            display or OpenGL. Default psychopy if installed, numpy otherwise.
+
+    Attributes:
+        frame_cache: LRUCache of the frames of static stimuli, keyed by their
+            parameters, so that repeated stimuli are only drawn once. Its
+            budget is FRAME_CACHE_BYTES, None to draw every stimulus.
+    """
 
-    def __init__(self, win_kwargs=None, *args, **kwargs) -> None:
+    def __init__(self, win_kwargs=None, *args, backend=None, **kwargs) -> None:
         super().__init__(*args, **kwargs)
+        if backend is None:
+            backend = "psychopy" if importlib.util.find_spec("psychopy") is not None else "numpy"
+        if backend not in BACKENDS:
+            msg = f"{backend=} must be one of {BACKENDS}."
+            raise ValueError(msg)
+        self.backend = backend
 
         # fix the bug when multi windows with different sizes in a batch
         win_kwargs_tmp: dict[str, Any] = (
             {"size": (100, 100), "color": "black"} if win_kwargs is None else win_kwargs.copy()
         )
 
-        if sys.platform == "darwin":
-            # TODO: Check if this works across platform
-            win_kwargs_tmp["size"] = tuple(int(dim) // 2 for dim in win_kwargs_tmp["size"])
-        # psychopy window kwargs can be supplied by 'win_kws'
-        self.win = visual.Window(**win_kwargs_tmp)
-        self.win.backend.winHandle.set_visible(False)
-        self.win.flip()
-        im = self.win._getFrame()  # noqa: SLF001
-        value = np.array(im)
+        if backend == "numpy":
+            # Module of the stimulus classes, the envs create their stimuli with self.visual
+            self.visual = raster
+            self.win = raster.Window(**win_kwargs_tmp)
+            value = self.win.render_background()
+        else:
+            self.visual = _psychopy_visual()
+            if sys.platform == "darwin":
+                # TODO: Check if this works across platform
+                win_kwargs_tmp["size"] = tuple(int(dim) // 2 for dim in win_kwargs_tmp["size"])
+            # psychopy window kwargs can be supplied by 'win_kws'
+            self.win = self.visual.Window(**win_kwargs_tmp)
+            self.win.backend.winHandle.set_visible(False)
+            self.win.flip()
+            im = self.win._getFrame()  # noqa: SLF001
+            value = np.array(im)
         self._default_ob_value = value[0, 0]  # corner pixel, array 3-channels
 
         ob_shape = (self.win.size[0], self.win.size[1], 3)
         self.observation_space = spaces.Box(0, 255, shape=ob_shape, dtype=np.uint8)
+        self.frame_cache: LRUCache | None = LRUCache(maxsize=None, maxbytes=FRAME_CACHE_BYTES)
+
+    def _is_stimulus(self, value):
+        if self.backend == "numpy":
+            return isinstance(value, raster.Stimulus)
+        return isinstance(value, self.visual.BaseVisualStim)
+
+    def _frames(self, value, n):
+        """Frames (n, H, W, 3) of a stimulus drawn on the background."""
+        if self.backend == "numpy":
+            return value.render(n, self.rng)
+        frames = []
+        for _ in range(n):
+            value.draw()
+            self.win.flip()
+            frames.append(np.array(self.win._getFrame()))  # noqa: SLF001
+        return np.stack(frames)
+
+    def _stimulus_key(self, value):
+        """Hashable parameters of a static stimulus and of the window, None if unknown."""
+        if self.backend == "numpy":
+            attributes = {name: item for name, item in vars(value).items() if name != "win"}
+        else:
+            attributes = {name: getattr(value, name, None) for name in _PSYCHOPY_ATTRIBUTES}
+        key = (
+            type(value).__name__,
+            _freeze(tuple(self.win.size)),
+            _freeze(self.win.color),
+            tuple(sorted((name, _freeze(item)) for name, item in attributes.items())),
+        )
+        try:
+            hash(key)
+        except TypeError:  # e.g. psychopy color objects
+            return None
+        return key
+
+    def _static_frame(self, value):
+        """Frame (H, W, 3) of a static stimulus, from the frame cache if drawn before.
+
+        The frame is read-only, as it may be shared with later trials.
+        """
+        key = self._stimulus_key(value) if self.frame_cache is not None else None
+        frame = self.frame_cache.get(key) if key is not None else None
+        if frame is None:
+            frame = self._frames(value, 1)[0]
+            frame.flags.writeable = False
+            if key is not None:
+                self.frame_cache.put(key, frame)
+        return frame
 
     def add_ob(self, value, period=None, where=None) -> None:
-        if isinstance(value, visual.BaseVisualStim):
+        if self._is_stimulus(value):
             if where is not None:
                 print(
                     "Warning: Setting where to values other than Nonehas no effect when adding PsychoPy stimuli",
                 )
 
-            if isinstance(value, visual.DotStim):
+            if isinstance(value, self.visual.DotStim):
                 # TODO: Check other types of stimuli as well
                 # These stimuli need to be drawn every frame
                 if not (isinstance(period, str) or period is None):
@@ -54,16 +166,9 @@ class PsychopyEnv(ngym.TrialEnv):
                     raise ValueError(msg)
 
                 ob = self.view_ob(period=period)
-                for i in range(ob.shape[0]):
-                    value.draw()
-                    self.win.flip()
-                    im = self.win._getFrame()  # noqa: SLF001
-                    ob[i] += np.array(im)
+                ob += self._frames(value, ob.shape[0])
             else:
-                # Static stimuli
-                value.draw()
-                self.win.flip()
-                im = self.win._getFrame()  # noqa: SLF001
-                super().add_ob(np.array(im), period, where)
+                # Static stimuli, one frame broadcast over the period
+                super().add_ob(self._static_frame(value), period, where)
         else:
             super().add_ob(value, period, where)
@@ -0,0 +1,329 @@
+"""Headless NumPy rendering of the psychopy stimuli used by the psychopy envs.
+
+The classes mirror the subset of psychopy.visual used by the envs, with the
+same arguments, so an env builds its stimuli from either module, see
+PsychopyEnv.visual. Coordinates are in psychopy 'norm' units, x and y in
+[-1, 1] with y upwards, and colors are psychopy rgb values in [-1, 1].
+
+Instead of drawing one frame per flip of an OpenGL window, a stimulus renders
+all the frames of a period at once as an array (T, H, W, 3), see
+Stimulus.render. Frames are H = win.size[1] rows by W = win.size[0] columns,
+as the frames grabbed from a psychopy window.
+"""
+
+import numpy as np
+
+COLORS = {"black": -1.0, "gray": 0.0, "grey": 0.0, "white": 1.0}
+
+
+def rgb(color):
+    """Psychopy rgb color, a name, a number or a 3-sequence, as an array (3,)."""
+    if isinstance(color, str):
+        color = COLORS[color.lower()]
+    return np.broadcast_to(np.asarray(color, dtype=float), (3,))
+
+
+def to_uint8(frames):
+    """Convert rgb frames in [-1, 1] to uint8 pixels as grabbed from a psychopy window."""
+    pixels = np.clip(frames, -1, 1)
+    pixels += 1
+    pixels *= 127.5
+    return np.rint(pixels, out=pixels).astype(np.uint8)
+
+
+class Window:
+    """Canvas replacing psychopy.visual.Window.
+
+    Args:
+        size: (width, height) in pixels
+        color: background color
+    """
+
+    def __init__(self, size=(800, 600), color=(0, 0, 0), **kwargs) -> None:
+        self.size = np.array(size, dtype=int)
+        self.color = color
+
+    def blank(self, n=1):
+        """Frames (n, H, W, 3) float32 of the background color."""
+        width, height = self.size
+        return np.broadcast_to(rgb(self.color).astype(np.float32), (n, height, width, 3)).copy()
+
+    def render_background(self):
+        """Frame (H, W, 3) uint8 of the background color."""
+        return to_uint8(self.blank(1))[0]
+
+    def pixels(self, x, y):
+        """Column and row coordinates of the points (x, y) in norm units, pixel centers are at .5."""
+        width, height = self.size
+        return (np.asarray(x) + 1) * width / 2, (1 - np.asarray(y)) * height / 2
+
+    def grid(self):
+        """Norm coordinates x (1, W) and y (H, 1) of the pixel centers."""
+        width, height = self.size
+        x = (np.arange(width) + 0.5) * 2 / width - 1
+        y = 1 - (np.arange(height) + 0.5) * 2 / height
+        return x[None, :], y[:, None]
+
+
+class Stimulus:
+    """Base class of the stimuli."""
+
+    def __init__(self, win) -> None:
+        self.win = win
+
+    def draw_on(self, frames, rng=None) -> None:
+        """Draw the stimulus on rgb frames (T, H, W, 3), in place."""
+        raise NotImplementedError
+
+    def render(self, n=1, rng=None):
+        """Frames (n, H, W, 3) uint8 of the stimulus on the background of the window.
+
+        Args:
+            n: int, number of frames
+            rng: random generator of stimuli with random elements, e.g. DotStim
+        """
+        frames = self.win.blank(n)
+        self.draw_on(frames, rng)
+        return to_uint8(frames)
+
+
+def _blend(frames, alpha, color) -> None:
+    """Blend color over frames with opacity alpha, broadcast to frames[..., 0]."""
+    alpha = alpha[..., None]
+    frames *= 1 - alpha
+    frames += alpha * color
+
+
+class Line(Stimulus):
+    """Line segment of lineWidth pixels, with a one pixel anti-aliased edge."""
+
+    def __init__(self, win, start=(-0.5, 0), end=(0.5, 0), lineWidth=1.5, lineColor=(1, 1, 1), **kwargs) -> None:  # noqa: N803
+        super().__init__(win)
+        self.start = start
+        self.end = end
+        self.lineWidth = lineWidth
+        self.lineColor = lineColor
+
+    def coverage(self):
+        """Fraction (H, W) of each pixel covered by the line."""
+        width, height = self.win.size
+        cols = np.arange(width)[None, :] + 0.5
+        rows = np.arange(height)[:, None] + 0.5
+        (x0, x1), (y0, y1) = self.win.pixels([self.start[0], self.end[0]], [self.start[1], self.end[1]])
+        dx, dy = x1 - x0, y1 - y0
+        length2 = dx**2 + dy**2
+        # Distance of the pixel centers to the segment
+        t = np.clip(((cols - x0) * dx + (rows - y0) * dy) / length2, 0, 1) if length2 > 0 else 0
+        distance = np.hypot(cols - x0 - t * dx, rows - y0 - t * dy)
+        return np.clip(self.lineWidth / 2 + 0.5 - distance, 0, 1)
+
+    def draw_on(self, frames, rng=None) -> None:  # noqa: ARG002
+        _blend(frames, self.coverage(), rgb(self.lineColor))
+
+
+class DotStim(Stimulus):
+    """Random dot kinematogram.
+
+    As psychopy.visual.DotStim, the dots move before each frame: signal dots
+    by speed in direction dir, noise dots according to noiseDots. Dots that
+    reach the end of their life of dotLife frames or leave the field are
+    replaced at random positions in the field. Positions are updated for all
+    dots at once, frame by frame, and all frames are rasterized at once.
+    """
+
+    def __init__(
+        self,
+        win,
+        nDots=1,  # noqa: N803
+        dotSize=2.0,  # noqa: N803
+        speed=0.5,
+        dotLife=3,  # noqa: N803
+        signalDots="same",  # noqa: N803
+        noiseDots="direction",  # noqa: N803
+        fieldShape="sqr",  # noqa: N803
+        fieldSize=(1.0, 1.0),  # noqa: N803
+        fieldPos=(0.0, 0.0),  # noqa: N803
+        coherence=0.5,
+        dir=0.0,  # noqa: A002
+        color=(1.0, 1.0, 1.0),
+        **kwargs,
+    ) -> None:
+        super().__init__(win)
+        if signalDots != "same" or noiseDots not in {"direction", "position", "walk"}:
+            msg = f"{signalDots=} and {noiseDots=} are not supported."
+            raise ValueError(msg)
+        self.nDots = nDots
+        self.dotSize = dotSize
+        self.speed = speed
+        self.dotLife = dotLife
+        self.noiseDots = noiseDots
+        self.fieldShape = fieldShape
+        self.fieldSize = np.broadcast_to(np.asarray(fieldSize, dtype=float), (2,))
+        self.fieldPos = np.asarray(fieldPos, dtype=float)
+        self.coherence = coherence
+        self.dir = dir
+        self.color = color
+
+    def _new_positions(self, n, rng):
+        """Positions (n, 2) uniform in the field, relative to fieldPos."""
+        if self.fieldShape in {"circle", "circular"}:
+            radius = np.sqrt(rng.uniform(0, 1, n))
+            angle = rng.uniform(0, 2 * np.pi, n)
+            xy = np.stack([radius * np.cos(angle), radius * np.sin(angle)], axis=1)
+        else:
+            xy = rng.uniform(-1, 1, (n, 2))
+        return xy * self.fieldSize / 2
+
+    def _outside(self, xy):
+        xy = xy / (self.fieldSize / 2)
+        if self.fieldShape in {"circle", "circular"}:
+            return (xy**2).sum(axis=1) > 1
+        return (np.abs(xy) > 1).any(axis=1)
+
+    def positions(self, n, rng):
+        """Positions (n, nDots, 2) of the dots in norm units in each frame."""
+        num = self.nDots
+        signal = np.arange(num) < int(self.coherence * num)
+        angle = np.full(num, np.deg2rad(self.dir))
+        angle[~signal] = rng.uniform(0, 2 * np.pi, (~signal).sum())
+        velocity = self.speed * np.stack([np.cos(angle), np.sin(angle)], axis=1)
+        life = np.abs(self.dotLife) * rng.uniform(0, 1, num)
+        xy = self._new_positions(num, rng)
+        out = np.empty((n, num, 2))
+        for t in range(n):
+            if self.noiseDots == "direction":
+                xy += velocity
+            else:
+                xy[signal] += velocity[signal]
+                noise = ~signal
+                if self.noiseDots == "position":
+                    xy[noise] = self._new_positions(noise.sum(), rng)
+                else:  # walk, in a new random direction at each frame
+                    walk = rng.uniform(0, 2 * np.pi, noise.sum())
+                    xy[noise] += self.speed * np.stack([np.cos(walk), np.sin(walk)], axis=1)
+            if self.dotLife > 0:
+                life -= 1
+                dead = life <= 0
+                life[dead] = self.dotLife
+            else:
+                dead = np.zeros(num, dtype=bool)
+            dead |= self._outside(xy)
+            xy[dead] = self._new_positions(dead.sum(), rng)
+            out[t] = xy
+        return out + self.fieldPos
+
+    def _pixels(self, n, rng):
+        """Frame, row and column indices of the pixels of the dots in n frames."""
+        rng = np.random.default_rng() if rng is None else rng
+        width, height = self.win.size
+        xy = self.positions(n, rng)
+        cols, rows = self.win.pixels(xy[..., 0], xy[..., 1])
+        # Square dots of dotSize pixels centered on the dot
+        size = max(1, round(self.dotSize))
+        offsets = np.arange(size) - (size - 1) / 2
+        cols = np.floor(cols[..., None, None] + offsets[None, :]).astype(int)
+        rows = np.floor(rows[..., None, None] + offsets[:, None]).astype(int)
+        frame = np.broadcast_to(np.arange(n)[:, None, None, None], rows.shape)
+        cols, rows = np.broadcast_arrays(cols, rows)
+        inside = (cols >= 0) & (cols < width) & (rows >= 0) & (rows < height)
+        return frame[inside], rows[inside], cols[inside]
+
+    def draw_on(self, frames, rng=None) -> None:
+        frames[self._pixels(frames.shape[0], rng)] = rgb(self.color)
+
+    def render(self, n=1, rng=None):
+        # Opaque dots, drawn on uint8 frames directly
+        background = self.win.render_background()
+        frames = np.broadcast_to(background, (n, *background.shape)).copy()
+        frames[self._pixels(n, rng)] = to_uint8(rgb(self.color))
+        return frames
+
+
+def _raised_cos(radius, fringe_width=0.2):
+    """Raised cosine mask of psychopy, 1 inside, 0 beyond radius 1, with a cosine fringe."""
+    edge = np.clip((radius - (1 - fringe_width)) / fringe_width, 0, 1)
+    return 0.5 * (1 + np.cos(np.pi * edge))
+
+
+class GratingStim(Stimulus):
+    """Sinusoidal grating in an envelope.
+
+    sf is in cycles per stimulus and phase in cycles, as for psychopy gratings
+    in norm units. Frames can have different contrasts and phases, see draw_on.
+    """
+
+    def __init__(
+        self,
+        win,
+        tex="sin",
+        mask=None,
+        pos=(0.0, 0.0),
+        size=None,
+        sf=None,
+        ori=0.0,
+        phase=(0.0, 0.0),
+        color=(1.0, 1.0, 1.0),
+        contrast=1.0,
+        opacity=1.0,
+        **kwargs,
+    ) -> None:
+        super().__init__(win)
+        if tex not in {"sin", "sqr"} or mask not in {None, "none", "circle", "gauss", "raisedCos"}:
+            msg = f"{tex=} and {mask=} are not supported."
+            raise ValueError(msg)
+        self.tex = tex
+        self.mask = mask
+        self.pos = np.asarray(pos, dtype=float)
+        self.size = np.broadcast_to(np.asarray(0.5 if size is None else size, dtype=float), (2,))
+        self.sf = np.broadcast_to(np.asarray(1.0 if sf is None else sf, dtype=float), (2,))
+        self.ori = ori
+        self.phase = phase
+        self.color = color
+        self.contrast = contrast
+        self.opacity = opacity
+
+    def _local(self):
+        """Coordinates u, v (H, W) in the stimulus, in [-0.5, 0.5] inside, rotated clockwise by ori."""
+        x, y = self.win.grid()
+        x = (x - self.pos[0]) / self.size[0]
+        y = (y - self.pos[1]) / self.size[1]
+        theta = np.deg2rad(self.ori)
+        return x * np.cos(theta) - y * np.sin(theta), x * np.sin(theta) + y * np.cos(theta)
+
+    def _envelope(self, u, v):
+        radius = 2 * np.hypot(u, v)
+        if self.mask == "raisedCos":
+            return _raised_cos(radius)
+        if self.mask == "circle":
+            return (radius <= 1).astype(float)
+        if self.mask == "gauss":
+            return np.exp(-((3 * radius) ** 2) / 2)
+        return ((np.abs(u) <= 0.5) & (np.abs(v) <= 0.5)).astype(float)
+
+    def draw_on(self, frames, rng=None, contrast=None, phase=None) -> None:  # noqa: ARG002
+        """Draw the grating on frames, in place.
+
+        Args:
+            frames: rgb frames (T, H, W, 3)
+            rng: unused
+            contrast: contrast of each frame, scalar or (T,), default self.contrast
+            phase: horizontal phase of each frame, scalar or (T,), default self.phase
+        """
+        n = frames.shape[0]
+        contrast = np.broadcast_to(self.contrast if contrast is None else contrast, (n,))
+        phase = np.broadcast_to(np.atleast_1d(self.phase)[0] if phase is None else phase, (n,))
+        u, v = self._local()
+        alpha = (self.opacity * self._envelope(u, v)).astype(frames.dtype)
+        # Texture coordinates of psychopy, in cycles
+        angle = 2 * np.pi * (self.sf[0] * u + self.sf[1] * v + 0.5)
+        shift = 2 * np.pi * np.asarray(phase, dtype=float)
+        if self.tex == "sin":
+            # sin(angle - shift) from the sines and cosines of each, without a sine per pixel of each frame
+            sin, cos = (np.sin(angle) * alpha).astype(frames.dtype), (np.cos(angle) * alpha).astype(frames.dtype)
+            wave = (contrast * np.cos(shift))[:, None, None].astype(frames.dtype) * sin
+            wave -= (contrast * np.sin(shift))[:, None, None].astype(frames.dtype) * cos
+        else:
+            wave = np.sign(np.sin(angle[None] - shift[:, None, None])) * (contrast[:, None, None] * alpha)
+        # The color of each pixel is color * wave, blended over the frame with opacity alpha
+        frames *= (1 - alpha)[..., None]
+        frames += wave[..., None] * rgb(self.color).astype(frames.dtype)
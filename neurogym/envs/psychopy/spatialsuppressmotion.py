@@ -6,7 +6,6 @@ import sys
 import numpy as np
 from gymnasium import spaces
 from numpy.polynomial.polynomial import polyfit
-from psychopy import visual
 from scipy.interpolate import interp1d
 
 from .psychopy_env import PsychopyEnv
@@ -28,6 +27,7 @@ class SpatialSuppressMotion(PsychopyEnv):
         <win_size>: size per image frame
         <timing>: millisecs, stimulus duration, default: 8.3 * 36 frames ~ 300 ms.
             This is the longest duration we need (i.e., probability reach ceilling)
+        <backend>: 'psychopy' or 'numpy', see PsychopyEnv
 
     Note that please input default seq_len = 36 frames when creating dataset object.
 
@@ -46,12 +46,13 @@ class SpatialSuppressMotion(PsychopyEnv):
         win_kwargs=None,
         timing=None,
         rewards=None,
+        backend=None,
     ) -> None:
         if timing is None:
             timing = {"stimulus": 300}
         if win_kwargs is None:
             win_kwargs = {"size": (100, 100)}
-        super().__init__(dt=dt, win_kwargs=win_kwargs)
+        super().__init__(dt=dt, win_kwargs=win_kwargs, backend=backend)
 
         # Rewards
         self.rewards = {"abort": -0.1, "correct": +1.0, "fail": 0.0}
@@ -131,10 +132,10 @@ class SpatialSuppressMotion(PsychopyEnv):
         trial["ground_truth"] = self.getgroundtruth(trial)
 
         # Observation
-        if sys.platform == "darwin":  # trick for darwin mac window
+        if sys.platform == "darwin" and self.backend == "psychopy":  # trick for darwin mac window
             diameter = trial["diameter"] * 2
 
-        grating1 = visual.GratingStim(
+        grating1 = self.visual.GratingStim(
             self.win,
             mask="raisedCos",
             opacity=1.0,
@@ -143,7 +144,7 @@ class SpatialSuppressMotion(PsychopyEnv):
             ori=45,
             contrast=trial["contrast"],
         )
-        grating2 = visual.GratingStim(
+        grating2 = self.visual.GratingStim(
             self.win,
             mask="raisedCos",
             opacity=0.5,
@@ -155,22 +156,31 @@ class SpatialSuppressMotion(PsychopyEnv):
 
         # create the movie
         ob = self.view_ob(period="stimulus")
-        for i in range(ob.shape[0]):
-            grating1.contrast = trial["contrast"] * profile[i]
-            # drift it, comp_direct control the direction
-            grating1.phase = comp_direct[0] * temporal_frequency * i * self.dt / 1000
-            grating1.draw()
-
-            grating2.contrast = trial["contrast"] * profile[i]
-            grating2.phase = comp_direct[1] * temporal_frequency * i * self.dt / 1000
-            grating2.draw()
-
-            self.win.flip()
-            im = self.win._getFrame()  # noqa: SLF001
-            im = np.array(im)  # convert it to numpy array, it is a nPix x nPix x 3 array
-
-            # Here we did not use .add_ob function of psychopyEnv object
-            ob[i] = im.copy()  # we switch the add, which seems wrong for image
+        if self.backend == "numpy":
+            # All frames at once, with the contrast and phase of each frame
+            frames = self.win.blank(ob.shape[0])
+            time = np.arange(ob.shape[0]) * self.dt / 1000
+            contrast = trial["contrast"] * profile[: ob.shape[0]]
+            grating1.draw_on(frames, contrast=contrast, phase=comp_direct[0] * temporal_frequency * time)
+            grating2.draw_on(frames, contrast=contrast, phase=comp_direct[1] * temporal_frequency * time)
+            ob[:] = self.visual.to_uint8(frames)
+        else:
+            for i in range(ob.shape[0]):
+                grating1.contrast = trial["contrast"] * profile[i]
+                # drift it, comp_direct control the direction
+                grating1.phase = comp_direct[0] * temporal_frequency * i * self.dt / 1000
+                grating1.draw()
+
+                grating2.contrast = trial["contrast"] * profile[i]
+                grating2.phase = comp_direct[1] * temporal_frequency * i * self.dt / 1000
+                grating2.draw()
+
+                self.win.flip()
+                im = self.win._getFrame()  # noqa: SLF001
+                im = np.array(im)  # convert it to numpy array, it is a nPix x nPix x 3 array
+
+                # Here we did not use .add_ob function of psychopyEnv object
+                ob[i] = im.copy()  # we switch the add, which seems wrong for image
 
         # Ground truth
         self.set_groundtruth(trial["ground_truth"], "stimulus")
@@ -2,7 +2,6 @@
 
 import numpy as np
 from gymnasium import spaces
-from psychopy import visual
 
 from .psychopy_env import PsychopyEnv
 
@@ -16,6 +15,7 @@ class VisualSearch(PsychopyEnv):
         delta_angle: float, diff. between sample and distractor angles
         delta_color: 3-tuple, diff. between sample and distractor RGB color
         line_width: float, line width
+        backend: 'psychopy' or 'numpy', see PsychopyEnv
     """
 
     metadata = {  # noqa: RUF012
@@ -36,10 +36,11 @@ class VisualSearch(PsychopyEnv):
         delta_angle=None,
         delta_color=None,
         line_width=3,
+        backend=None,
     ) -> None:
         if win_kwargs is None:
             win_kwargs = {"size": (100, 100)}
-        super().__init__(dt=dt, win_kwargs=win_kwargs)
+        super().__init__(dt=dt, win_kwargs=win_kwargs, backend=backend)
 
         # Rewards
         self.rewards = {"abort": -0.1, "correct": +1.0, "fail": 0.0}
@@ -109,7 +110,7 @@ class VisualSearch(PsychopyEnv):
             angle = trial["angles"][i]
             color = tuple(trial["colors"][i])
             start, end = self._line_startend(center, angle, self.length)
-            stim = visual.Line(
+            stim = self.visual.Line(
                 self.win,
                 lineWidth=self.lw,
                 lineColor=color,
@@ -120,7 +121,7 @@ class VisualSearch(PsychopyEnv):
 
             if i == 0:
                 start, end = self._line_startend(fixation, angle, self.length)
-                stim = visual.Line(
+                stim = self.visual.Line(
                     self.win,
                     lineWidth=self.lw,
                     lineColor=color,
@@ -1,4 +1,7 @@
+import ast
 import importlib
+import importlib.util
+import json
 from inspect import getmembers, isclass, isfunction
 from pathlib import Path
 
@@ -7,6 +10,9 @@ from packaging import version
 
 from neurogym.envs.collections import get_collection
 
+# Static registry of all envs, generated by _build_manifest, see write_manifest
+MANIFEST_PATH = Path(__file__).resolve().parent / "registry.json"
+
 
 def _get_envs(foldername=None, env_prefix=None, allow_list=None):
     """A helper function to get all environments in a folder.
@@ -90,21 +96,13 @@ NATIVE_ALLOW_LIST = [
     # FIXME: I have added scipy to requirements (for other reason), does this mean SpatialSuppressMotion is valid?
     # 'ToneDetection'  # TODO: Temporary removing until bug fixed # noqa: ERA001
 ]
-ALL_NATIVE_ENVS = _get_envs(
-    foldername=None,
-    env_prefix=None,
-    allow_list=NATIVE_ALLOW_LIST,
-)
-
 _psychopy_prefix = "neurogym.envs.psychopy."
-ALL_PSYCHOPY_ENVS = {
+PSYCHOPY_ENVS = {
     "psychopy.RandomDotMotion-v0": _psychopy_prefix + "perceptualdecisionmaking:RandomDotMotion",
     "psychopy.VisualSearch-v0": _psychopy_prefix + "visualsearch:VisualSearch",
     "psychopy.SpatialSuppressMotion-v0": _psychopy_prefix + "spatialsuppressmotion:SpatialSuppressMotion",
 }
 
-_contrib_name_prefix = "contrib."
-_contrib_prefix = "neurogym.envs.contrib."
 CONTRIB_ALLOW_LIST: list = [
     # 'AngleReproduction',
     # 'CVLearning',
@@ -114,11 +112,6 @@ CONTRIB_ALLOW_LIST: list = [
     # 'MemoryRecall',
     # 'Pneumostomeopening'
 ]
-ALL_CONTRIB_ENVS = _get_envs(
-    foldername="contrib",
-    env_prefix="contrib",
-    allow_list=CONTRIB_ALLOW_LIST,
-)
 
 
 # Automatically register all tasks in collections
@@ -142,7 +135,72 @@ def _get_collection_envs():
     return derived_envs
 
 
-ALL_COLLECTIONS_ENVS = _get_collection_envs()
+def _get_tags(entry_point):
+    """Read the tags in the metadata of an env, parsing its source if it cannot be imported."""
+    from_, class_ = entry_point.split(":")
+    try:
+        imported = getattr(importlib.import_module(from_), class_)
+    except ImportError:
+        # e.g. psychopy envs, find `metadata = {..., "tags": [...]}` in the class body
+        spec = importlib.util.find_spec(from_.rsplit(".", 1)[0])
+        filename = Path(spec.origin).parent / (from_.rsplit(".", 1)[1] + ".py")  # type: ignore[union-attr, arg-type]
+        for node in ast.walk(ast.parse(filename.read_text())):
+            if isinstance(node, ast.ClassDef) and node.name == class_:
+                for stmt in node.body:
+                    targets = getattr(stmt, "targets", [getattr(stmt, "target", None)])
+                    if any(getattr(t, "id", None) == "metadata" for t in targets):
+                        metadata = ast.literal_eval(stmt.value)  # type: ignore[attr-defined]
+                        return list(metadata.get("tags", []))
+        return []
+    if isfunction(imported):
+        return []  # collection envs are built by functions
+    return list(getattr(imported, "metadata", {}).get("tags", []))
+
+
+def _build_manifest():
+    """Scan the env modules and return the registry manifest.
+
+    Returns:
+        manifest: dict, env id -> {"entry_point", "group", "tags"}, where group is
+            one of 'native', 'psychopy', 'contrib' or 'collections'
+    """
+    groups = {
+        "native": _get_envs(foldername=None, env_prefix=None, allow_list=NATIVE_ALLOW_LIST),
+        "psychopy": PSYCHOPY_ENVS,
+        "contrib": _get_envs(foldername="contrib", env_prefix="contrib", allow_list=CONTRIB_ALLOW_LIST),
+        "collections": _get_collection_envs(),
+    }
+    manifest = {}
+    for group, envs in groups.items():
+        for env_id, entry_point in sorted(envs.items()):
+            manifest[env_id] = {"entry_point": entry_point, "group": group, "tags": _get_tags(entry_point)}
+    return manifest
+
+
+def write_manifest(path=MANIFEST_PATH) -> None:
+    """Regenerate the registry manifest, run after adding or changing envs.
+
+    python -c "from neurogym.envs.registration import write_manifest; write_manifest()"
+    """
+    Path(path).write_text(json.dumps(_build_manifest(), indent=2) + "\n")
+
+
+def _load_manifest(path=MANIFEST_PATH):
+    return json.loads(Path(path).read_text())
+
+
+# Fall back to scanning the env modules, e.g. before the manifest is first written
+MANIFEST = _load_manifest() if MANIFEST_PATH.exists() else _build_manifest()
+
+
+def _group(group):
+    return {env_id: entry["entry_point"] for env_id, entry in MANIFEST.items() if entry["group"] == group}
+
+
+ALL_NATIVE_ENVS = _group("native")
+ALL_PSYCHOPY_ENVS = _group("psychopy")
+ALL_CONTRIB_ENVS = _group("contrib")
+ALL_COLLECTIONS_ENVS = _group("collections")
 
 ALL_ENVS = {**ALL_NATIVE_ENVS, **ALL_PSYCHOPY_ENVS, **ALL_CONTRIB_ENVS}
 
@@ -165,14 +223,7 @@ def all_envs(tag=None, psychopy=False, contrib=False, collections=False):
         msg = f"{type(tag)=} must be a string."
         raise TypeError(msg)
 
-    new_env_list = []
-    for env in env_list:
-        from_, class_ = envs[env].split(":")
-        imported = getattr(__import__(from_, fromlist=[class_]), class_)
-        env_tag = imported.metadata.get("tags", [])
-        if tag in env_tag:
-            new_env_list.append(env)
-    return new_env_list
+    return [env for env in env_list if tag in MANIFEST[env]["tags"]]
 
 
 def all_tags():
@@ -1 +1,11 @@
-from neurogym.utils.plotting import plot_env
+import importlib
+
+
+def __getattr__(name):
+    # plotting imports matplotlib, so it is only loaded when first used
+    if name == "plotting":
+        return importlib.import_module("neurogym.utils.plotting")
+    if name == "plot_env":
+        return importlib.import_module("neurogym.utils.plotting").plot_env
+    msg = f"module {__name__!r} has no attribute {name!r}"
+    raise AttributeError(msg)
@@ -0,0 +1,69 @@
+"""Bounded caches."""
+
+from collections import OrderedDict
+
+
+def _nbytes(value):
+    """Total nbytes of value, e.g. an array or a tuple of arrays and None, 0 without arrays."""
+    if isinstance(value, tuple):
+        return sum(_nbytes(item) for item in value)
+    return getattr(value, "nbytes", 0)
+
+
+class LRUCache:
+    """Mapping of at most maxsize items, evicting the least recently used.
+
+    Args:
+        maxsize: int, maximum number of items, None for unbounded
+        maxbytes: int, maximum total nbytes of the values, e.g. arrays, None
+            for unbounded. A value larger than maxbytes is not stored.
+
+    Attributes:
+        hits: int, number of get calls that found their key
+        misses: int, number of get calls that did not
+    """
+
+    def __init__(self, maxsize=128, maxbytes=None) -> None:
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key, default=None):
+        """Return the value of key, marked as most recently used, or default."""
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value) -> None:
+        """Set the value of key and evict the least recently used items beyond maxsize."""
+        if key in self._data:
+            self.nbytes -= _nbytes(self._data.pop(key))
+        if self.maxbytes is not None and _nbytes(value) > self.maxbytes:
+            return
+        self._data[key] = value
+        self.nbytes += _nbytes(value)
+        while (self.maxsize is not None and len(self._data) > self.maxsize) or (
+            self.maxbytes is not None and self.nbytes > self.maxbytes
+        ):
+            _, evicted = self._data.popitem(last=False)
+            self.nbytes -= _nbytes(evicted)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,187 @@
+"""Persistent on-disk trial corpora with a memory-mapped reader.
+
+A corpus is a folder holding the trials of one env:
+    ob.bin, gt.bin: raw C-order arrays of all time steps of all trials, one
+        trial after the other, with shape (num_steps, *ob_shape) and
+        (num_steps, *gt_shape)
+    offsets.npy: int64 array (num_trials + 1,), trial i spans time steps
+        offsets[i]:offsets[i + 1]
+    trials.npz: columnar trial info, one array of length num_trials per key
+    meta.json: env id, kwargs, seed, shapes and dtypes
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+from neurogym.envs.registration import make
+
+_META = "meta.json"
+
+
+def write_corpus(path, env, num_trials, env_kwargs=None, seed=None, chunk_size=1000):
+    """Generate trials of env and write them to a corpus folder.
+
+    Trials are generated chunk by chunk with TrialEnv.new_trials and appended
+    to the files, so the corpus never needs to fit in memory.
+
+    Args:
+        path: str or Path, folder of the corpus, created if needed
+        env: str for env id or TrialEnv object
+        num_trials: int, number of trials
+        env_kwargs: dict, additional kwargs for environment, if env is str
+        seed: int or None, seed of the env before generating
+        chunk_size: int, number of trials generated at once
+
+    Returns:
+        path: Path of the corpus folder
+    """
+    env_id = env if isinstance(env, str) else getattr(getattr(env, "spec", None), "id", None)
+    if isinstance(env, str):
+        env = make(env, **(env_kwargs or {}))
+    task = env.unwrapped
+    if seed is not None:
+        task.seed(seed)
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    offsets = [np.zeros(1, dtype=np.int64)]
+    columns: dict = {}
+    num_steps = 0
+    # Shapes and dtypes of the steps written, e.g. padded by ScheduleEnvs(env_input=True)
+    ob_spec = gt_spec = None
+    with (path / "ob.bin").open("wb") as f_ob, (path / "gt.bin").open("wb") as f_gt:
+        for start in range(0, num_trials, chunk_size):
+            batch = task.new_trials(min(chunk_size, num_trials - start))
+            valid = np.arange(batch.ob.shape[1]) < batch.lengths[:, None]
+            ob, gt = batch.ob[valid], batch.gt[valid]  # trials one after the other
+            if ob_spec is None:
+                ob_spec, gt_spec = (ob.shape[1:], ob.dtype), (gt.shape[1:], gt.dtype)
+            elif (ob.shape[1:], ob.dtype) != ob_spec or (gt.shape[1:], gt.dtype) != gt_spec:
+                msg = (
+                    f"Trials {start}, ... have ob {ob.shape[1:]} {ob.dtype} and gt {gt.shape[1:]} {gt.dtype}, "
+                    f"but earlier trials have ob {ob_spec} and gt {gt_spec}."
+                )
+                raise ValueError(msg)
+            ob.tofile(f_ob)
+            gt.tofile(f_gt)
+            offsets.append(num_steps + np.cumsum(batch.lengths, dtype=np.int64))
+            num_steps += int(batch.lengths.sum())
+            for key, val in batch.trials.items():
+                columns.setdefault(key, []).append(val)
+
+    np.save(path / "offsets.npy", np.concatenate(offsets))
+    np.savez(path / "trials.npz", **{key: np.concatenate(val) for key, val in columns.items()})
+    if ob_spec is None:
+        ob_spec = (task.observation_space.shape, task.observation_space.dtype)
+        gt_spec = (task.action_space.shape, task.action_space.dtype)
+    meta = {
+        "env_id": env_id,
+        "env_kwargs": env_kwargs or {},
+        "seed": seed,
+        "dt": task.dt,
+        "num_trials": num_trials,
+        "num_steps": num_steps,
+        "ob_shape": list(ob_spec[0]),
+        "ob_dtype": np.dtype(ob_spec[1]).str,
+        "gt_shape": list(gt_spec[0]),
+        "gt_dtype": np.dtype(gt_spec[1]).str,
+    }
+    (path / _META).write_text(json.dumps(meta, indent=2))
+    return path
+
+
+class Corpus:
+    """Read-only memory-mapped view of a corpus written by write_corpus.
+
+    Args:
+        path: str or Path, folder of the corpus
+
+    Attributes:
+        ob: np.memmap (num_steps, *ob_shape), all trials one after the other
+        gt: np.memmap (num_steps, *gt_shape)
+        offsets: np array (num_trials + 1,), start of each trial in ob and gt
+        trials: dict of arrays of length num_trials, the trial info
+        meta: dict, content of meta.json
+    """
+
+    def __init__(self, path) -> None:
+        path = Path(path)
+        self.meta = json.loads((path / _META).read_text())
+        self.offsets = np.load(path / "offsets.npy")
+        num_steps = self.meta["num_steps"]
+        self.ob = _memmap(path / "ob.bin", self.meta["ob_dtype"], (num_steps, *self.meta["ob_shape"]))
+        self.gt = _memmap(path / "gt.bin", self.meta["gt_dtype"], (num_steps, *self.meta["gt_shape"]))
+        with np.load(path / "trials.npz", allow_pickle=True) as f:
+            self.trials = dict(f)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def trial(self, i):
+        """Return views of the ob and gt of trial i."""
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.ob[start:end], self.gt[start:end]
+
+
+def _memmap(filename, dtype, shape):
+    if shape[0] == 0:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(filename, dtype=dtype, mode="r", shape=shape)
+
+
+class CorpusDataset:
+    """Iterable dataset of batches read from a corpus without copies.
+
+    The time steps of the corpus are split into batch_size contiguous streams
+    of consecutive trials, as the columns of a Dataset cache. Each call returns
+    the next seq_len steps of all streams as views into the memory map, and
+    starts over when the streams are exhausted. The batch dimension is a view
+    along the streams, so arrays with batch_first=False are not contiguous.
+
+    Args:
+        corpus: str or Path of a corpus folder, or Corpus object
+        batch_size: int, batch size
+        seq_len: int, sequence length
+        max_batch: int, maximum number of batch for iterator, default infinite
+        batch_first: bool, if True, return (batch, seq_len, n_units), default False
+    """
+
+    def __init__(self, corpus, batch_size=1, seq_len=1000, max_batch=np.inf, batch_first=False) -> None:
+        self.corpus = corpus if isinstance(corpus, Corpus) else Corpus(corpus)
+        stream_len = len(self.corpus.ob) // batch_size
+        self.num_batch = stream_len // seq_len
+        if self.num_batch == 0:
+            msg = f"Corpus of {len(self.corpus.ob)} steps is too short for {batch_size=} and {seq_len=}."
+            raise ValueError(msg)
+        size = batch_size * stream_len
+        self._inputs = self.corpus.ob[:size].reshape(batch_size, stream_len, *self.corpus.ob.shape[1:])
+        self._target = self.corpus.gt[:size].reshape(batch_size, stream_len, *self.corpus.gt.shape[1:])
+        self.batch_size = batch_size
+        self.seq_len = seq_len
+        self.batch_first = batch_first
+        self.max_batch = max_batch
+        self._i_batch = 0
+        self._i_seq = 0
+
+    def __iter__(self):
+        return self
+
+    def __call__(self, *args, **kwargs):
+        return self.__next__()
+
+    def __next__(self):
+        self._i_batch += 1
+        if self._i_batch > self.max_batch:
+            self._i_batch = 0
+            raise StopIteration
+
+        if self._i_seq >= self.num_batch:
+            self._i_seq = 0
+        seq = slice(self._i_seq * self.seq_len, (self._i_seq + 1) * self.seq_len)
+        self._i_seq += 1
+        inputs, target = self._inputs[:, seq], self._target[:, seq]
+        if not self.batch_first:
+            inputs, target = inputs.swapaxes(0, 1), target.swapaxes(0, 1)
+        return inputs, target
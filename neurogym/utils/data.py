@@ -1,10 +1,113 @@
 """Utilities for data."""
 
 import copy
+import multiprocessing as mp
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
 
 import gymnasium as gym
 import numpy as np
 
+from neurogym.utils.random import is_legacy_rng, spawn
+
+
+def _fill(envs, cache, batch_first, start=0, counts=None, kwargs=None, frames=None) -> None:
+    """Fill the columns start, ..., start + len(envs) of a cache with trials of envs.
+
+    cache is (inputs, target), or (inputs, target, trial_start, trial_id) to also
+    mark the first step of each trial and the number of the trial in its column,
+    counts holds the number of trials generated so far by each env and is updated.
+    If frames is a list, inputs holds indices into the concatenation of frames,
+    to which the distinct observations of each trial are appended, see
+    TrialEnv.compact_ob.
+    """
+    cache_len = cache[0].shape[1] if batch_first else cache[0].shape[0]
+    kwargs = kwargs or {}
+    num_frames = 0 if frames is None else sum(len(table) for table in frames)  # index of the next frame
+    for i, env in enumerate(envs, start):
+        inputs, target, *trial_info = (array[i] if batch_first else array[:, i] for array in cache)
+        seq_start = 0
+        seq_end = 0
+        while seq_end < cache_len:
+            # TODO: Right now this only works for env with new_trial
+            env.new_trial(**kwargs)  # type: ignore[attr-defined]
+            gt = env.gt  # type: ignore[attr-defined]
+            if frames is None:
+                ob = env.ob  # type: ignore[attr-defined]
+            else:
+                table, ob = env.compact_ob()  # type: ignore[attr-defined]
+                ob += num_frames
+                frames.append(table)
+                num_frames += len(table)
+            seq_len = ob.shape[0]
+            seq_end = seq_start + seq_len
+            if seq_end > cache_len:
+                seq_end = cache_len
+                seq_len = seq_end - seq_start
+            inputs[seq_start:seq_end] = ob[:seq_len]
+            target[seq_start:seq_end] = gt[:seq_len]
+            if trial_info:
+                trial_start, trial_id = trial_info
+                trial_start[seq_start:seq_end] = False
+                trial_start[seq_start] = True
+                trial_id[seq_start:seq_end] = counts[i - start]
+                counts[i - start] += 1
+            seq_start = seq_end
+
+
+def _trial_lengths(env, num_trials=100):
+    """Number of steps of num_trials trials of a copy of env, which is left untouched."""
+    env = copy.deepcopy(env)
+    lengths = []
+    for _ in range(num_trials):
+        env.new_trial()
+        lengths.append(env.ob.shape[0])
+    return np.array(lengths)
+
+
+def _same_kwargs(kwargs, other):
+    """Whether two dicts of trial kwargs are equal, also with array values."""
+    return kwargs.keys() == other.keys() and all(np.array_equal(kwargs[key], other[key]) for key in kwargs)
+
+
+def _env_seeds(seed, n):
+    """Seeds of the n envs of a Dataset, independent children of seed.
+
+    With legacy rngs, env i is seeded with seed + i.
+    """
+    if is_legacy_rng():
+        return [None if seed is None else seed + i for i in range(n)]
+    return spawn(seed, n)
+
+
+def _worker(envs, start, buffers, batch_first, commands, done) -> None:
+    """Fill slots of the shared ring buffers with trials of envs on command.
+
+    Commands are ("fill", slot, kwargs), ("seed", seeds) or None to exit. Reports
+    (slot, None) to done after each fill, or (None, traceback) on failure and exits.
+    """
+    shms = [shared_memory.SharedMemory(name=name) for name, _, _ in buffers]
+    rings = [np.ndarray(shape, dtype, buffer=shm.buf) for shm, (_, shape, dtype) in zip(shms, buffers, strict=True)]
+    counts = np.zeros(len(envs), dtype=np.int64)
+    try:
+        while (command := commands.get()) is not None:
+            if command[0] == "seed":
+                for env, seed in zip(envs, command[1], strict=True):
+                    env.seed(seed)
+                counts[:] = 0
+            else:
+                _, slot, kwargs = command
+                _fill(envs, [ring[slot] for ring in rings], batch_first, start, counts, kwargs)
+                done.put((slot, None))
+    except Exception:  # noqa: BLE001
+        done.put((None, traceback.format_exc()))
+    finally:
+        del rings
+        for shm in shms:
+            shm.close()
+
 
 class Dataset:
     """Make an environment into an iterable dataset for supervised learning.
@@ -12,15 +115,63 @@ class Dataset:
     Create an iterator that at each call returns
         inputs: numpy array (sequence_length, batch_size, input_units)
         target: numpy array (sequence_length, batch_size, output_units)
+    and, if trial_info, a dict of numpy arrays (sequence_length, batch_size)
+        trial_start: bool, True at the first step of each trial, e.g. to reset
+            the state of a recurrent network
+        trial_id: int, number of the trial of each step, counted per batch
+            element in 'stream' mode and over the dataset in 'trial' mode,
+            from the last call of seed
+        mask: bool, True at the steps of a trial, False at padding steps
+
+    In 'stream' mode, the trials of each batch element are concatenated and cut
+    into sequences of seq_len steps, so trials span consecutive batches. In
+    'trial' mode, each batch element is a whole trial, padded to the longest
+    trial of the batch. The trials of bucket_pool batches are generated at once
+    and batched by length, so trials of similar length are batched together.
 
     Args:
         env: str for env id or gym.Env objects
         env_kwargs: dict, additional kwargs for environment, if env is str
         batch_size: int, batch size
-        seq_len: int, sequence length
+        seq_len: int, sequence length, default the length of the longest of
+            100 trials of env
         max_batch: int, maximum number of batch for iterator, default infinite
         batch_first: bool, if True, return (batch, seq_len, n_units), default False
-        cache_len: int, default length of caching
+        cache_len: int, number of steps of each batch element in the cache,
+            default as many as fit in cache_bytes
+        cache_bytes: int, memory budget of the cache in bytes, used if
+            cache_len is None. The ring of num_workers and prefetch holds two
+            caches. With compact, the tables of distinct observations are not
+            counted.
+        num_workers: int, if > 0, trials are generated by this many worker
+            processes, each owning a slice of the envs. The workers fill a
+            shared-memory ring of two caches, one being refilled while the
+            other is consumed. Call close() to stop them.
+        prefetch: bool, if True, the next cache is filled on a background
+            thread while the current one is consumed. Implied by num_workers.
+            The thread holds the GIL while it steps the envs in Python, so
+            without num_workers it only saves time when the fills are
+            dominated by NumPy operations that release the GIL. When a batch
+            is requested with trial kwargs that differ from those of the
+            prefetched cache, that cache is filled again with them first.
+        trial_info: bool, if True, also return the trial_start, trial_id and
+            mask arrays. Implied by mode='trial'.
+        mode: str, 'stream' or 'trial', see above. In 'trial' mode, seq_len,
+            cache_len, num_workers and prefetch are not used.
+        bucket_pool: int, number of batches of trials generated at once in
+            'trial' mode
+        inputs_dtype: dtype of inputs, default the dtype of the observation space
+        target_dtype: dtype of target, default the dtype of the action space
+        compact: bool, if True, the trials are stored as tables of their
+            distinct observations and indices, see TrialEnv.compact_ob, and
+            batches of inputs are gathered from them. Saves memory and copies
+            for image observations with repeated frames. Not supported with
+            num_workers and prefetch.
+
+    Attributes:
+        stall_time: float, total time in seconds that batches waited for a
+            cache refill. Close to 0 if trials are generated fast enough.
+        num_refills: int, number of cache refills so far
     """
 
     def __init__(
@@ -32,10 +183,25 @@ class Dataset:
         max_batch=np.inf,
         batch_first=False,
         cache_len=None,
+        num_workers=0,
+        prefetch=False,
+        trial_info=False,
+        mode="stream",
+        bucket_pool=16,
+        cache_bytes=2**20,
+        inputs_dtype=None,
+        target_dtype=None,
+        compact=False,
     ) -> None:
         if not isinstance(env, str | gym.Env):
             msg = f"{type(env)=} must be `gym.Env` or `str`."
             raise TypeError(msg)
+        if mode not in ("stream", "trial"):
+            msg = f"{mode=} must be 'stream' or 'trial'."
+            raise ValueError(msg)
+        if (mode == "trial" or compact) and (num_workers > 0 or prefetch):
+            msg = "num_workers and prefetch are not supported in 'trial' mode or with compact."
+            raise ValueError(msg)
         if isinstance(env, gym.Env):
             self.envs = [copy.deepcopy(env) for _ in range(batch_size)]
         else:
@@ -44,6 +210,18 @@ class Dataset:
             self.envs = [gym.make(env, **env_kwargs) for _ in range(batch_size)]
         for env_ in self.envs:
             env_.reset()
+        self.num_workers = min(num_workers, batch_size)
+        self.mode = mode
+        self.trial_info = trial_info or mode == "trial"
+        self.bucket_pool = bucket_pool
+        self.compact = compact
+        self._frames = None  # observations indexed by the inputs of the cache if compact
+        self._workers: list = []
+        self._executor = None
+        self._slot_kwargs: list = [{}, {}]  # trial kwargs each slot of the ring was filled with
+        self._trial_counts = np.zeros(batch_size, dtype=np.int64)
+        self._buckets: list = []
+        self._cache_arrays: list | None = None  # filled in 'stream' mode, after seeding
         self.seed()
 
         env = self.envs[0]
@@ -52,8 +230,7 @@ class Dataset:
         self.batch_first = batch_first
 
         if seq_len is None:
-            # TODO: infer sequence length from task
-            seq_len = 1000
+            seq_len = int(_trial_lengths(env).max())
 
         obs_shape = env.observation_space.shape
         action_shape = env.action_space.shape
@@ -61,11 +238,16 @@ class Dataset:
             self._expand_action = True
         else:
             self._expand_action = False
+        self.inputs_dtype = np.dtype(inputs_dtype or env.observation_space.dtype)
+        self.target_dtype = np.dtype(target_dtype or env.action_space.dtype)
         if cache_len is None:
-            # Infer cache len
-            cache_len = 1e5  # Probably too low
-            cache_len /= np.prod(obs_shape) + np.prod(action_shape)
-            cache_len /= batch_size
+            # With compact, the cache holds the index of each observation in the frames table
+            ob_bytes = np.prod(obs_shape) * self.inputs_dtype.itemsize
+            step_bytes = np.dtype(np.intp).itemsize if compact else ob_bytes
+            step_bytes += np.prod(action_shape) * self.target_dtype.itemsize
+            if self.trial_info:
+                step_bytes += np.dtype(bool).itemsize + np.dtype(np.int64).itemsize
+            cache_len = cache_bytes / step_bytes / batch_size
         cache_len = int((1 + (cache_len // seq_len)) * seq_len)
 
         self.seq_len = seq_len
@@ -78,45 +260,159 @@ class Dataset:
 
         self.inputs_shape = shape1 + list(obs_shape)
         self.target_shape = shape1 + list(action_shape)
-        self._cache_inputs_shape = shape2 + list(obs_shape)
-        self._cache_target_shape = shape2 + list(action_shape)
-
-        self._inputs = np.zeros(
-            self._cache_inputs_shape,
-            dtype=env.observation_space.dtype,
-        )
-        self._target = np.zeros(self._cache_target_shape, dtype=env.action_space.dtype)
+        # Shapes and dtypes of the arrays of a cache
+        self._cache_specs = [
+            (shape2, np.dtype(np.intp)) if compact else (shape2 + list(obs_shape), self.inputs_dtype),
+            (shape2 + list(action_shape), self.target_dtype),
+        ]
+        if self.trial_info:
+            self._cache_specs += [(shape2, np.dtype(bool)), (shape2, np.dtype(np.int64))]
+            self._mask = np.ones(shape1, dtype=bool)  # no padding in 'stream' mode
 
-        self._cache()
+        self.stall_time = 0.0
+        self.num_refills = 0
+        if self.num_workers > 0:
+            self._start_workers()
+        elif prefetch:
+            self._start_prefetch()
+        elif mode == "stream":
+            self._cache_arrays = [np.zeros(shape, dtype=dtype) for shape, dtype in self._cache_specs]
+            self._cache()
 
         self._i_batch = 0
         self.max_batch = max_batch
 
     def _cache(self, **kwargs) -> None:
-        for i in range(self.batch_size):
-            env = self.envs[i]
-            seq_start = 0
-            seq_end = 0
-            while seq_end < self._cache_len:
-                # TODO: Right now this only works for env with new_trial
-                env.new_trial(**kwargs)  # type: ignore[attr-defined]
-                ob, gt = env.ob, env.gt  # type: ignore[attr-defined]
-                seq_len = ob.shape[0]
-                seq_end = seq_start + seq_len
-                if seq_end > self._cache_len:
-                    seq_end = self._cache_len
-                    seq_len = seq_end - seq_start
-                if self.batch_first:
-                    self._inputs[i, seq_start:seq_end, ...] = ob[:seq_len]
-                    self._target[i, seq_start:seq_end, ...] = gt[:seq_len]
-                else:
-                    self._inputs[seq_start:seq_end, i, ...] = ob[:seq_len]
-                    self._target[seq_start:seq_end, i, ...] = gt[:seq_len]
-                seq_start = seq_end
+        start = time.perf_counter()
+        if self._workers or self._executor:
+            other = 1 - self._slot
+            if not _same_kwargs(kwargs, self._slot_kwargs[other]):
+                # The other slot was filled with the kwargs of the previous refill
+                self._wait(other)
+                self._send_fill(other, kwargs)
+            # Refill the consumed slot and move on to the other one
+            self._send_fill(self._slot, kwargs)
+            self._use_slot(other)
+        else:
+            frames = [] if self.compact else None
+            counts = self._trial_counts
+            _fill(self.envs, self._cache_arrays, self.batch_first, counts=counts, kwargs=kwargs, frames=frames)
+            if frames is not None:
+                self._frames = np.concatenate(frames).astype(self.inputs_dtype, copy=False)
+        self.stall_time += time.perf_counter() - start
+        self.num_refills += 1
 
         self._seq_start = 0
         self._seq_end = self._seq_start + self.seq_len
 
+    def _start_workers(self) -> None:
+        """Start the worker processes and fill both slots of the ring."""
+        ctx = mp.get_context("fork" if "fork" in mp.get_all_start_methods() else "spawn")
+        self._shms = []
+        buffers = []
+        for cache_shape, dtype in self._cache_specs:
+            shape = (2, *cache_shape)
+            shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+            self._shms.append(shm)
+            buffers.append((shm.name, shape, dtype))
+        self._rings = [
+            np.ndarray(shape, dtype, buffer=shm.buf) for shm, (_, shape, dtype) in zip(self._shms, buffers, strict=True)
+        ]
+
+        self._done = ctx.Queue()
+        self._commands = []
+        self._env_slices = np.array_split(np.arange(self.batch_size), self.num_workers)
+        for ind in self._env_slices:
+            commands = ctx.Queue()
+            envs = [self.envs[i] for i in ind]
+            worker = ctx.Process(
+                target=_worker,
+                args=(envs, ind[0], buffers, self.batch_first, commands, self._done),
+                daemon=True,
+            )
+            worker.start()
+            self._commands.append(commands)
+            self._workers.append(worker)
+        self._pending = [0, 0]
+        self._refill_ring()
+
+    def _start_prefetch(self) -> None:
+        """Start the background thread and fill both slots of the ring."""
+        self._rings = [np.zeros([2, *shape], dtype=dtype) for shape, dtype in self._cache_specs]
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._futures = [None, None]
+        self._refill_ring()
+
+    def _refill_ring(self) -> None:
+        """Fill both slots from scratch and start consuming slot 0."""
+        self._send_fill(0, {})
+        self._send_fill(1, {})
+        self._use_slot(0)
+        self._seq_start = 0
+
+    def _send_fill(self, slot, kwargs) -> None:
+        self._slot_kwargs[slot] = kwargs
+        if self._executor:
+            cache = [ring[slot] for ring in self._rings]
+            self._futures[slot] = self._executor.submit(
+                _fill,
+                self.envs,
+                cache,
+                self.batch_first,
+                counts=self._trial_counts,
+                kwargs=kwargs,
+            )
+            return
+        for commands in self._commands:
+            commands.put(("fill", slot, kwargs))
+        self._pending[slot] += len(self._commands)
+
+    def _wait(self, slot) -> None:
+        """Wait until slot is filled."""
+        if self._executor:
+            if self._futures[slot] is not None:
+                self._futures[slot].result()
+                self._futures[slot] = None
+            return
+        while self._pending[slot] > 0:
+            slot_done, error = self._done.get()
+            if error is not None:
+                self.close()
+                msg = f"Dataset worker failed:\n{error}"
+                raise RuntimeError(msg)
+            self._pending[slot_done] -= 1
+
+    def _use_slot(self, slot) -> None:
+        self._wait(slot)
+        self._slot = slot
+        self._cache_arrays = [ring[slot] for ring in self._rings]
+
+    def close(self) -> None:
+        """Stop the worker processes or thread and release the shared memory."""
+        if self._executor:
+            self._executor.shutdown()
+            self._executor = None
+            return
+        if not self._workers:
+            return
+        for commands in self._commands:
+            commands.put(None)
+        for worker in self._workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        self._workers = []
+        self._cache_arrays = [array.copy() for array in self._cache_arrays]
+        del self._rings
+        for shm in self._shms:
+            shm.close()
+            shm.unlink()
+        self._shms = []
+
+    def __del__(self) -> None:
+        if getattr(self, "_workers", None) or getattr(self, "_executor", None):
+            self.close()
+
     def __iter__(self):
         return self
 
@@ -129,27 +425,92 @@ class Dataset:
             self._i_batch = 0
             raise StopIteration
 
+        if self.mode == "trial":
+            if not self._buckets:
+                self._fill_buckets(**kwargs)
+            return self._pad_batch(*self._buckets.pop())
+
         self._seq_end = self._seq_start + self.seq_len
 
         if self._seq_end >= self._cache_len:
             self._cache(**kwargs)
 
-        if self.batch_first:
-            inputs = self._inputs[:, self._seq_start : self._seq_end, ...]
-            target = self._target[:, self._seq_start : self._seq_end, ...]
-        else:
-            inputs = self._inputs[self._seq_start : self._seq_end]
-            target = self._target[self._seq_start : self._seq_end]
+        seq = slice(self._seq_start, self._seq_end)
+        arrays = [array[:, seq] if self.batch_first else array[seq] for array in self._cache_arrays]
+        if self.compact:
+            arrays[0] = self._frames[arrays[0]]
 
         self._seq_start = self._seq_end
-        return inputs, target
+        if not self.trial_info:
+            return arrays[0], arrays[1]
+        inputs, target, trial_start, trial_id = arrays
+        return inputs, target, {"trial_start": trial_start, "trial_id": trial_id, "mask": self._mask}
 
-    def seed(self, seed=None) -> None:
-        for i, env in enumerate(self.envs):
-            if seed is None:
-                env.seed(seed)  # type: ignore[attr-defined]
+    def _fill_buckets(self, **kwargs) -> None:
+        """Generate the trials of bucket_pool batches and batch them by length, in random order."""
+        trials = []
+        for _ in range(self.bucket_pool * self.batch_size):
+            self.env.new_trial(**kwargs)  # type: ignore[attr-defined]
+            ob = self.env.compact_ob() if self.compact else self.env.ob.copy()  # type: ignore[attr-defined]
+            trials.append((ob, self.env.gt.copy()))  # type: ignore[attr-defined]
+        ids = self._num_trials + np.arange(len(trials))
+        self._num_trials += len(trials)
+        order = np.argsort([len(gt) for _, gt in trials], kind="stable")
+        batches = [order[i : i + self.batch_size] for i in range(0, len(order), self.batch_size)]
+        self._buckets = [([trials[i] for i in batch], ids[batch]) for batch in batches]
+        self._buckets = [self._buckets[i] for i in self._rng.permutation(len(self._buckets))]
+
+    def _pad_batch(self, trials, ids):
+        """Stack the ob and gt of trials into arrays padded with zeros to the longest trial."""
+        lengths = np.array([len(gt) for _, gt in trials])
+        seq_len = lengths.max()
+        target_shape, target_dtype = self._cache_specs[1]
+        inputs_shape = self.env.observation_space.shape
+        inputs = np.zeros((len(trials), seq_len, *inputs_shape), dtype=self.inputs_dtype)
+        target = np.zeros((len(trials), seq_len, *target_shape[2:]), dtype=target_dtype)
+        for i, (ob, gt) in enumerate(trials):
+            if self.compact:
+                frames, index = ob
+                inputs[i, : len(gt)] = frames[index]
             else:
-                env.seed(seed + i)  # type: ignore[attr-defined]
+                inputs[i, : len(gt)] = ob
+            target[i, : len(gt)] = gt
+        mask = np.arange(seq_len) < lengths[:, None]
+        trial_start = np.zeros_like(mask)
+        trial_start[:, 0] = True
+        trial_id = np.repeat(ids[:, None], seq_len, axis=1)
+        arrays = [inputs, target, trial_start, trial_id, mask]
+        if not self.batch_first:
+            arrays = [array.swapaxes(0, 1) for array in arrays]
+        inputs, target, trial_start, trial_id, mask = arrays
+        return inputs, target, {"trial_start": trial_start, "trial_id": trial_id, "mask": mask}
+
+    def seed(self, seed=None) -> None:
+        """Seed the envs and regenerate the cache, so that the next batch is the first one of seed in every mode."""
+        seeds = _env_seeds(seed, len(self.envs))
+        # Orders the batches of trials in 'trial' mode
+        self._rng = np.random.default_rng(seed)
+        self._buckets = []
+        self._num_trials = 0
+        if self._workers:
+            # Finish pending fills, then regenerate both slots with the new seeds
+            self._wait(0)
+            self._wait(1)
+            for commands, ind in zip(self._commands, self._env_slices, strict=True):
+                commands.put(("seed", [seeds[i] for i in ind]))
+            self._refill_ring()
+            return
+        if self._executor:
+            self._wait(0)
+            self._wait(1)
+        for env, seed_ in zip(self.envs, seeds, strict=True):
+            env.seed(seed_)  # type: ignore[attr-defined]
+        self._trial_counts[:] = 0
+        if self._executor:
+            self._refill_ring()
+        elif self._cache_arrays is not None:
+            # Regenerate the cache with the new seeds, as the ring of the workers and of prefetch
+            self._cache()
 
 
 if __name__ == "__main__":
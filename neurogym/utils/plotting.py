@@ -1,5 +1,6 @@
 """Plotting functions."""
 
+import sys
 from pathlib import Path
 
 import gymnasium as gym
@@ -7,7 +8,6 @@ import matplotlib as mpl
 import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib import animation
-from stable_baselines3.common.vec_env import DummyVecEnv
 
 # TODO: This is changing user's plotting behavior for non-neurogym plots
 mpl.rcParams["font.size"] = 7
@@ -83,6 +83,12 @@ def plot_env(
     )
 
 
+def _is_dummy_vec_env(env):
+    """Check for a stable-baselines3 DummyVecEnv without importing stable-baselines3."""
+    vec_env = sys.modules.get("stable_baselines3.common.vec_env")
+    return vec_env is not None and isinstance(env, vec_env.DummyVecEnv)
+
+
 def run_env(env, num_steps=200, num_trials=None, def_act=None, model=None):
     observations = []
     ob_cum = []
@@ -92,7 +98,7 @@ def run_env(env, num_steps=200, num_trials=None, def_act=None, model=None):
     actions_end_of_trial = []
     gt = []
     perf = []
-    if isinstance(env, DummyVecEnv):
+    if _is_dummy_vec_env(env):
         ob = env.reset()
     else:
         ob, _ = env.reset()  # TODO: not saving this first observation
@@ -113,7 +119,7 @@ def run_env(env, num_steps=200, num_trials=None, def_act=None, model=None):
             action = def_act
         else:
             action = env.action_space.sample()
-        if isinstance(env, DummyVecEnv):
+        if _is_dummy_vec_env(env):
             ob, rew, terminated, info = env.step(action)
         else:
             ob, rew, terminated, _truncated, info = env.step(action)
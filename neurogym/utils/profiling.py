@@ -0,0 +1,212 @@
+"""Opt-in profiling of the phases of trial-based tasks and of their wrappers.
+
+Profiling replaces the methods of one env and of its wrappers, on the
+instances only, by timed versions, and restores them when disabled. Envs that
+are not profiled run the original methods, without overhead.
+
+    with profile(env):
+        for _ in range(1000):
+            env.step(env.action_space.sample())
+    env.unwrapped.perf_stats()
+    print_flame(env)
+"""
+
+import contextlib
+import functools
+import sys
+import time
+
+# Phases of TrialEnv timed when profiling
+TASK_PHASES = [
+    "reset",
+    "step",
+    "_step",
+    "post_step",
+    "new_trial",
+    "_new_trial",
+    "add_period",
+    "_init_ob",
+    "_init_gt",
+    "add_ob",
+    "set_ob",
+    "add_randn",
+    "set_groundtruth",
+]
+# Methods of wrappers timed when profiling
+WRAPPER_PHASES = ["reset", "step", "new_trial"]
+
+
+class _Recorder:
+    """Cumulative calls and wall time of each call path."""
+
+    def __init__(self) -> None:
+        self.paths: dict[tuple, list] = {}
+        self.stack: list[str] = []
+
+    def timed(self, name, method):
+        paths, stack = self.paths, self.stack
+        perf_counter = time.perf_counter
+
+        @functools.wraps(method)
+        def timed_method(*args, **kwargs):
+            stack.append(name)
+            path = tuple(stack)
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                stack.pop()
+                entry = paths.get(path)
+                if entry is None:
+                    paths[path] = [1, elapsed]
+                else:
+                    entry[0] += 1
+                    entry[1] += elapsed
+
+        return timed_method
+
+
+def _layers(env):
+    """Yield the wrappers and tasks of env, from the outermost, including the envs of ScheduleEnvs."""
+    seen = set()
+    stack = [env]
+    while stack:
+        layer = stack.pop()
+        if id(layer) in seen:
+            continue
+        seen.add(id(layer))
+        yield layer
+        attributes = vars(layer)  # not getattr, that gym wrappers forward to the env they wrap
+        stack.extend(attributes.get("envs", []))
+        if "env" in attributes:
+            stack.append(attributes["env"])
+
+
+def _phases(layer):
+    task = layer.unwrapped
+    return TASK_PHASES if layer is task else WRAPPER_PHASES
+
+
+def enable_profiling(env) -> None:
+    """Start recording the time spent in each phase of env and its wrappers.
+
+    The records are accumulated in env.unwrapped, see TrialEnv.perf_stats.
+    Enabling profiling again adds to the same records.
+    """
+    layers = list(_layers(env))
+    # The tasks of e.g. ScheduleEnvs share one recorder, as env.unwrapped changes from trial to trial
+    tasks = [layer for layer in layers if layer is layer.unwrapped]
+    recorder = next((task._perf_recorder for task in tasks if task._perf_recorder is not None), None)  # noqa: SLF001
+    if recorder is None:
+        recorder = _Recorder()
+    for task in tasks:
+        task._perf_recorder = recorder  # noqa: SLF001
+    for layer in layers:
+        for phase in _phases(layer):
+            override = layer.__dict__.get(phase)
+            if getattr(type(layer), phase, None) is None or hasattr(override, "profiled_override"):
+                continue
+            # Time the current attribute, which may be an instance override, e.g. a step_fn
+            timed = recorder.timed(f"{type(layer).__name__}.{phase}", getattr(layer, phase))
+            timed.profiled_override = override
+            setattr(layer, phase, timed)
+
+
+def disable_profiling(env) -> None:
+    """Stop recording and restore the original methods, the records are kept."""
+    for layer in _layers(env):
+        for phase in _phases(layer):
+            timed = layer.__dict__.get(phase)
+            if not hasattr(timed, "profiled_override"):
+                continue
+            if timed.profiled_override is None:
+                delattr(layer, phase)
+            else:
+                setattr(layer, phase, timed.profiled_override)
+
+
+@contextlib.contextmanager
+def profile(env, reset_stats=False):
+    """Context manager that profiles env while in the context.
+
+    Args:
+        env: TrialEnv, possibly wrapped
+        reset_stats: bool, if True, discard the previous records
+    """
+    if reset_stats:
+        reset_perf_stats(env)
+    enable_profiling(env)
+    try:
+        yield env
+    finally:
+        disable_profiling(env)
+
+
+def reset_perf_stats(env) -> None:
+    """Discard the records of env."""
+    recorder = getattr(env.unwrapped, "_perf_recorder", None)
+    if recorder is not None:
+        recorder.paths.clear()
+
+
+def summarize(paths):
+    """Aggregate the records of call paths by phase.
+
+    Returns:
+        stats: dict of phase name to dict of 'calls', 'time', the cumulative
+            wall time in seconds, and 'self_time', excluding the timed phases
+            called inside, sorted by decreasing time
+    """
+    stats: dict[str, dict] = {}
+    for path, (calls, elapsed) in paths.items():
+        name = path[-1]
+        entry = stats.setdefault(name, {"calls": 0, "time": 0.0, "self_time": 0.0})
+        entry["calls"] += calls
+        if name not in path[:-1]:  # do not count time twice for recursive calls
+            entry["time"] += elapsed
+        entry["self_time"] += elapsed
+        if len(path) > 1:
+            parent = stats.setdefault(path[-2], {"calls": 0, "time": 0.0, "self_time": 0.0})
+            parent["self_time"] -= elapsed
+    return dict(sorted(stats.items(), key=lambda item: -item[1]["time"]))
+
+
+def print_flame(env, min_fraction=0.001, width=30, file=None) -> None:
+    """Print the call tree of the profiled phases of env, with time bars.
+
+    Args:
+        env: TrialEnv, possibly wrapped, that was profiled
+        min_fraction: float, calls taking less than this fraction of the total
+            time are not shown
+        width: int, width of the bar of the whole time
+        file: stream to print to, default sys.stdout
+    """
+    file = file or sys.stdout
+    recorder = getattr(env.unwrapped, "_perf_recorder", None)
+    paths = recorder.paths if recorder is not None else {}
+    total = sum(elapsed for path, (_, elapsed) in paths.items() if len(path) == 1)
+    if total == 0:
+        print("No profiling records.", file=file)
+        return
+
+    children: dict[tuple, list] = {}
+    for path in paths:
+        children.setdefault(path[:-1], []).append(path)
+
+    def print_node(path) -> None:
+        calls, elapsed = paths[path]
+        fraction = elapsed / total
+        if fraction < min_fraction:
+            return
+        bar = "#" * max(1, round(fraction * width))
+        label = "  " * (len(path) - 1) + path[-1]
+        print(
+            f"{bar:<{width}s} {fraction:7.1%} {elapsed * 1e3:10.3f}ms {calls:9d} calls  {label}",
+            file=file,
+        )
+        for child in sorted(children.get(path, []), key=lambda child: -paths[child][1]):
+            print_node(child)
+
+    for root in sorted(children.get((), []), key=lambda root: -paths[root][1]):
+        print_node(root)
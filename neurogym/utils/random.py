@@ -1,10 +1,159 @@
+"""Random number generation.
+
+Envs, timing samplers and schedules draw from `Generator`s built on counter-based
+Philox bit generators, seeded through `np.random.SeedSequence`. Child seeds are
+derived with `spawn`, so that e.g. the envs of a Dataset, or the timing samplers
+of an env, get independent streams. `Generator.seek_trial` moves a generator to
+the block of draws reserved for a trial, so that any trial can be regenerated
+without generating the trials before it.
+
+The legacy behaviour, `np.random.RandomState` seeded with the same int seed
+everywhere, is restored with `set_legacy_rng(True)`.
+"""
+
 import numpy as np
 
+_LEGACY = False
+
+
+def set_legacy_rng(legacy=True) -> None:
+    """Use legacy RandomState rngs for all rngs created from now on."""
+    global _LEGACY  # noqa: PLW0603
+    _LEGACY = legacy
+
+
+def is_legacy_rng():
+    return _LEGACY
+
+
+class Generator(np.random.Generator):
+    """np.random.Generator that also provides the RandomState methods used by envs."""
+
+    def __reduce__(self):
+        # np.random.Generator pickles and copies as the base class
+        return (type(self), (self.bit_generator,))
+
+    def randn(self, *shape):
+        return self.standard_normal(shape or None)
+
+    def rand(self, *shape):
+        return self.random(shape or None)
+
+    def randint(self, low, high=None, size=None, dtype=int):
+        return self.integers(low, high, size=size, dtype=dtype)
+
+    def random_sample(self, size=None):
+        return self.random(size)
+
+    def seek_trial(self, trial) -> None:
+        """Move to the start of the block of draws of trial, an int >= 0.
+
+        Each trial has 2**128 Philox blocks, trial k draws the same numbers
+        whatever happened before.
+        """
+        self._set_counter((0, 0, trial, 0))
+
+    def seek(self, position, stream=0) -> None:
+        """Move to the position-th 64-bit draw of stream, both ints >= 0.
+
+        Each draw of random() takes one 64-bit draw, so position k of a stream
+        can be read directly, e.g. to draw the numbers of trials k, ..., k + n
+        at once. The streams are disjoint from the blocks of seek_trial.
+        """
+        self._set_counter((position // 4, 0, 0, stream + 1))  # 4 draws per Philox block
+        self.bit_generator.random_raw(position % 4)
+
+    def _set_counter(self, counter) -> None:
+        state = getattr(self, "_seek_state", None)
+        if state is None:
+            state = self._seek_state = self.bit_generator.state
+        state["state"]["counter"][:] = counter
+        state["buffer_pos"] = len(state["buffer"])  # discard buffered draws
+        state["has_uint32"] = 0
+        self.bit_generator.state = state
+
+
+def standard_normal(rng, out):
+    """Fill out with standard normal samples and return it.
+
+    Generators draw directly in the float32 or float64 dtype of out, without a
+    float64 temporary. Legacy RandomStates draw float64 samples, as randn.
+    """
+    if isinstance(rng, np.random.Generator) and out.dtype in (np.float32, np.float64) and out.flags.c_contiguous:
+        return rng.standard_normal(out=out, dtype=out.dtype)
+    out[...] = rng.randn(*out.shape)
+    return out
+
+
+def _seed_sequence(seed):
+    return seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+
+def make_rng(seed=None):
+    """Create an rng from an int, SeedSequence or None.
+
+    Returns a Generator on a Philox bit generator, or a RandomState if
+    legacy rngs are enabled.
+    """
+    if _LEGACY:
+        if isinstance(seed, np.random.SeedSequence):
+            return np.random.RandomState(np.random.MT19937(seed))
+        return np.random.RandomState(seed)
+    return Generator(np.random.Philox(_seed_sequence(seed)))
+
+
+def spawn(seed, n):
+    """Derive n independent child seeds from seed.
+
+    Unlike SeedSequence.spawn, the same seed always gives the same children.
+    With legacy rngs, all children are seed itself.
+    """
+    if _LEGACY:
+        return [seed] * n
+    seed = _seed_sequence(seed)
+    return [
+        np.random.SeedSequence(seed.entropy, spawn_key=(*seed.spawn_key, i), pool_size=seed.pool_size) for i in range(n)
+    ]
+
+
+def int_seed(seed):
+    """Int seed for APIs that do not take a SeedSequence, such as gymnasium spaces."""
+    if isinstance(seed, np.random.SeedSequence):
+        return int(seed.generate_state(1)[0])
+    return seed
+
+
+def trial_rng(seed, trial):
+    """Return the rng of an env seeded with seed, moved to trial.
+
+    It draws the same numbers as env.rng during trial `trial` of an env seeded
+    with env.seed(seed). The stream of e.g. the i-th env of a Dataset is
+    spawn(seed, n)[i].
+    """
+    rng = make_rng(seed)
+    rng.seek_trial(trial)
+    return rng
+
+
+def trunc_exp_ppf(u, vmean, vmin=0, vmax=np.inf):
+    """Inverse CDF of the exponential of mean vmean truncated to [vmin, vmax), at u in [0, 1)."""
+    if vmin >= vmax:  # the > is to avoid issues when making vmin as big as dt
+        return np.full(np.shape(u), vmax)[()]
+    # Truncating the exponential to [vmin, vmax) is shifting it by vmin and truncating to [0, vmax - vmin)
+    mass = -np.expm1(-(vmax - vmin) / vmean)
+    return vmin - vmean * np.log1p(-u * mass)
+
 
 def trunc_exp(rng, vmean, vmin=0, vmax=np.inf):
-    """Function for generating period durations."""
+    """Function for generating period durations.
+
+    Draws one uniform number and inverts the CDF. Legacy RandomStates draw
+    exponentials until one falls in [vmin, vmax).
+    """
     if vmin >= vmax:  # the > is to avoid issues when making vmin as big as dt
         return vmax
+    if isinstance(rng, np.random.Generator):
+        return trunc_exp_ppf(rng.random(), vmean, vmin, vmax)
     while True:
         x = rng.exponential(vmean)
         if vmin <= x < vmax:
@@ -16,19 +165,18 @@ class TruncExp:
         self.vmean = vmean
         self.vmin = vmin
         self.vmax = vmax
-        self.rng = np.random.RandomState()
+        self.rng = make_rng()
 
     def seed(self, seed=None) -> None:
         """Seed the PRNG of this space."""
-        self.rng = np.random.RandomState(seed)
+        self.rng = make_rng(seed)
+
+    def seek_trial(self, trial) -> None:
+        if hasattr(self.rng, "seek_trial"):
+            self.rng.seek_trial(trial)
 
     def __call__(self, *args, **kwargs):
-        if self.vmin >= self.vmax:  # the > is to avoid issues when making vmin as big as dt
-            return self.vmax
-        while True:
-            v = self.rng.exponential(self.vmean)
-            if self.vmin <= v < self.vmax:
-                return v
+        return trunc_exp(self.rng, self.vmean, self.vmin, self.vmax)
 
 
 def random_number_fn(dist, args, rng):
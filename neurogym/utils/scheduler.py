@@ -1,6 +1,6 @@
 """Trial scheduler class."""
 
-import numpy as np
+from neurogym.utils.random import make_rng
 
 
 class BaseSchedule:
@@ -15,10 +15,10 @@ class BaseSchedule:
         self.total_count = 0  # total count
         self.count = 0  # count within a condition
         self.i = 0  # initialize at 0
-        self.rng = np.random.RandomState()
+        self.rng = make_rng()
 
     def seed(self, seed=None) -> None:
-        self.rng = np.random.RandomState(seed)
+        self.rng = make_rng(seed)
 
     def reset(self) -> None:
         self.total_count = 0
@@ -0,0 +1,135 @@
+"""Vectorized scoring of actions for tasks with declarative reward rules."""
+
+import numpy as np
+
+from neurogym.envs.registration import make
+
+
+class FixationDecisionRule:
+    """Reward rule of fixate-then-respond tasks.
+
+    Declarative description of the `_step` shared by most native tasks, so that
+    rewards can be computed for many steps or trials at once. Action 0 means
+    fixating. Responding during a fixation period gives the 'abort' reward, and
+    ends the trial if env.abort is True. Responding during the decision period
+    ends the trial, with the 'correct' reward and performance 1 if the action
+    equals the ground truth, and the 'fail' reward otherwise.
+
+    Args:
+        fixation: str or list of str, periods in which the agent must fixate.
+            If None, all steps outside the decision period.
+        decision: str, period in which the agent responds
+        reward_fail: bool, if False, wrong responses are not rewarded with 'fail'
+    """
+
+    def __init__(self, fixation="fixation", decision="decision", reward_fail=True) -> None:
+        self.fixation = [fixation] if isinstance(fixation, str) else fixation
+        self.decision = decision
+        self.reward_fail = reward_fail
+
+    def masks(self, trials):
+        """Return fixation and decision masks.
+
+        Args:
+            trials: TrialBatch, for masks (n, T_max), or TrialEnv, for masks
+                (tmax_ind,) of its current trial
+        """
+        decision = trials.period_mask(self.decision)
+        if self.fixation is None:
+            fixation = ~decision
+        else:
+            fixation = np.zeros_like(decision)
+            for period in self.fixation:
+                fixation |= trials.period_mask(period)
+        return fixation, decision
+
+    def broke_fixation(self, action, fixation):
+        """Bool np array, True where the action breaks fixation."""
+        return fixation & (action != 0)
+
+    def __call__(self, action, gt, fixation, decision, rewards, abort=False):
+        """Score actions elementwise.
+
+        Args:
+            action: np array of actions
+            gt: np array of ground truth, same shape as action
+            fixation: bool np array, True in fixation periods
+            decision: bool np array, True in the decision period
+            rewards: dict of rewards of the env
+            abort: bool, whether breaking fixation ends the trial
+
+        Returns:
+            reward: float np array, reward of each action
+            new_trial: bool np array, True where the action ends the trial
+            correct: bool np array, True where the action is a correct response
+        """
+        respond = action != 0
+        broke = self.broke_fixation(action, fixation)
+        decided = decision & respond & ~fixation
+        correct = decided & (action == gt)
+        reward = broke * float(rewards["abort"]) + correct * float(rewards["correct"])
+        if self.reward_fail:
+            reward += (decided ^ correct) * float(rewards["fail"])
+        new_trial = decided | broke if abort else decided
+        return reward, new_trial, correct
+
+
+def evaluate(env, actions, batch, batch_first=False, env_kwargs=None):
+    """Score the actions of a model on a batch of trials, without stepping the env.
+
+    Each trial is scored as if the actions were taken with env.step from its
+    first time step: rewards are summed until the first step that ends the
+    trial, by a response, by breaking fixation if the env aborts, or by
+    reaching the end of the trial.
+
+    Args:
+        env: str for env id or TrialEnv object, that declares a reward_rule
+        actions: np array (T, n), or (n, T) if batch_first, of the action at each
+            step of each trial, or of the outputs of a model with an extra last
+            axis over actions, of which the argmax is taken. T must be at least
+            the length of the longest trial.
+        batch: TrialBatch of the trials, e.g. from env.new_trials(n)
+        batch_first: bool, if True, actions are (n, T, ...)
+        env_kwargs: dict, additional kwargs for environment, if env is str
+
+    Returns:
+        scores: dict of np arrays (n,)
+            reward: float, sum of the rewards of the trial
+            performance: float, 1 if the trial ended with a correct response
+            aborted: bool, True if the trial ended by breaking fixation
+            broke_fixation: bool, True if fixation was broken in the trial
+            end: int, step at which the trial ended
+    """
+    task = make(env, **(env_kwargs or {})).unwrapped if isinstance(env, str) else env.unwrapped
+    rule = task.reward_rule
+    if rule is None:
+        msg = f"{type(task).__name__} does not declare a reward_rule and cannot be evaluated offline."
+        raise ValueError(msg)
+
+    actions = np.asarray(actions)
+    if actions.ndim == batch.gt.ndim + 1:
+        actions = actions.argmax(axis=-1)
+    if not batch_first:
+        actions = actions.swapaxes(0, 1)
+    n, t_max = batch.gt.shape[:2]
+    if actions.shape[:1] != (n,) or actions.shape[1] < t_max:
+        msg = f"actions must have {n} trials of at least {t_max} steps, got shape {actions.shape}."
+        raise ValueError(msg)
+    actions = actions[:, :t_max]
+
+    fixation, decision = rule.masks(batch)
+    abort = getattr(task, "abort", False)
+    reward, new_trial, correct = rule(actions, batch.gt, fixation, decision, task.rewards, abort)
+    steps = np.arange(t_max)
+    new_trial &= steps < batch.lengths[:, None]
+    ended = new_trial.any(axis=1)
+    end = np.where(ended, new_trial.argmax(axis=1), batch.lengths - 1)
+    rows = np.arange(n)
+    broke = rule.broke_fixation(actions, fixation) & (steps <= end[:, None])
+    return {
+        "reward": (reward * (steps <= end[:, None])).sum(axis=1) + ~ended * task.r_tmax,
+        "performance": correct[rows, end].astype(float),
+        "aborted": ended & broke[rows, end],
+        "broke_fixation": broke.any(axis=1),
+        "end": end,
+    }
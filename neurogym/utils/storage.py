@@ -0,0 +1,165 @@
+"""Append-only columnar storage for streams of records, e.g. per-trial info.
+
+A store is a data file of concatenated .npy segments and an index file with
+one JSON line per segment: {"key", "offset", "nbytes", "compressed"}. Records
+are buffered per column in preallocated typed arrays and written as one
+segment per column on flush, so nothing is rewritten and no file is created
+per flush. Values that are not fixed-shape numbers are kept in object columns,
+which are pickled.
+"""
+
+import io
+import json
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+
+class _Column:
+    """Buffer of the values of one key, typed if possible."""
+
+    def __init__(self, value, size) -> None:
+        value = np.asarray(value)
+        self.size = size
+        self.count = 0
+        if value.dtype.kind in "biufc":
+            self.buffer = np.empty((size, *value.shape), dtype=value.dtype)
+        else:
+            self.buffer = np.empty(size, dtype=object)
+
+    def append(self, value) -> None:
+        buffer = self.buffer
+        if buffer.dtype != object:
+            array = np.asarray(value)
+            if array.shape != buffer.shape[1:] or array.dtype.kind not in "biufc":
+                self._to_object()
+            elif not np.can_cast(array.dtype, buffer.dtype):
+                self.buffer = buffer.astype(np.result_type(array.dtype, buffer.dtype))
+        if self.buffer.dtype == object:
+            self.buffer[self.count] = value
+        else:
+            self.buffer[self.count] = array
+        self.count += 1
+
+    def _to_object(self) -> None:
+        """Fall back to storing values as objects, e.g. if their shape varies."""
+        buffer = np.empty(self.size, dtype=object)
+        for i in range(self.count):
+            buffer[i] = self.buffer[i]
+        self.buffer = buffer
+
+    def pop(self):
+        """Return the buffered values and empty the buffer."""
+        values = self.buffer[: self.count].copy()
+        self.count = 0
+        return values
+
+
+class ColumnWriter:
+    """Append records to a columnar store, see the module docstring.
+
+    Keys may be missing from some records, each column then holds the values of
+    the records that have it, in order.
+
+    Args:
+        path: str or Path of the data file, the index is path + '.index'
+        flush_size: int, number of records buffered before writing a segment
+        compress: bool or int, zlib compression of segments, an int sets the level
+    """
+
+    def __init__(self, path, flush_size=1000, compress=False) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_size = flush_size
+        self.level = None if compress is False else (6 if compress is True else int(compress))
+        self.columns: dict[str, _Column] = {}
+        self.num_records = 0
+        self._num_buffered = 0
+        self._data = self.path.open("ab")
+        self._index = Path(f"{self.path}.index").open("a")  # noqa: SIM115
+
+    def append(self, record) -> None:
+        """Append a dict of values, one per key."""
+        for key, value in record.items():
+            column = self.columns.get(key)
+            if column is None:
+                column = self.columns[key] = _Column(value, self.flush_size)
+            column.append(value)
+        self.num_records += 1
+        self._num_buffered += 1
+        if self._num_buffered >= self.flush_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered values of all columns as new segments."""
+        for key, column in self.columns.items():
+            if column.count == 0:
+                continue
+            buffer = io.BytesIO()
+            np.lib.format.write_array(buffer, column.pop(), allow_pickle=True)
+            data = buffer.getvalue()
+            if self.level is not None:
+                data = zlib.compress(data, self.level)
+            entry = {"key": key, "offset": self._data.tell(), "nbytes": len(data), "compressed": self.level is not None}
+            self._data.write(data)
+            self._index.write(json.dumps(entry) + "\n")
+        self._data.flush()
+        self._index.flush()
+        self._num_buffered = 0
+
+    def close(self) -> None:
+        """Flush and close the files."""
+        if self._data.closed:
+            return
+        self.flush()
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def _concatenate(segments):
+    """Concatenate the segments of a column, as object rows if their dtypes or row shapes differ.
+
+    A column switches to object storage when the shape of its values changes,
+    so earlier segments may be typed while later ones are not.
+    """
+    if all(segment.dtype != object for segment in segments) and len({s.shape[1:] for s in segments}) == 1:
+        return np.concatenate(segments)
+    column = np.empty(sum(len(segment) for segment in segments), dtype=object)
+    i = 0
+    for segment in segments:
+        for row in segment:
+            column[i] = row
+            i += 1
+    return column
+
+
+def read_columns(path, keys=None):
+    """Read a columnar store written by ColumnWriter.
+
+    Args:
+        path: str or Path of the data file
+        keys: list of str, columns to read, default all
+
+    Returns:
+        data: dict of arrays, one per column
+    """
+    segments: dict[str, list] = {}
+    with Path(f"{path}.index").open() as f_index, Path(path).open("rb") as f_data:
+        for line in f_index:
+            entry = json.loads(line)
+            if keys is not None and entry["key"] not in keys:
+                continue
+            f_data.seek(entry["offset"])
+            data = f_data.read(entry["nbytes"])
+            if entry["compressed"]:
+                data = zlib.decompress(data)
+            segment = np.lib.format.read_array(io.BytesIO(data), allow_pickle=True)
+            segments.setdefault(entry["key"], []).append(segment)
+    return {key: _concatenate(values) for key, values in segments.items()}
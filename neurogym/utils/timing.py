@@ -0,0 +1,156 @@
+"""Compiled samplers of period durations.
+
+TrialEnv compiles each entry of its timing dict once into a sampler. The
+duration of trial k is computed from the k-th uniform number of the sampler's
+stream, so durations are drawn in vectorized blocks, for a pool of upcoming
+trials or for a whole batch of trials, and trial k still gets the same
+duration whatever was drawn before, see TrialEnv.set_trial_index.
+
+Samplers need seekable rngs and are not used with legacy RandomState rngs.
+"""
+
+import numpy as np
+
+from neurogym.utils.random import TruncExp, is_legacy_rng, make_rng, trunc_exp_ppf
+
+
+class Sampler:
+    """Durations of one period, quantized to dt.
+
+    Args:
+        dt: time step of the env
+        seed: seed of the stream of uniform numbers
+        pool_size: number of trials whose durations are drawn at once
+    """
+
+    def __init__(self, dt, seed=None, pool_size=256) -> None:
+        self.dt = dt
+        self.rng = make_rng(seed)
+        self.pool_size = pool_size
+        self._pool = np.empty(0)
+        self._pool_start = 0
+        self._trial = None
+        self._calls = 0
+
+    def ppf(self, u):
+        """Durations at the uniform numbers u in [0, 1), before quantization."""
+        raise NotImplementedError
+
+    def sample(self, trial, n, stream=0):
+        """Durations of trials trial, ..., trial + n - 1."""
+        self.rng.seek(trial, stream)
+        t = self.ppf(self.rng.random(n))
+        return (t // self.dt) * self.dt
+
+    def __call__(self, trial):
+        """Duration of trial, from the pool.
+
+        Further calls during the same trial draw from other streams, so each
+        call gets an independent duration.
+        """
+        if trial == self._trial:
+            self._calls += 1
+            return self.sample(trial, 1, stream=self._calls)[0]
+        self._trial = trial
+        self._calls = 0
+        i = trial - self._pool_start
+        if not 0 <= i < len(self._pool):
+            self._pool = self.sample(trial, self.pool_size)
+            self._pool_start = trial
+            i = 0
+        return self._pool[i]
+
+    def reset_calls(self) -> None:
+        """Make the next call the first one of its trial, e.g. when the trial is generated again."""
+        self._trial = None
+        self._calls = 0
+
+
+class Constant(Sampler):
+    """Fixed duration."""
+
+    def __init__(self, value, dt, seed=None, pool_size=256) -> None:
+        super().__init__(dt, seed, pool_size)
+        self.value = value
+
+    def sample(self, trial, n, stream=0):  # noqa: ARG002
+        return np.full(n, (self.value // self.dt) * self.dt)
+
+    def __call__(self, trial):  # noqa: ARG002
+        return (self.value // self.dt) * self.dt
+
+
+class Uniform(Sampler):
+    """Duration uniform in [low, high)."""
+
+    def __init__(self, low, high, dt, seed=None, pool_size=256) -> None:
+        super().__init__(dt, seed, pool_size)
+        self.low = low
+        self.high = high
+
+    def ppf(self, u):
+        return self.low + u * (self.high - self.low)
+
+
+class Choice(Sampler):
+    """Duration chosen uniformly among values."""
+
+    def __init__(self, values, dt, seed=None, pool_size=256) -> None:
+        super().__init__(dt, seed, pool_size)
+        self.values = np.asarray(values)
+
+    def ppf(self, u):
+        return self.values[(u * len(self.values)).astype(np.intp)]
+
+
+class TruncatedExponential(Sampler):
+    """Exponential duration of mean vmean truncated to [vmin, vmax), see random.trunc_exp."""
+
+    def __init__(self, vmean, vmin=0, vmax=np.inf, dt=100, seed=None, pool_size=256) -> None:
+        super().__init__(dt, seed, pool_size)
+        self.vmean = vmean
+        self.vmin = vmin
+        self.vmax = vmax
+
+    def ppf(self, u):
+        return trunc_exp_ppf(u, self.vmean, self.vmin, self.vmax)
+
+
+def _truncated_exponential(dt, seed, vmean, vmin=0, vmax=np.inf):
+    if vmin >= vmax:  # as trunc_exp
+        return Constant(vmax, dt, seed)
+    return TruncatedExponential(vmean, vmin, vmax, dt, seed)
+
+
+def compile_timing(timing, dt, seed=None):  # noqa: PLR0911
+    """Compile the timing of one period into a Sampler.
+
+    Args:
+        timing: value of a timing dict, see TrialEnv.sample_time
+        dt: time step of the env
+        seed: seed of the sampler
+
+    Returns:
+        sampler: Sampler, or None if timing has no sampler, e.g. it is an
+            arbitrary callable or an 'until' time, or rngs are legacy
+    """
+    if is_legacy_rng():
+        return None
+    if isinstance(timing, int | float):
+        return Constant(timing, dt, seed)
+    if isinstance(timing, TruncExp):
+        return _truncated_exponential(dt, seed, timing.vmean, timing.vmin, timing.vmax)
+    if callable(timing):
+        return None
+    if isinstance(timing[0], int | float):
+        return Choice(timing, dt, seed)
+    dist, args = timing
+    if dist == "uniform":
+        return Uniform(*args, dt, seed)
+    if dist == "choice":
+        return Choice(args, dt, seed)
+    if dist == "truncated_exponential":
+        return _truncated_exponential(dt, seed, *args)
+    if dist == "constant":
+        return Constant(args, dt, seed)
+    return None
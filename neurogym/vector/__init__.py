@@ -0,0 +1,15 @@
+"""Vectorized environments for trial-based tasks."""
+
+from neurogym.vector.vector_trial_env import VectorTrialEnv
+
+__all__ = ["SharedMemoryTrialVecEnv", "VectorTrialEnv"]
+
+
+def __getattr__(name):
+    # SharedMemoryTrialVecEnv is a stable-baselines3 VecEnv, so it is only loaded when first used
+    if name == "SharedMemoryTrialVecEnv":
+        from neurogym.vector.shared_memory import SharedMemoryTrialVecEnv  # noqa: PLC0415
+
+        return SharedMemoryTrialVecEnv
+    msg = f"module {__name__!r} has no attribute {name!r}"
+    raise AttributeError(msg)
@@ -0,0 +1,286 @@
+"""Subprocess vector env exchanging observations through shared memory."""
+
+import contextlib
+import multiprocessing as mp
+import traceback
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+from stable_baselines3.common.env_util import is_wrapped
+from stable_baselines3.common.vec_env.base_vec_env import CloudpickleWrapper, VecEnv
+
+
+def _buffer_specs(num_envs, observation_space, action_space):
+    """Names, shapes and dtypes of the shared arrays."""
+    ob_shape, ob_dtype = observation_space.shape, observation_space.dtype
+    act_shape, act_dtype = action_space.shape, action_space.dtype
+    return [
+        ("obs", (num_envs, *ob_shape), ob_dtype),
+        ("terminal_obs", (num_envs, *ob_shape), ob_dtype),
+        ("actions", (num_envs, *act_shape), act_dtype),
+        ("gt", (num_envs, *act_shape), act_dtype),
+        ("rewards", (num_envs,), np.dtype(np.float32)),
+        ("dones", (num_envs,), np.dtype(bool)),
+        ("new_trial", (num_envs,), np.dtype(bool)),
+    ]
+
+
+def _attach(buffers):
+    shms = [shared_memory.SharedMemory(name=shm_name) for _, shm_name, _, _ in buffers]
+    arrays = {
+        name: np.ndarray(shape, dtype, buffer=shm.buf)
+        for shm, (name, _, shape, dtype) in zip(shms, buffers, strict=True)
+    }
+    return shms, arrays
+
+
+def _step(env, i, arrays, new_trial_done):
+    """Step env, the i-th of the vector env, write its results and return the info of an ended trial or None."""
+    action = arrays["actions"][i]
+    ob, reward, terminated, truncated, info = env.step(action if action.ndim else action.item())
+    new_trial = bool(info.get("new_trial", False))
+    arrays["rewards"][i] = reward
+    arrays["new_trial"][i] = new_trial
+    if "gt" in info:
+        arrays["gt"][i] = info["gt"]
+    done = terminated or truncated or (new_trial and new_trial_done)
+    arrays["dones"][i] = done
+    if not (done or new_trial):
+        arrays["obs"][i] = ob
+        return None
+    info = {key: value for key, value in info.items() if key not in ("gt", "new_trial")}
+    info["TimeLimit.truncated"] = truncated and not terminated
+    if done:
+        arrays["terminal_obs"][i] = ob
+    if terminated or truncated:
+        # The task starts a new trial by itself at the end of a trial, the env is only reset at the end of an episode
+        ob, _ = env.reset()
+    arrays["obs"][i] = ob
+    return info
+
+
+def _handle(command, data, envs, indices, arrays, new_trial_done):
+    """Run a command of the parent on the envs of a worker and return its result."""
+    if command == "step":
+        infos = [(i, _step(env, i, arrays, new_trial_done)) for i, env in zip(indices, envs, strict=True)]
+        return [(i, info) for i, info in infos if info is not None]
+    if command == "reset":
+        seeds, options = data
+        for i, env, seed, option in zip(indices, envs, seeds, options, strict=True):
+            if seed is not None:
+                env.unwrapped.seed(seed)  # reset(seed=) does not seed the rng of TrialEnv
+            arrays["obs"][i], _ = env.reset(**({"options": option} if option else {}))
+        return None
+    *args, local = data
+    if command == "get_attr":
+        return [envs[j].get_wrapper_attr(args[0]) for j in local]
+    if command == "set_attr":
+        return [setattr(envs[j], *args) for j in local]
+    if command == "env_method":
+        name, method_args, method_kwargs = args
+        return [envs[j].get_wrapper_attr(name)(*method_args, **method_kwargs) for j in local]
+    if command == "is_wrapped":
+        return [is_wrapped(envs[j], args[0]) for j in local]
+    msg = f"Unknown command {command!r}."
+    raise ValueError(msg)
+
+
+def _worker(env_fns, remote, parent_remote, new_trial_done) -> None:
+    """Run the envs of env_fns and serve the commands of the parent.
+
+    Commands are (name, data) tuples. The first one attaches the shared
+    arrays. On "step", the envs read their actions from and write their
+    results to the shared arrays, and the worker replies with the infos of the
+    envs whose trial or episode ended. Replies are ("ok", result), or
+    ("error", traceback) after which the worker exits.
+    """
+    parent_remote.close()
+    shms: list = []
+    try:
+        envs = [env_fn() for env_fn in env_fns.var]
+        remote.send(("ok", (envs[0].observation_space, envs[0].action_space)))
+        _, (buffers, indices) = remote.recv()
+        shms, arrays = _attach(buffers)
+        remote.send(("ok", None))
+        while (command := remote.recv())[0] != "close":
+            remote.send(("ok", _handle(*command, envs, indices, arrays, new_trial_done)))
+        for env in envs:
+            env.close()
+    except (EOFError, KeyboardInterrupt):
+        pass
+    except Exception:  # noqa: BLE001 - the error is raised in the parent
+        remote.send(("error", traceback.format_exc()))
+    finally:
+        arrays = None
+        for shm in shms:
+            shm.close()
+        remote.close()
+
+
+class SharedMemoryTrialVecEnv(VecEnv):
+    """Stable-baselines3 VecEnv stepping envs in worker processes through shared memory.
+
+    Each worker process runs envs_per_worker of the envs, e.g. wrapped
+    TrialEnvs. Actions, observations, rewards, done flags, ground truths and
+    new_trial flags are exchanged through shared arrays, so a step only sends
+    a short command to each worker, instead of pickling the observations as
+    SubprocVecEnv does. Other info items are only sent at the end of a trial
+    or episode.
+
+    Observations are not pickled, so this pays off for large observations,
+    e.g. the image observations of the psychopy envs, and for cheap envs
+    batched several per worker.
+
+    Args:
+        env_fns: list of functions returning the envs
+        envs_per_worker: int, number of envs run by each worker process
+        new_trial_done: bool, if True, the end of each trial is an episode end
+            for stable-baselines3: done is True and the info holds the
+            'terminal_observation'. The task itself starts the new trial.
+            Envs are reset when they are terminated or truncated.
+        start_method: str, multiprocessing start method, default 'fork' if
+            available, 'spawn' otherwise
+    """
+
+    def __init__(self, env_fns, envs_per_worker=1, new_trial_done=True, start_method=None) -> None:
+        if start_method is None:
+            start_method = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+        ctx = mp.get_context(start_method)
+        # Started before the workers so that they share it, the blocks they attach are unlinked by the parent only
+        resource_tracker.ensure_running()
+        num_envs = len(env_fns)
+        self.new_trial_done = new_trial_done
+        self.waiting = False
+        self.closed = False
+        self._env_slices = [
+            np.arange(start, min(start + envs_per_worker, num_envs)) for start in range(0, num_envs, envs_per_worker)
+        ]
+        self.remotes, self.processes = [], []
+        for ind in self._env_slices:
+            remote, work_remote = ctx.Pipe()
+            fns = CloudpickleWrapper([env_fns[i] for i in ind])
+            process = ctx.Process(target=_worker, args=(fns, work_remote, remote, new_trial_done), daemon=True)
+            process.start()
+            work_remote.close()
+            self.remotes.append(remote)
+            self.processes.append(process)
+        observation_space, action_space = self._receive(self.remotes[0])
+        for remote in self.remotes[1:]:
+            self._receive(remote)
+
+        self._shms = []
+        buffers = []
+        for name, shape, dtype in _buffer_specs(num_envs, observation_space, action_space):
+            shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+            self._shms.append(shm)
+            buffers.append((name, shm.name, shape, dtype))
+        self._arrays = {
+            name: np.ndarray(shape, dtype, buffer=shm.buf)
+            for shm, (name, _, shape, dtype) in zip(self._shms, buffers, strict=True)
+        }
+        self._call_all([("attach", (buffers, ind)) for ind in self._env_slices])
+        super().__init__(num_envs, observation_space, action_space)
+
+    def _receive(self, remote):
+        status, result = remote.recv()
+        if status == "error":
+            self.waiting = False  # the other workers may still reply, close does not wait for them
+            self.close()
+            msg = f"SharedMemoryTrialVecEnv worker failed:\n{result}"
+            raise RuntimeError(msg)
+        return result
+
+    def _call_all(self, commands, remotes=None):
+        """Send one command to each remote and return their results."""
+        remotes = self.remotes if remotes is None else remotes
+        for remote, command in zip(remotes, commands, strict=True):
+            remote.send(command)
+        return [self._receive(remote) for remote in remotes]
+
+    def _call_envs(self, command, data, indices):
+        """Send command with data and the local indices of the envs in indices to their workers, results by env."""
+        indices = self._get_indices(indices)
+        targets = []
+        for worker, ind in enumerate(self._env_slices):
+            local = [i - ind[0] for i in indices if ind[0] <= i <= ind[-1]]
+            if local:
+                targets.append((worker, local))
+        results = self._call_all(
+            [(command, (*data, local)) for _, local in targets],
+            [self.remotes[worker] for worker, _ in targets],
+        )
+        by_env = {}
+        for (worker, local), result in zip(targets, results, strict=True):
+            by_env.update({self._env_slices[worker][0] + j: value for j, value in zip(local, result, strict=True)})
+        return [by_env[i] for i in indices]
+
+    def reset(self):
+        commands = [
+            ("reset", ([self._seeds[i] for i in ind], [self._options[i] for i in ind])) for ind in self._env_slices
+        ]
+        self._call_all(commands)
+        self.reset_infos = [{} for _ in range(self.num_envs)]
+        self._reset_seeds()
+        self._reset_options()
+        return self._arrays["obs"].copy()
+
+    def step_async(self, actions) -> None:
+        self._arrays["actions"][:] = np.asarray(actions).reshape(self._arrays["actions"].shape)
+        for remote in self.remotes:
+            remote.send(("step", None))
+        self.waiting = True
+
+    def step_wait(self):
+        ended = [item for remote in self.remotes for item in self._receive(remote)]
+        self.waiting = False
+        arrays = self._arrays
+        gt, new_trial = arrays["gt"], arrays["new_trial"]
+        infos = [
+            {"new_trial": bool(new_trial[i]), "gt": gt[i].copy() if gt.ndim > 1 else gt[i]}
+            for i in range(self.num_envs)
+        ]
+        for i, info in ended:
+            infos[i].update(info)
+            if arrays["dones"][i]:
+                infos[i]["terminal_observation"] = arrays["terminal_obs"][i].copy()
+        return arrays["obs"].copy(), arrays["rewards"].copy(), arrays["dones"].copy(), infos
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            for remote in self.remotes:
+                # The worker may have exited on an error
+                with contextlib.suppress(EOFError, BrokenPipeError, OSError):
+                    if self.waiting:
+                        remote.recv()
+                    remote.send(("close", None))
+            for process in self.processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+        finally:
+            self.waiting = False
+            self._arrays = {}
+            for shm in getattr(self, "_shms", []):
+                shm.close()
+                with contextlib.suppress(FileNotFoundError):  # e.g. at interpreter exit
+                    shm.unlink()
+            self._shms = []
+
+    def __del__(self) -> None:
+        if not getattr(self, "closed", True):
+            self.close()
+
+    def get_attr(self, attr_name, indices=None):
+        return self._call_envs("get_attr", (attr_name,), indices)
+
+    def set_attr(self, attr_name, value, indices=None) -> None:
+        self._call_envs("set_attr", (attr_name, value), indices)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        return self._call_envs("env_method", (method_name, method_args, method_kwargs), indices)
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return self._call_envs("is_wrapped", (wrapper_class,), indices)
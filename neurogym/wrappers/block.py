@@ -4,6 +4,7 @@ import numpy as np
 from gymnasium import spaces
 
 from neurogym.core import TrialWrapper
+from neurogym.utils.random import spawn
 
 
 class RandomGroundTruth(TrialWrapper):
@@ -41,8 +42,9 @@ class ScheduleAttr(TrialWrapper):
         self.attr_list = attr_list
 
     def seed(self, seed=None) -> None:
-        self.schedule.seed(seed)
-        self.env.seed(seed)  # type: ignore[attr-defined]
+        seed_schedule, seed_env = spawn(seed, 2)
+        self.schedule.seed(seed_schedule)
+        self.env.seed(seed_env)  # type: ignore[attr-defined]
 
     def new_trial(self, **kwargs):
         i = self.schedule()
@@ -94,6 +96,8 @@ class MultiEnvs(TrialWrapper):
                 msg = f"Env must have 1-D Box shape but got {env_shape}."
                 raise ValueError(msg)
             _have_equal_shape(envs)
+            for env in envs:
+                env.unwrapped._ob_pad = max(env.unwrapped._ob_pad, len(envs))  # noqa: SLF001
             self.observation_space: spaces.Box = spaces.Box(
                 -np.inf,
                 np.inf,
@@ -129,12 +133,8 @@ class MultiEnvs(TrialWrapper):
 
         trial = self.env.new_trial(**kwargs)
         # Expand observation
-        env_ob = np.zeros(
-            (self.unwrapped.ob.shape[0], len(self.envs)),  # type: ignore[attr-defined]
-            dtype=self.unwrapped.ob.dtype,  # type: ignore[attr-defined]
-        )
-        env_ob[:, self.i_env] = 1.0
-        self.unwrapped.ob = np.concatenate((self.unwrapped.ob, env_ob), axis=-1)  # type: ignore[attr-defined]
+        env_ob = self.unwrapped._pad_ob(len(self.envs))  # type: ignore[attr-defined]  # noqa: SLF001
+        env_ob[:, -len(self.envs) + self.i_env] = 1.0
         return trial
 
 
@@ -164,6 +164,8 @@ class ScheduleEnvs(TrialWrapper):
                 msg = f"Env must have 1-D Box shape but got {env_shape}."
                 raise ValueError(msg)
             _have_equal_shape(envs)
+            for env in envs:
+                env.unwrapped._ob_pad = max(env.unwrapped._ob_pad, len(envs))  # noqa: SLF001
             self.observation_space: spaces.Box = spaces.Box(
                 -np.inf,
                 np.inf,
@@ -172,9 +174,10 @@ class ScheduleEnvs(TrialWrapper):
             )
 
     def seed(self, seed=None) -> None:
-        for env in self.envs:
-            env.seed(seed)
-        self.schedule.seed(seed)
+        *seeds, seed_schedule = spawn(seed, len(self.envs) + 1)
+        for env, seed_env in zip(self.envs, seeds, strict=True):
+            env.seed(seed_env)
+        self.schedule.seed(seed_schedule)
 
     def reset(self, **kwargs):
         # TODO: kwargs to specify the condition for new_trial
@@ -214,13 +217,9 @@ class ScheduleEnvs(TrialWrapper):
             trial = self.env.new_trial(**kwargs)
         else:
             trial = self.env.new_trial(**kwargs)
-            # Expand observation
-            env_ob = np.zeros(
-                (self.unwrapped.ob.shape[0], len(self.envs)),  # type: ignore[attr-defined]
-                dtype=self.unwrapped.ob.dtype,  # type: ignore[attr-defined]
-            )
-            env_ob[:, self.i_env] = 1.0
-            self.unwrapped.ob = np.concatenate((self.unwrapped.ob, env_ob), axis=-1)  # type: ignore[attr-defined]
+            # Expand observation in place, into the columns reserved in __init__
+            env_ob = self.unwrapped._pad_ob(len(self.envs))  # type: ignore[attr-defined]  # noqa: SLF001
+            env_ob[:, -len(self.envs) + self.i_env] = 1.0
 
         self.next_i_env = self.schedule()
         if self.env != self.envs[self.i_env]:
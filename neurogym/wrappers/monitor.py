@@ -3,7 +3,7 @@ from pathlib import Path
 import numpy as np
 from gymnasium import Wrapper
 
-from neurogym.utils.plotting import fig_
+from neurogym.utils.storage import ColumnWriter
 
 
 class Monitor(Wrapper):
@@ -21,6 +21,14 @@ class Monitor(Wrapper):
             a figure will be updated every sv_per. (def: False, bool)
         num_stps_sv_fig: Number of trial steps to include in the figure.
             (def: 100, int)
+        storage: 'npz' to save the data of the last sv_per trials or steps in a
+            new npz file each time, or 'stream' to append it to a single
+            columnar store, readable with neurogym.utils.storage.read_columns.
+            (def: 'npz', str)
+        flush_size: Number of trials buffered before writing to the store, if
+            storage is 'stream'. (def: 1000, int)
+        compress: Whether to zlib-compress the store, if storage is 'stream'.
+            (def: False, bool)
     """
 
     metadata: dict[str, str | None] = {  # noqa: RUF012
@@ -44,6 +52,9 @@ class Monitor(Wrapper):
         name="",
         fig_type="png",
         step_fn=None,
+        storage="npz",
+        flush_size=1000,
+        compress=False,
     ) -> None:
         super().__init__(env)
         self.env = env
@@ -60,9 +71,19 @@ class Monitor(Wrapper):
         if folder is None:
             # FIXME is it ok to use tempfile.TemporaryDirectory instead or does this need to be stored locally always?
             self.folder = "tmp"
+        else:
+            self.folder = folder
         Path(self.folder).mkdir(parents=True, exist_ok=True)
         # seeding
         self.sv_name = self.folder + self.env.__class__.__name__ + "_bhvr_data_" + name + "_"  # FIXME: use pathlib
+        if storage not in ("npz", "stream"):
+            msg = f"storage must be 'npz' or 'stream', got {storage}."
+            raise ValueError(msg)
+        self.writer = None
+        if storage == "stream":
+            self.writer = ColumnWriter(self.sv_name + "stream.npy", flush_size=flush_size, compress=compress)
+            self._reward_sum = 0.0
+            self._num_rewards = 0
         # figure
         self.sv_fig = sv_fig
         if self.sv_fig:
@@ -89,23 +110,34 @@ class Monitor(Wrapper):
             self.t += 1
         if info["new_trial"]:
             self.num_tr += 1
-            self.data["action"].append(action)
-            self.data["reward"].append(rew)
-            for key in info:
-                if key not in self.data:
-                    self.data[key] = [info[key]]
-                else:
-                    self.data[key].append(info[key])
+            if self.writer is not None:
+                self.writer.append({"action": action, "reward": rew, **info})
+                self._reward_sum += rew
+                self._num_rewards += 1
+            else:
+                self.data["action"].append(action)
+                self.data["reward"].append(rew)
+                for key in info:
+                    if key not in self.data:
+                        self.data[key] = [info[key]]
+                    else:
+                        self.data[key].append(info[key])
 
             # save data
             save = False
             save = self.t >= self.sv_per if self.sv_stp == "timestep" else self.num_tr % self.sv_per == 0
             if save:
-                np.savez(self.sv_name + str(self.num_tr) + ".npz", **self.data)  # FIXME: use pathlib
+                if self.writer is not None:
+                    self.writer.flush()
+                    mean_reward = self._reward_sum / max(self._num_rewards, 1)
+                    self._reward_sum, self._num_rewards = 0.0, 0
+                else:
+                    np.savez(self.sv_name + str(self.num_tr) + ".npz", **self.data)  # FIXME: use pathlib
+                    mean_reward = np.mean(self.data["reward"])
                 if self.verbose:
                     print("--------------------")
                     print("Number of steps: ", np.mean(self.num_tr))
-                    print("Average reward: ", np.mean(self.data["reward"]))
+                    print("Average reward: ", mean_reward)
                     print("--------------------")
                 self.reset_data()
                 if self.sv_fig:
@@ -114,6 +146,11 @@ class Monitor(Wrapper):
                     self.t = 0
         return obs, rew, terminated, truncated, info
 
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        super().close()
+
     def reset_data(self) -> None:
         for key in self.data:
             self.data[key] = []
@@ -133,6 +170,8 @@ class Monitor(Wrapper):
                 self.perf_mat.append(-1)
             self.stp_counter += 1
         elif len(self.rew_mat) > 0:
+            from neurogym.utils.plotting import fig_  # noqa: PLC0415 - matplotlib is loaded on first plot
+
             fname = self.sv_name + f"task_{self.num_tr:06d}.{self.fig_type}"
             obs_mat = np.array(self.ob_mat)
             act_mat = np.array(self.act_mat)
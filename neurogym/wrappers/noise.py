@@ -8,6 +8,9 @@ Created on Thu Feb 28 15:07:21 2019
 # -*- coding: utf-8 -*-
 
 import gymnasium as gym
+import numpy as np
+
+from neurogym.utils.random import standard_normal
 
 
 class Noise(gym.Wrapper):
@@ -19,6 +22,8 @@ class Noise(gym.Wrapper):
             performance is not larger than perf_th. (def: None, float)
         w: Window used to compute the mean performance. (def: 100, int)
         step_noise: Step used to increment/decrease std. (def: 0.001, float)
+        block: If True, the noise of all the steps of a trial is drawn at once
+            at its first step, with the std_noise of that time. (def: False)
 
     """
 
@@ -28,12 +33,17 @@ class Noise(gym.Wrapper):
         "paper_name": None,
     }
 
-    def __init__(self, env, std_noise=0.1) -> None:
+    def __init__(self, env, std_noise=0.1, block=False) -> None:
         super().__init__(env)
         self.env = env
         self.std_noise = std_noise
+        self.block = block
+        self._buffer = None  # reused, holds self._noise
+        self._noise = None  # noise of the next steps, one row per step
+        self._noise_index = 0
 
     def reset(self, options=None):
+        self._noise = None
         step_fn = options.get("step_fn") if options else None
         if step_fn is None:
             step_fn = self.step
@@ -42,5 +52,24 @@ class Noise(gym.Wrapper):
     def step(self, action):
         obs, reward, terminated, truncated, info = self.env.step(action)
         # add noise
-        obs += self.env.rng.normal(loc=0, scale=self.std_noise, size=obs.shape)
+        if not self.block:
+            obs += self._draw(1, obs)[0]
+            return obs, reward, terminated, truncated, info
+        if self._noise is None or info.get("new_trial", False) or self._noise_index >= len(self._noise):
+            task = self.env.unwrapped
+            self._draw(max(1, int(task.tmax / task.dt)), obs)
+        obs += self._noise[self._noise_index]
+        self._noise_index += 1
         return obs, reward, terminated, truncated, info
+
+    def _draw(self, num_steps, obs):
+        """Draw the noise of num_steps steps into the reused buffer, in the dtype of obs."""
+        dtype = obs.dtype if np.issubdtype(obs.dtype, np.floating) else np.float64
+        buffer = self._buffer
+        if buffer is None or len(buffer) < num_steps or buffer.shape[1:] != obs.shape or buffer.dtype != dtype:
+            self._buffer = buffer = np.empty((num_steps, *obs.shape), dtype=dtype)
+        self._noise = buffer[:num_steps]
+        standard_normal(self.env.rng, self._noise)
+        self._noise *= self.std_noise
+        self._noise_index = 0
+        return self._noise
@@ -45,6 +45,7 @@ class ReactionTime(gym.Wrapper):  # TODO: Make this a trial wrapper instead?
             # set start of decision period
             try:
                 self.env.start_t[dec] = self.env.start_t[stim] + self.env.dt
+                self.unwrapped._compile_periods()  # noqa: SLF001
             except AttributeError as e:
                 msg = "Reaction time wrapper requires a stimulus period."
                 raise AttributeError(msg) from e
@@ -0,0 +1,31 @@
+"""Test the benchmark runner."""
+
+import json
+
+from benchmarks import runner
+from benchmarks.__main__ import main
+
+
+def test_measure():
+    stats = runner.measure(lambda: None, min_time=0.001, repeat=3)
+    assert stats["repeat"] == 3
+    assert 0 < stats["min"] <= stats["median"]
+    stats = runner.measure(lambda: 0.5, min_time=1, repeat=2, self_timed=True)
+    assert stats["min"] == 0.5
+
+
+def test_run_and_compare(tmp_path):
+    base, new = tmp_path / "base.json", tmp_path / "new.json"
+    args = ["--min-time", "0.001", "--repeat", "2", "step[PerceptualDecisionMaking-v0]", "wrapper_step[Monitor]"]
+    assert main(["run", *args, "-o", str(base)]) == 0
+    results = json.loads(base.read_text())
+    assert set(results["benchmarks"]) == {"step[PerceptualDecisionMaking-v0]", "wrapper_step[Monitor]"}
+
+    # Twice slower
+    for stats in results["benchmarks"].values():
+        stats["min"] *= 2
+    runner.save(results, new)
+    rows = runner.compare(runner.load(base), runner.load(new))
+    assert [status for *_, status in rows] == ["slower", "slower"]
+    assert main(["compare", str(base), str(new)]) == 1
+    assert main(["compare", str(base), str(base)]) == 0
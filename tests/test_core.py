@@ -1,6 +1,10 @@
+import copy
+
 import numpy as np
+import pytest
 
 import neurogym as ngym
+from neurogym.utils.scheduler import SequentialSchedule
 
 
 def test_one_step_mismatch():
@@ -76,3 +80,208 @@ def test_addob_instep():
     for i in range(10):
         ob, _rew, _terminated, _truncated, _info = env.step(action=0)
         assert ob[0] == ((i + 1) % 5) + 1  # each trial is 5 steps
+
+
+def test_new_trials_matches_new_trial():
+    """Test that batched trial generation matches per-trial generation without noise."""
+    env = ngym.make("PerceptualDecisionMaking-v0", sigma=0).unwrapped
+    ground_truth = np.array([0, 1, 1, 0])
+    coh = np.array([0, 6.4, 25.6, 51.2])
+    batch = env.new_trials(4, ground_truth=ground_truth, coh=coh)
+    assert batch.ob.shape[:2] == batch.gt.shape[:2] == (4, batch.lengths.max())
+    for i in range(4):
+        env.new_trial(ground_truth=ground_truth[i], coh=coh[i])
+        assert batch.lengths[i] == env.ob.shape[0]
+        assert np.allclose(batch.ob[i, : batch.lengths[i]], env.ob)
+        assert (batch.gt[i, : batch.lengths[i]] == env.gt).all()
+    assert (batch.trials["coh"] == coh).all()
+
+
+NEW_TRIALS_KWARGS = {
+    "AntiReach-v0": {"ground_truth": [0, 5, 17, 31], "anti": [True, False, True, False]},
+    "ContextDecisionMaking-v0": {
+        "ground_truth": [1, 2, 2, 1],
+        "other_choice": [2, 2, 1, 1],
+        "context": [0, 1, 0, 1],
+        "coh_0": [5, 15, 50, 5],
+        "coh_1": [50, 5, 15, 15],
+    },
+    "SingleContextDecisionMaking-v0": {
+        "ground_truth": [0, 1, 1, 0],
+        "other_choice": [1, 1, 0, 0],
+        "context": [0, 1, 0, 1],
+        "coh_0": [5, 15, 50, 5],
+        "coh_1": [50, 5, 15, 15],
+    },
+    "DelayComparison-v0": {"ground_truth": [1, 2, 2, 1], "vpair": [(18, 10), (22, 14), (26, 18), (34, 26)]},
+    "DelayMatchSample-v0": {"ground_truth": [1, 2, 1, 2], "sample_theta": [0, np.pi, np.pi, 0]},
+    "MultiSensoryIntegration-v0": {
+        "ground_truth": [0, 1, 1, 0],
+        "coh": [5, 15, 50, 5],
+        "coh_prop": [0.1, 0.5, 0.9, 0.3],
+    },
+}
+
+
+@pytest.mark.parametrize("env_id", NEW_TRIALS_KWARGS)
+def test_new_trials_matches_new_trial_envs(env_id):
+    """Batched trial generation matches per-trial generation for the trial info given as kwargs."""
+    env_kwargs = {} if env_id == "AntiReach-v0" else {"sigma": 0}
+    if "ContextDecisionMaking" in env_id:
+        env_kwargs["timing"] = {"delay": 600}  # the delay is random otherwise
+    env = ngym.make(env_id, **env_kwargs).unwrapped
+    kwargs = NEW_TRIALS_KWARGS[env_id]
+    batch = env.new_trials(4, **kwargs)
+    for i in range(4):
+        env.new_trial(**{key: val[i] for key, val in kwargs.items()})
+        length = env.ob.shape[0]
+        assert batch.lengths[i] == length
+        assert np.allclose(batch.ob[i, :length], env.ob)
+        assert (batch.gt[i, :length] == env.gt).all()
+
+
+def test_new_trials_random_envs():
+    """Batched trials of envs with draws outside the trial info respond to their trial info."""
+    env = ngym.make("IntervalDiscrimination-v0").unwrapped
+    batch = env.new_trials(16)
+    assert np.array_equal(batch.end_t["stim1"] - batch.start_t["stim1"], batch.trials["duration1"])
+    assert (batch.gt[np.arange(16), batch.lengths - 1] == batch.trials["ground_truth"]).all()
+
+    env = ngym.make("PulseDecisionMaking-v0").unwrapped
+    batch = env.new_trials(16)
+    for i in range(env.n_bin):
+        cue = batch.period_mask(f"cue{i}")
+        assert (batch.ob[cue, 1] == np.repeat(batch.trials["pulse1"][:, i], cue.sum(axis=1))).all()
+    assert (batch.gt[np.arange(16), batch.lengths - 1] == batch.trials["ground_truth"] + 1).all()
+
+    env = ngym.make("DelayMatchCategory-v0", sigma=0).unwrapped
+    batch = env.new_trials(16)
+    match = batch.trials["ground_truth"] == "match"
+    assert (batch.gt[np.arange(16), batch.lengths - 1] == np.where(match, 1, 2)).all()
+    assert (batch.ob[batch.period_mask("test"), 0] == 0).all()
+
+
+def test_new_trials_fallback():
+    """Test that envs without batched generation fall back to new_trial."""
+    env = ngym.make("PerceptualDecisionMakingDelayResponse-v0").unwrapped
+    batch = env.new_trials(8)
+    assert batch.ob.shape[0] == batch.gt.shape[0] == 8
+    assert set(batch.trials) >= {"ground_truth", "sigma"}
+    for i in range(8):
+        length = batch.lengths[i]
+        assert batch.period_mask("decision")[i, length - 1]
+        assert not batch.view_mask()[i, length:].any()
+
+
+def test_trial_buffers_reused():
+    """Observations and ground truth of new trials are written into the same buffers."""
+    env = ngym.make("PerceptualDecisionMaking-v0").unwrapped
+    env.reset()
+    ob, _, _, _, _ = env.step(0)
+    ob_saved = ob.copy()
+    env.new_trial()
+    ob_buffer, gt_buffer = env._ob_arena, env._gt_arena
+    for _ in range(20):
+        env.new_trial()
+        assert np.shares_memory(env.ob, ob_buffer)
+        assert np.shares_memory(env.gt, gt_buffer)
+    assert np.array_equal(ob, ob_saved)
+
+
+def test_env_input_written_in_place():
+    """ScheduleEnvs writes the env one-hot into columns reserved in the buffer."""
+    envs = [ngym.make("PerceptualDecisionMaking-v0") for _ in range(3)]
+    env = ngym.wrappers.ScheduleEnvs(envs, SequentialSchedule(3), env_input=True)
+    env.reset()
+    for _ in range(6):
+        env.new_trial()
+        task = env.unwrapped
+        assert np.shares_memory(task.ob, task._ob_arena)
+        assert task.ob.shape[1] == env.observation_space.shape[0]
+        assert np.all(task.ob[:, -3 + env.i_env] == 1)
+        assert np.all(task.ob[:, -3:].sum(axis=1) == 1)
+
+
+def test_compiled_periods_match_times():
+    """The compiled period schedule agrees with start_t and end_t at every step."""
+    for env_name in ["PerceptualDecisionMaking-v0", "DelayMatchSample-v0", "ReadySetGo-v0", "GoNogo-v0"]:
+        env = ngym.make(env_name, dt=20).unwrapped
+        env.reset(seed=0)
+        for _ in range(200):
+            for p in env._trial_periods:
+                assert env.in_period(p) == (env.start_t[p] <= env.t < env.end_t[p])
+            ids = env.period_ids  # None if periods overlap
+            if ids is not None and env.t_ind < len(ids):
+                period = env.current_period
+                assert ids[env.t_ind] == (env._trial_periods.index(period) if period else -1)
+                assert all((period == p) == env.in_period(p) for p in env._trial_periods)
+            env.step(env.action_space.sample())
+
+
+def _step_until_new_trial(env, actions):
+    steps = []
+    for action in actions:
+        steps.append(env.step(action))
+        if steps[-1][4]["new_trial"]:
+            break
+    return steps
+
+
+def test_step_trial_matches_step():
+    """step_trial returns what stepping through the trial one action at a time returns."""
+    for env_name in ["PerceptualDecisionMaking-v0", "ContextDecisionMaking-v0", "GoNogo-v0"]:
+        env, env_step_trial = (ngym.make(env_name, dt=20).unwrapped for _ in range(2))
+        for e in (env, env_step_trial):
+            e.seed(0)
+            e.reset()
+        rng = np.random.default_rng(0)
+        for _ in range(30):
+            # Mostly fixate, so that trials end by all possible conditions
+            actions = [env.action_space.sample() if rng.random() < 0.05 else 0 for _ in range(len(env.ob) + 5)]
+            steps = _step_until_new_trial(env, actions)
+            ob, reward, terminated, truncated, info = env_step_trial.step_trial(actions)
+            assert len(ob) == len(steps)
+            assert np.array_equal(ob, [step[0] for step in steps])
+            assert np.allclose(reward, [step[1] for step in steps])
+            assert not terminated.any()
+            assert not truncated.any()
+            assert np.array_equal(info["gt"], [step[4]["gt"] for step in steps])
+            assert info["new_trial"]
+            assert info["performance"] == steps[-1][4]["performance"]
+            assert env.t_ind == env_step_trial.t_ind == 0
+            assert np.array_equal(env.ob, env_step_trial.ob)
+
+        # From the middle of a trial, running out of actions
+        _, _, _, _, info = env_step_trial.step_trial([0, 0])
+        assert not info["new_trial"]
+        assert env_step_trial.t_ind == 2
+
+
+def test_add_randn_draws_in_ob_dtype():
+    """add_randn adds samples drawn in the dtype of the observation from the env rng."""
+    env = ngym.make("PerceptualDecisionMaking-v0", sigma=0).unwrapped
+    env.seed(0)
+    env.new_trial()
+    ob = env.ob.copy()
+    rng = copy.deepcopy(env.rng)
+    env.add_randn(1, 2, "stimulus", where="stimulus")
+    stimulus = slice(env.start_ind["stimulus"], env.end_ind["stimulus"])
+    noise = 1 + 2 * rng.standard_normal(ob[stimulus, 1:].shape, dtype=np.float32)
+    assert env.ob.dtype == np.float32
+    assert np.array_equal(env.ob[stimulus, 1:], ob[stimulus, 1:] + noise)
+    assert np.array_equal(env.ob[:, 0], ob[:, 0])
+
+
+def test_template_cache_matches_uncached():
+    """Trials built from cached templates are the same as trials built from scratch."""
+    cached, uncached = (ngym.make("PerceptualDecisionMaking-v0").unwrapped for _ in range(2))
+    cached.enable_template_cache(maxsize=4)
+    for env in (cached, uncached):
+        env.seed(0)
+    for _ in range(50):
+        assert cached.new_trial() == uncached.new_trial()
+        assert np.array_equal(cached.ob, uncached.ob)
+        assert np.array_equal(cached.gt, uncached.gt)
+    assert len(cached.template_cache) == 4
+    assert cached.template_cache.hits > 0
+    assert cached.template_cache.hits + cached.template_cache.misses == 50
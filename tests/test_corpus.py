@@ -0,0 +1,56 @@
+"""Test on-disk trial corpora."""
+
+import numpy as np
+
+import neurogym as ngym
+from neurogym.utils.corpus import Corpus, CorpusDataset, write_corpus
+from neurogym.utils.scheduler import SequentialSchedule
+
+ENV = "PerceptualDecisionMaking-v0"
+
+
+def test_corpus_matches_generated_trials(tmp_path):
+    """A corpus holds the same trials as generated with the same seed."""
+    write_corpus(tmp_path, ENV, 25, env_kwargs={"dt": 100}, seed=0, chunk_size=10)
+    corpus = Corpus(tmp_path)
+    assert len(corpus) == 25
+    assert len(corpus.trials["ground_truth"]) == 25
+
+    env = ngym.make(ENV, dt=100).unwrapped
+    env.seed(0)
+    batches = [env.new_trials(n) for n in [10, 10, 5]]
+    trials = [(b.ob[i, : b.lengths[i]], b.gt[i, : b.lengths[i]]) for b in batches for i in range(len(b))]
+    for i, (ob, gt) in enumerate(trials):
+        ob_corpus, gt_corpus = corpus.trial(i)
+        assert np.array_equal(ob, ob_corpus)
+        assert np.array_equal(gt, gt_corpus)
+
+
+def test_corpus_dataset(tmp_path):
+    """CorpusDataset serves views of consecutive steps of each stream."""
+    write_corpus(tmp_path, ENV, 40, env_kwargs={"dt": 100}, seed=0)
+    corpus = Corpus(tmp_path)
+    batch_size, seq_len = 4, 5
+    dataset = CorpusDataset(corpus, batch_size=batch_size, seq_len=seq_len)
+    stream_len = len(corpus.ob) // batch_size
+    for i in range(dataset.num_batch + 1):
+        inputs, target = dataset()
+        assert inputs.shape == (seq_len, batch_size, *corpus.ob.shape[1:])
+        assert target.shape == (seq_len, batch_size)
+        assert np.shares_memory(inputs, corpus.ob)
+        start = (i % dataset.num_batch) * seq_len
+        assert np.array_equal(inputs[:, 1], corpus.ob[stream_len + start : stream_len + start + seq_len])
+
+
+def test_corpus_of_padded_observations(tmp_path):
+    """The recorded ob shape is that of the observations written, e.g. with the env inputs of ScheduleEnvs."""
+    envs = [ngym.make(ENV, dt=100) for _ in range(3)]
+    env = ngym.wrappers.ScheduleEnvs(envs, SequentialSchedule(3), env_input=True)
+    env.reset()
+    write_corpus(tmp_path, env, 12, chunk_size=5)
+    corpus = Corpus(tmp_path)
+    assert corpus.ob.shape[1:] == env.observation_space.shape
+    assert corpus.ob.nbytes == (tmp_path / "ob.bin").stat().st_size
+    for i in range(len(corpus)):
+        ob, _ = corpus.trial(i)
+        assert np.all(ob[:, -3:].sum(axis=1) == 1)
@@ -1,9 +1,11 @@
 """Test Dataset for supervised learning."""
 
+import itertools
 import warnings
 
 import gymnasium as gym
 import numpy as np
+import pytest
 
 import neurogym as ngym
 
@@ -116,3 +118,149 @@ def test_examples_different_custom_env():
 
     env = TestEnv()
     _test_examples_different(env)
+
+
+@pytest.mark.parametrize("mode", [{"num_workers": 2}, {"prefetch": True}])
+def test_background_fill_matches_serial(mode):
+    """Dataset with worker processes or prefetching generates the same batches as without."""
+    kwargs = {"env_kwargs": {"dt": 100}, "batch_size": 5, "seq_len": 30, "cache_len": 60}
+    serial = ngym.Dataset("PerceptualDecisionMaking-v0", **kwargs)
+    serial.seed(0)
+    parallel = ngym.Dataset("PerceptualDecisionMaking-v0", **mode, **kwargs)
+    parallel.seed(0)
+    try:
+        for _ in range(7):
+            inputs, target = serial()
+            inputs_w, target_w = parallel()
+            assert np.array_equal(inputs, inputs_w)
+            assert np.array_equal(target, target_w)
+        assert parallel.num_refills == 3
+        assert parallel.stall_time >= 0
+    finally:
+        parallel.close()
+
+
+@pytest.mark.parametrize("mode", [{"num_workers": 2}, {"prefetch": True}])
+def test_background_fill_kwargs(mode):
+    """Trial kwargs apply from the next cache on, as without background fills."""
+    # The cache is rounded up to 60 steps, so every batch after the first one refills it
+    kwargs = {"env_kwargs": {"dt": 100}, "batch_size": 4, "seq_len": 30, "cache_len": 30}
+    dataset = ngym.Dataset("PerceptualDecisionMaking-v0", **mode, **kwargs)
+    try:
+        dataset()
+        for ground_truth in [0, 1, 1]:
+            _, target = dataset(ground_truth=ground_truth)
+            assert (target[target > 0] == ground_truth + 1).all()
+    finally:
+        dataset.close()
+
+
+def test_trial_info_marks_trials():
+    """trial_start and trial_id mark the trials of each batch element, without changing inputs and target."""
+    kwargs = {"env_kwargs": {"dt": 100}, "batch_size": 3, "seq_len": 30, "cache_len": 90}
+    dataset = ngym.Dataset("PerceptualDecisionMaking-v0", trial_info=True, **kwargs)
+    dataset.seed(0)
+    reference = ngym.Dataset("PerceptualDecisionMaking-v0", **kwargs)
+    reference.seed(0)
+    batches = [dataset() for _ in range(2)]
+    for (inputs, target, info), (ref_inputs, ref_target) in zip(batches, [reference() for _ in range(2)], strict=True):
+        assert np.array_equal(inputs, ref_inputs)
+        assert np.array_equal(target, ref_target)
+        assert info["mask"].all()
+    trial_start = np.concatenate([info["trial_start"] for _, _, info in batches])
+    trial_id = np.concatenate([info["trial_id"] for _, _, info in batches])
+    assert trial_start[0].all()
+    assert np.array_equal(trial_start[1:], np.diff(trial_id, axis=0) == 1)
+    assert np.array_equal(np.diff(trial_id, axis=0) >= 0, np.ones_like(trial_start[1:]))
+
+
+def test_inferred_seq_len():
+    """Without seq_len, sequences are as long as the longest trials, here all trials have the same length."""
+    dataset = ngym.Dataset("PerceptualDecisionMaking-v0", env_kwargs={"dt": 100}, batch_size=2)
+    env = ngym.make("PerceptualDecisionMaking-v0", dt=100)
+    env.reset()
+    assert dataset.seq_len == env.unwrapped.ob.shape[0]
+    assert dataset()[0].shape[0] == dataset.seq_len
+
+
+@pytest.mark.parametrize("batch_first", [False, True])
+def test_trial_mode(batch_first):
+    """In 'trial' mode, each batch element is a whole trial, batched with trials of similar length."""
+    batch_size, bucket_pool = 4, 5
+    dataset = ngym.Dataset(
+        "ReadySetGo-v0",
+        env_kwargs={"dt": 50},
+        batch_size=batch_size,
+        mode="trial",
+        bucket_pool=bucket_pool,
+        batch_first=batch_first,
+    )
+    dataset.seed(0)
+    batches = [dataset() for _ in range(bucket_pool)]
+    ids, max_lengths = [], []
+    for batch in batches:
+        inputs, target, info = batch
+        if not batch_first:
+            inputs, target = inputs.swapaxes(0, 1), target.swapaxes(0, 1)
+            info = {key: val.T for key, val in info.items()}
+        lengths = info["mask"].sum(axis=1)
+        assert inputs.shape[:2] == (batch_size, lengths.max())
+        assert np.array_equal(info["mask"], np.arange(inputs.shape[1]) < lengths[:, None])
+        assert not inputs[~info["mask"]].any()
+        assert not target[~info["mask"]].any()
+        assert info["trial_start"][:, 0].all()
+        assert not info["trial_start"][:, 1:].any()
+        ids.extend(info["trial_id"][:, 0])
+        max_lengths.append((lengths.min(), lengths.max()))
+    assert sorted(ids) == list(range(batch_size * bucket_pool))
+    # Batches hold trials of consecutive lengths
+    max_lengths.sort()
+    assert all(prev[1] <= cur[0] for prev, cur in itertools.pairwise(max_lengths))
+
+
+def test_cache_bytes_and_dtypes():
+    """The cache fits in cache_bytes, and inputs and target have the requested dtypes."""
+    kwargs = {"env_kwargs": {"dt": 100}, "batch_size": 4, "seq_len": 10}
+    dataset = ngym.Dataset("PerceptualDecisionMaking-v0", cache_bytes=2**16, **kwargs)
+    cache_bytes = sum(array.nbytes for array in dataset._cache_arrays)
+    # The cache length is rounded up to a multiple of seq_len, each step holds 3 float32 inputs and one int64 target
+    assert 2**16 < cache_bytes <= 2**16 + dataset.seq_len * dataset.batch_size * (3 * 4 + 8)
+
+    dataset = ngym.Dataset("PerceptualDecisionMaking-v0", inputs_dtype=np.float16, target_dtype=np.int32, **kwargs)
+    reference = ngym.Dataset("PerceptualDecisionMaking-v0", **kwargs)
+    dataset.seed(0)
+    reference.seed(0)
+    inputs, target = dataset()
+    ref_inputs, ref_target = reference()
+    assert inputs.dtype == np.float16
+    assert target.dtype == np.int32
+    assert np.array_equal(inputs, ref_inputs.astype(np.float16))
+    assert np.array_equal(target, ref_target)
+
+
+def test_cache_bytes_compact():
+    """The frame indices of a compact cache fit in cache_bytes, also when they are larger than the observations."""
+    kwargs = {"env_kwargs": {"dt": 100}, "batch_size": 4, "seq_len": 10, "inputs_dtype": np.float16}
+    dataset = ngym.Dataset("GoNogo-v0", cache_bytes=2**16, compact=True, **kwargs)
+    cache_bytes = sum(array.nbytes for array in dataset._cache_arrays)
+    # Each step holds one intp frame index and one int64 target
+    assert 2**16 < cache_bytes <= 2**16 + dataset.seq_len * dataset.batch_size * (np.dtype(np.intp).itemsize + 8)
+
+
+@pytest.mark.parametrize("mode", ["stream", "trial"])
+def test_compact_matches_dense(mode):
+    """Batches gathered from compact trials are the same as with dense trials."""
+    kwargs = {"env_kwargs": {"dt": 100}, "batch_size": 3, "seq_len": 20, "mode": mode, "bucket_pool": 2}
+    dataset = ngym.Dataset("GoNogo-v0", compact=True, **kwargs)
+    reference = ngym.Dataset("GoNogo-v0", **kwargs)
+    for data in (dataset, reference):
+        data.seed(0)
+    for _ in range(3):
+        for array, ref_array in zip(dataset(), reference(), strict=True):
+            if isinstance(array, dict):
+                array, ref_array = array["trial_id"], ref_array["trial_id"]  # noqa: PLW2901
+            assert np.array_equal(array, ref_array)
+    if mode == "stream":
+        # GoNogo trials have 3 distinct observations, over about 10 steps
+        assert len(dataset._frames) < dataset._cache_len * dataset.batch_size / 2
+        assert dataset._cache_arrays[0].dtype == np.intp
@@ -0,0 +1,45 @@
+"""Test that importing neurogym stays light."""
+
+import json
+import subprocess
+import sys
+
+# Generous budget in seconds, importing matplotlib and torch takes several seconds
+IMPORT_TIME_BUDGET = 2.0
+HEAVY_MODULES = ["matplotlib", "stable_baselines3", "torch", "psychopy"]
+
+
+def _run(code):
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)  # noqa: S603
+    return json.loads(result.stdout)
+
+
+def test_import_loads_no_heavy_modules():
+    code = (
+        "import json, sys, neurogym as ngym\n"
+        "import neurogym.wrappers.monitor\n"
+        "ngym.make('PerceptualDecisionMaking-v0')\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES} if m in sys.modules]))\n"
+    )
+    assert _run(code) == []
+
+
+def test_import_time():
+    code = (
+        "import json, time\n"
+        "start = time.perf_counter()\n"
+        "import neurogym\n"
+        "print(json.dumps(time.perf_counter() - start))\n"
+    )
+    # Best of a few runs to be robust to a busy machine
+    duration = min(_run(code) for _ in range(3))
+    assert duration < IMPORT_TIME_BUDGET
+
+
+def test_plot_env_is_loaded_on_first_use():
+    code = (
+        "import json, sys, neurogym as ngym\n"
+        "from neurogym.utils.plotting import plot_env\n"
+        "print(json.dumps([ngym.plot_env is plot_env, ngym.utils.plot_env is plot_env]))\n"
+    )
+    assert _run(code) == [True, True]
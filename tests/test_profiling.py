@@ -0,0 +1,54 @@
+import io
+
+import numpy as np
+
+import neurogym as ngym
+from neurogym.utils.profiling import print_flame, profile
+from neurogym.utils.scheduler import RandomSchedule
+from neurogym.wrappers import Noise, PassReward, ScheduleEnvs
+
+
+def _run(env, n_steps=200):
+    env.unwrapped.seed(0)
+    env.reset()
+    env.action_space.seed(0)
+    return np.array([env.step(env.action_space.sample())[0] for _ in range(n_steps)])
+
+
+def test_profile():
+    env = Noise(PassReward(ngym.make("PerceptualDecisionMaking-v0")))
+    expected = _run(env)
+    assert env.unwrapped.perf_stats() == {}
+
+    with profile(env):
+        obs = _run(env)
+    assert np.array_equal(obs, expected)
+    stats = env.unwrapped.perf_stats()
+    assert stats["Noise.step"]["calls"] == 201  # one step in reset
+    assert stats["PerceptualDecisionMaking._step"]["calls"] == 201
+    assert stats["PerceptualDecisionMaking._new_trial"]["calls"] == stats["PerceptualDecisionMaking.new_trial"]["calls"]
+    assert stats["PassReward.step"]["time"] <= stats["Noise.step"]["time"]
+    assert stats["Noise.step"]["self_time"] < stats["Noise.step"]["time"]
+
+    # The original methods are restored
+    for layer in [env, env.env, env.unwrapped]:
+        assert "step" not in vars(layer)
+    _run(env)
+    assert env.unwrapped.perf_stats()["Noise.step"]["calls"] == 201
+
+    stream = io.StringIO()
+    print_flame(env, file=stream)
+    lines = stream.getvalue().splitlines()
+    assert lines[0].endswith("  Noise.step")
+    assert any(line.endswith("  PassReward.step") for line in lines)
+
+
+def test_profile_schedule_envs():
+    envs = [ngym.make("PerceptualDecisionMaking-v0") for _ in range(3)]
+    env = ScheduleEnvs(envs, RandomSchedule(3), env_input=True)
+    with profile(env):
+        for _ in range(10):
+            env.new_trial()
+    stats = env.unwrapped.perf_stats()
+    assert stats["ScheduleEnvs.new_trial"]["calls"] == 10
+    assert stats["PerceptualDecisionMaking._new_trial"]["calls"] == 10
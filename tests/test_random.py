@@ -1,7 +1,9 @@
 import numpy as np
 
-from neurogym.utils.random import TruncExp
+import neurogym as ngym
+from neurogym.utils.random import TruncExp, make_rng, set_legacy_rng, spawn
 from neurogym.utils.scheduler import RandomBlockSchedule, RandomSchedule
+from neurogym.wrappers import Noise
 
 
 def test_truncexp():
@@ -32,3 +34,51 @@ def test_randomschedule():
     schedule.seed(0)
     b = [schedule() for i in range(1000)]
     assert (np.array(a) == np.array(b)).all(), "RandomBlockSchedule not reproducible"
+
+
+def test_set_trial_index():
+    env = ngym.make("PerceptualDecisionMaking-v0", sigma=1.0)
+    env.seed(0)
+    for _ in range(5):
+        env.new_trial()
+    ob, trial = env.ob.copy(), env.trial
+
+    env.seed(0)
+    env.set_trial_index(4)
+    env.new_trial()
+    assert np.array_equal(env.ob, ob)
+    assert env.trial == trial
+
+
+def test_set_trial_index_after_stepping_draws():
+    """Draws while stepping a trial, here by the Noise wrapper, do not change the next trials."""
+    env = Noise(ngym.make("PerceptualDecisionMaking-v0", sigma=1.0), std_noise=0.1)
+    task = env.unwrapped
+    task.seed(0)
+    env.reset()
+    while task.trial_index < 3:
+        env.step(env.action_space.sample())
+    ob, trial = task.ob.copy(), task.trial
+
+    reference = ngym.make("PerceptualDecisionMaking-v0", sigma=1.0).unwrapped
+    reference.seed(0)
+    reference.set_trial_index(2)
+    reference.new_trial()
+    assert np.array_equal(reference.ob, ob)
+    assert reference.trial == trial
+
+
+def test_spawn():
+    a, b = spawn(0, 2)
+    assert spawn(0, 2)[0].generate_state(4).tolist() == a.generate_state(4).tolist()
+    assert make_rng(a).random() != make_rng(b).random()
+
+
+def test_legacy_rng():
+    set_legacy_rng(True)
+    try:
+        assert isinstance(make_rng(0), np.random.RandomState)
+        assert spawn(3, 2) == [3, 3]
+    finally:
+        set_legacy_rng(False)
+    assert not isinstance(make_rng(0), np.random.RandomState)
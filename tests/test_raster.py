@@ -0,0 +1,67 @@
+import warnings
+
+import numpy as np
+import pytest
+
+import neurogym as ngym
+from neurogym.envs.psychopy import raster
+from neurogym.envs.registration import PSYCHOPY_ENVS
+
+
+@pytest.mark.parametrize("env_id", sorted(PSYCHOPY_ENVS))
+def test_numpy_backend(env_id):
+    """The psychopy envs run without psychopy, with reproducible image observations."""
+    obs = []
+    for _ in range(2):
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message=".*get variables from other wrappers is deprecated*")
+            env = ngym.make(env_id, backend="numpy")
+        env.unwrapped.seed(0)
+        ob, _ = env.reset()
+        assert env.observation_space.contains(ob)
+        for _ in range(10):
+            ob, *_ = env.step(env.action_space.sample())
+        obs.append(env.unwrapped.ob.copy())
+    assert np.array_equal(obs[0], obs[1])
+
+
+def test_line():
+    win = raster.Window(size=(20, 10), color="black")
+    frame = raster.Line(win, start=(-0.5, 0), end=(0.5, 0), lineWidth=2, lineColor="white").render()[0]
+    assert frame.shape == (10, 20, 3)
+    # Rows 4 and 5 are centered on y = 0, between columns 5 and 15
+    assert (frame[4:6, 5:15] == 255).all()
+    assert (frame[:3] == 0).all()
+    assert (frame[7:] == 0).all()
+    assert (frame[:, :4] == 0).all()
+
+
+def test_dots_move_coherently():
+    win = raster.Window(size=(100, 100))
+    dots = raster.DotStim(win, nDots=10, speed=0.01, dotLife=-1, coherence=1, dir=90, fieldSize=2)
+    xy = dots.positions(5, np.random.default_rng(0))
+    steps = np.diff(xy, axis=0)
+    moved = (np.abs(steps[..., 0]) < 1e-12) & np.isclose(steps[..., 1], 0.01)
+    # All dots move up by speed, except those replaced after leaving the field
+    assert moved.mean() > 0.9
+
+
+def test_frame_cache():
+    """Static stimuli with the same parameters are drawn once, within the byte budget of the cache."""
+    env = ngym.make("psychopy.VisualSearch-v0", backend="numpy").unwrapped
+    env.seed(0)
+    env.new_trial()
+    ob = env.ob.copy()
+    frame = raster.Line(env.win, start=(0, 0), end=(0.5, 0.5)).render()[0]
+    env.frame_cache.clear()
+    for _ in range(2):
+        env.add_ob(raster.Line(env.win, start=(0, 0), end=(0.5, 0.5)), "decision")
+    assert (env.frame_cache.hits, env.frame_cache.misses) == (1, 1)
+    decision = slice(env.start_ind["decision"], env.end_ind["decision"])
+    assert np.array_equal(env.ob[decision], ob[decision] + 2 * frame)
+
+    env.frame_cache.maxbytes = 2 * frame.nbytes
+    for end in [0.1, 0.2, 0.3]:
+        env.add_ob(raster.Line(env.win, start=(0, 0), end=(end, end)), "decision")
+    assert len(env.frame_cache) == 2
+    assert env.frame_cache.nbytes == 2 * frame.nbytes
@@ -0,0 +1,25 @@
+"""Test the static env registry manifest."""
+
+import subprocess
+import sys
+
+from neurogym.envs.registration import MANIFEST, _build_manifest
+
+
+def test_manifest_up_to_date():
+    """The checked-in manifest matches the env modules.
+
+    Regenerate it with neurogym.envs.registration.write_manifest() if this fails.
+    """
+    assert _build_manifest() == MANIFEST
+
+
+def test_import_loads_no_env_modules():
+    code = (
+        "import sys, neurogym as ngym\n"
+        "ngym.all_envs(tag='supervised')\n"
+        "loaded = [m for m in sys.modules if m.startswith('neurogym.envs.')]\n"
+        "print(sorted(set(loaded) - {'neurogym.envs.registration', 'neurogym.envs.collections'}))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)  # noqa: S603
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+import neurogym as ngym
+from neurogym.core import TrialBatch
+
+
+@pytest.mark.parametrize("env_name", ["PerceptualDecisionMaking-v0", "ContextDecisionMaking-v0", "DelayMatchSample-v0"])
+@pytest.mark.parametrize("abort", [False, True])
+def test_evaluate_matches_step(env_name, abort):
+    """Offline scores equal the rewards and performance of stepping through each trial."""
+    env = ngym.make(env_name, dt=50).unwrapped
+    env.abort = abort
+    env.seed(0)
+    env.reset()
+    env.t = env.t_ind = 0  # score from the first step, reset takes one
+    rng = np.random.default_rng(0)
+    n, t_max = 50, 200
+    actions = np.where(rng.random((n, t_max)) < 0.1, rng.integers(env.action_space.n, size=(n, t_max)), 0)
+
+    records, expected = [], []
+    for i in range(n):
+        periods = {p: (env.start_t[p], env.end_t[p]) for p in env._trial_periods}
+        records.append((env.ob.copy(), env.gt.copy(), env.trial, periods))
+        total = 0
+        for t, action in enumerate(actions[i]):
+            _, reward, _, _, info = env.step(action)
+            total += reward
+            if info["new_trial"]:
+                expected.append((total, info["performance"], t))
+                break
+    batch = TrialBatch.from_records(env, records)
+
+    scores = ngym.evaluate(env, actions.T, batch)
+    assert np.allclose(scores["reward"], [reward for reward, _, _ in expected])
+    assert np.array_equal(scores["performance"], [performance for _, performance, _ in expected])
+    assert np.array_equal(scores["end"], [end for _, _, end in expected])
+    assert not (scores["aborted"] & ~scores["broke_fixation"]).any()
+    assert scores["aborted"].any() == abort
+
+    # Model outputs, batch first
+    logits = np.eye(env.action_space.n)[actions]
+    assert np.array_equal(ngym.evaluate(env, logits, batch, batch_first=True)["reward"], scores["reward"])
+
+
+def test_evaluate_requires_reward_rule():
+    env = ngym.make("GoNogo-v0")
+    batch = env.unwrapped.new_trials(2)
+    with pytest.raises(ValueError, match="reward_rule"):
+        ngym.evaluate(env, np.zeros((batch.ob.shape[1], 2)), batch)
@@ -0,0 +1,58 @@
+"""Test the columnar storage and the Monitor stream backend."""
+
+import numpy as np
+import pytest
+
+import neurogym as ngym
+from neurogym.utils.storage import ColumnWriter, read_columns
+from neurogym.wrappers import Monitor
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_column_writer_roundtrip(tmp_path, compress):
+    path = tmp_path / "data.npy"
+    with ColumnWriter(path, flush_size=3, compress=compress) as writer:
+        for i in range(10):
+            record = {"int": i, "vec": np.arange(3) * i, "info": {"i": i}}
+            if i % 2:
+                record["odd"] = i
+            if i == 5:
+                record["int"] = 0.5  # promoted to float
+            writer.append(record)
+    data = read_columns(path)
+    assert np.allclose(data["int"], [0, 1, 2, 3, 4, 0.5, 6, 7, 8, 9])
+    assert data["vec"].shape == (10, 3)
+    assert [d["i"] for d in data["info"]] == list(range(10))
+    assert list(data["odd"]) == [1, 3, 5, 7, 9]
+    assert list(read_columns(path, keys=["odd"])) == ["odd"]
+
+
+def test_ragged_column_across_flushes(tmp_path):
+    """A column whose values change shape after a flush is read back as object rows."""
+    path = tmp_path / "data.npy"
+    with ColumnWriter(path, flush_size=2) as writer:
+        for i in range(5):
+            writer.append({"vec": np.arange(3) if i < 2 else np.arange(i)})
+    data = read_columns(path)
+    assert data["vec"].dtype == object
+    assert [len(vec) for vec in data["vec"]] == [3, 3, 2, 3, 4]
+    assert np.array_equal(data["vec"][4], np.arange(4))
+
+
+def test_monitor_stream(tmp_path, monkeypatch):
+    """The stream backend stores the same per-trial data as the npz backend."""
+    monkeypatch.chdir(tmp_path)
+    env = Monitor(ngym.make("PerceptualDecisionMaking-v0"), sv_per=7, storage="stream", flush_size=4)
+    env.reset()
+    actions, rewards = [], []
+    while env.num_tr < 20:
+        action = env.action_space.sample()
+        _, reward, _, _, info = env.step(action)
+        if info["new_trial"]:
+            actions.append(action)
+            rewards.append(reward)
+    env.close()
+    data = read_columns(env.writer.path)
+    assert np.array_equal(data["action"], actions)
+    assert np.array_equal(data["reward"], rewards)
+    assert len(data["trial"]) == 20
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+import neurogym as ngym
+from neurogym.utils.random import TruncExp, set_legacy_rng
+from neurogym.utils.timing import Choice, Constant, TruncatedExponential, Uniform, compile_timing
+
+
+@pytest.mark.parametrize(
+    ("timing", "sampler_type"),
+    [
+        (300, Constant),
+        ([100, 200, 300], Choice),
+        (("choice", [100, 200, 300]), Choice),
+        (("uniform", (100, 500)), Uniform),
+        (("truncated_exponential", (300, 100, 900)), TruncatedExponential),
+        (TruncExp(300, 100, 900), TruncatedExponential),
+        (("constant", 300), Constant),
+    ],
+)
+def test_sampler(timing, sampler_type):
+    """Samplers draw the same quantized duration for a trial, one by one or in blocks."""
+    sampler = compile_timing(timing, dt=20, seed=0)
+    assert isinstance(sampler, sampler_type)
+    block = sampler.sample(10, 50)
+    assert np.array_equal(block % 20, np.zeros(50))
+    assert np.array_equal(block[5:], sampler.sample(15, 45))
+    assert [sampler(trial) for trial in range(10, 60)] == block.tolist()
+    assert sampler(30) == block[20]  # seeking back
+
+
+def test_truncated_exponential_distribution():
+    sampler = TruncatedExponential(300, 100, 900, dt=1e-9, seed=0)
+    durations = sampler.sample(0, 100000)
+    assert durations.min() >= 100
+    assert durations.max() < 900
+    # Mean of the exponential of mean 300 shifted by 100 and truncated to [0, 800)
+    expected = 100 + 300 - 800 / np.expm1(800 / 300)
+    assert abs(durations.mean() - expected) < 3
+
+
+def test_uncompiled_timing():
+    assert compile_timing(lambda: 300, dt=20) is None
+    assert compile_timing(("until", 3000), dt=20) is None
+    set_legacy_rng(True)
+    try:
+        assert compile_timing(("uniform", (100, 500)), dt=20) is None
+    finally:
+        set_legacy_rng(False)
+
+
+def test_sample_times_match_sample_time():
+    """Durations of a batch of trials are those of the same trials generated one by one."""
+    env = ngym.make("ContextDecisionMaking-v0").unwrapped
+    env.seed(0)
+    durations = env.sample_times("delay", 20)
+    for duration in durations:
+        assert env.sample_time("delay") == duration
+        env.set_trial_index(env.trial_index + 1)
+
+
+def test_regenerate_last_trial():
+    """The trial just generated is generated again by set_trial_index, without reseeding."""
+    env = ngym.make("DelayMatchSample-v0", timing={"delay": ("uniform", (200, 2000))}).unwrapped
+    env.seed(0)
+    for _ in range(3):
+        env.new_trial()
+    delay, ob = env.end_t["delay"] - env.start_t["delay"], env.ob.copy()
+    env.set_trial_index(2)
+    env.new_trial()
+    assert env.end_t["delay"] - env.start_t["delay"] == delay
+    assert np.array_equal(env.ob, ob)
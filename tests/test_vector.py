@@ -0,0 +1,108 @@
+from multiprocessing import shared_memory
+
+import gymnasium as gym
+import numpy as np
+import pytest
+
+import neurogym as ngym
+from neurogym.vector import VectorTrialEnv
+
+ENV = "PerceptualDecisionMaking-v0"
+
+
+def test_fixate_until_timeout():
+    """Fixating throughout ends every trial at its length with no reward."""
+    venv = VectorTrialEnv(ENV, 4)
+    ob, _ = venv.reset(seed=0)
+    assert np.array_equal(ob, venv.ob[:, 0])
+    lengths = venv.tmax_ind.copy()
+    for t in range(lengths.max()):
+        ob, reward, _, _, info = venv.step(np.zeros(4, dtype=int))
+        assert np.all(reward == 0)
+        assert np.array_equal(info["new_trial"], lengths == t + 1)
+        assert np.array_equal(ob, venv.ob[np.arange(4), venv.t_ind])
+
+
+def test_correct_response():
+    """Responding with the ground truth in the decision period is rewarded."""
+    venv = VectorTrialEnv(ENV, 3)
+    venv.reset(seed=0)
+    start = np.argmax(venv.decision, axis=1)
+    gt = venv.gt[np.arange(3), start]
+    done = np.zeros(3, dtype=bool)
+    for t in range(start.max() + 1):
+        action = np.where(t == start, gt, 0)
+        _, reward, _, _, info = venv.step(action)
+        ended = t == start
+        assert np.allclose(reward[ended], venv.env.rewards["correct"])
+        if ended.any():
+            assert np.all(info["performance"][ended] == 1)
+        done |= ended
+    assert done.all()
+
+
+def test_requires_reward_rule():
+    env = ngym.make("GoNogo-v0")
+    with pytest.raises(ValueError, match="reward_rule"):
+        VectorTrialEnv(env, 2)
+
+
+def _seeded(seed):
+    def make_env():
+        env = ngym.make(ENV)
+        env.unwrapped.seed(seed)
+        return env
+
+    return make_env
+
+
+def test_shared_memory_matches_dummy():
+    """SharedMemoryTrialVecEnv steps envs as stable-baselines3's DummyVecEnv, with trials as episodes."""
+    vec_env = pytest.importorskip("stable_baselines3.common.vec_env")
+    from neurogym.vector import SharedMemoryTrialVecEnv  # noqa: PLC0415
+
+    env_fns = [_seeded(seed) for seed in range(3)]
+    shared = SharedMemoryTrialVecEnv(env_fns, envs_per_worker=2)
+    dummy = vec_env.DummyVecEnv(env_fns)
+    try:
+        assert np.array_equal(shared.reset(), dummy.reset())
+        rng = np.random.default_rng(0)
+        num_done = 0
+        for _ in range(100):
+            action = rng.integers(3, size=3) * (rng.random(3) < 0.1)
+            ob, reward, done, info = shared.step(action)
+            ref_ob, ref_reward, _, ref_info = dummy.step(action)
+            assert np.array_equal(ob, ref_ob)
+            assert np.allclose(reward, ref_reward)
+            new_trial = np.array([item["new_trial"] for item in ref_info])
+            assert np.array_equal(done, new_trial)
+            assert all(np.array_equal(item["gt"], ref["gt"]) for item, ref in zip(info, ref_info, strict=True))
+            assert all("terminal_observation" in info[i] for i in np.flatnonzero(done))
+            num_done += done.sum()
+        assert num_done > 0
+        assert shared.get_attr("dt") == [100, 100, 100]
+        assert shared.env_method("seed", 0, indices=[2]) == [[0]]
+    finally:
+        shared.close()
+
+
+class _FailingStep(gym.Wrapper):
+    def step(self, action):  # noqa: ARG002
+        msg = "step failed in the worker"
+        raise ValueError(msg)
+
+
+def test_shared_memory_worker_error():
+    """An error in a worker is raised in the parent with its traceback, and the shared memory is released."""
+    pytest.importorskip("stable_baselines3")
+    from neurogym.vector import SharedMemoryTrialVecEnv  # noqa: PLC0415
+
+    shared = SharedMemoryTrialVecEnv([lambda: _FailingStep(ngym.make(ENV)) for _ in range(2)])
+    names = [shm.name for shm in shared._shms]
+    shared.reset()
+    with pytest.raises(RuntimeError, match="step failed in the worker"):
+        shared.step(np.zeros(2, dtype=int))
+    assert shared.closed
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
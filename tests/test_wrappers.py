@@ -946,3 +946,22 @@ if __name__ == "__main__":
     #                                            num_steps=20000, verbose=True,
     #                                            probs=0.99, num_blocks=16,
     #                                            env_args=env_args)
+
+
+@pytest.mark.parametrize("block", [False, True])
+def test_noise(block):
+    """Noise adds Gaussian noise of std_noise to the observations, drawn per step or per trial."""
+    env = ngym.make("PerceptualDecisionMaking-v0", dt=100, sigma=0)
+    noisy = Noise(ngym.make("PerceptualDecisionMaking-v0", dt=100, sigma=0), std_noise=0.5, block=block)
+    env.unwrapped.seed(0)
+    noisy.unwrapped.seed(0)
+    env.reset()
+    noisy.reset()
+    diffs = []
+    for _ in range(2000):
+        ob, *_ = env.step(0)
+        noisy_ob, *_ = noisy.step(0)
+        assert noisy_ob.dtype == ob.dtype
+        diffs.append(noisy_ob - ob)
+    assert np.abs(np.std(diffs) - 0.5) < 0.02
+    assert np.abs(np.mean(diffs)) < 0.02
@@ -0,0 +1,108 @@
+import warnings
+
+import numpy as np
+import pytest
+
+import neurogym as ngym
+from neurogym.envs.collections import yang19
+from neurogym.utils.scheduler import RandomSchedule
+from neurogym.wrappers.block import ScheduleEnvs
+
+TASKS = ngym.get_collection("yang19")
+
+
+@pytest.mark.parametrize("modality", [0, 1])
+def test_reach_new_trials_match_new_trial(modality):
+    """Batched trials of a reach task match per-trial generation, in the columns of their modality."""
+    env = yang19.anti().envs[modality]
+    ground_truth = np.array([0, 3, 7, 15])
+    batch = env.new_trials(4, ground_truth=ground_truth)
+    stimulus = np.array(env.observation_space.name["stimulus"])
+    assert stimulus[0] == 1 + 16 * modality
+    for i in range(4):
+        env.new_trial(ground_truth=ground_truth[i])
+        task = env.unwrapped
+        assert batch.lengths[i] == task.ob.shape[0]
+        assert np.allclose(batch.ob[i, : batch.lengths[i]], task.ob)
+        assert (batch.gt[i, : batch.lengths[i]] == task.gt).all()
+
+
+@pytest.mark.parametrize("task", TASKS)
+def test_new_trials_ground_truth(task):
+    """Batched trials respond to the stimulus the task defines, from the trial info."""
+    env = yang19.__dict__[task.removeprefix("yang19.").removesuffix("-v0")]()
+    env = env.envs[0] if isinstance(env, ScheduleEnvs) else env
+    task_env = env.unwrapped
+    batch = env.new_trials(64)
+    decision = batch.period_mask("decision")
+    assert (batch.gt[~decision] == 0).all()
+    assert (batch.ob[decision, 0] == 0).all()
+    gt = batch.gt[np.arange(64), batch.lengths - 1] - 1
+    if isinstance(task_env, yang19._DMFamily):
+        # The target is one of the two stimulus directions
+        target = task_env.theta[gt]
+        assert np.all((target == batch.trials["theta1"]) | (target == batch.trials["theta2"]))
+    elif isinstance(task_env, yang19._DelayMatch1DResponse):
+        go = (batch.trials["ground_truth"] == "match") == task_env.matchgo
+        assert (gt[~go] == -1).all()
+        assert np.allclose(task_env.theta[gt[go]], batch.trials["test_theta"][go])
+    else:
+        assert (gt == batch.trials["ground_truth"]).all()
+
+
+@pytest.mark.parametrize("mode", ["stream", "trial"])
+@pytest.mark.parametrize("batch_first", [False, True])
+def test_mixed_task_dataset_layout(mode, batch_first):
+    """Batches have the layout of Dataset over ScheduleEnvs with env_input."""
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message=".*get variables from other wrappers is deprecated*")
+        envs = [ngym.make(task) for task in TASKS]
+        env = ScheduleEnvs(envs, RandomSchedule(len(envs)), env_input=True)
+        kwargs = {"batch_size": 8, "seq_len": 40, "mode": mode, "batch_first": batch_first, "trial_info": True}
+        expected = ngym.Dataset(env, **kwargs)()
+    dataset = yang19.MixedTaskDataset(seed=0, **kwargs)
+    assert dataset.observation_space.shape == env.observation_space.shape
+    inputs, target, info = dataset()
+    time_axis = 1 if batch_first else 0
+    arrays = [inputs, target, *info.values()]
+    expected_arrays = [*expected[:2], *expected[2].values()]
+    for array, expected_array in zip(arrays, expected_arrays, strict=True):
+        assert array.dtype == expected_array.dtype
+        shape = list(array.shape)
+        shape[time_axis] = expected_array.shape[time_axis]
+        assert tuple(shape) == expected_array.shape
+    assert list(info) == list(expected[2])
+
+
+def test_mixed_task_dataset_rule_inputs():
+    """Each trial has the rule input of its task, sampled from p."""
+    p = np.zeros(len(TASKS))
+    p[[3, 16]] = 0.5
+    dataset = yang19.MixedTaskDataset(p=p, batch_size=32, mode="trial", batch_first=True, seed=0)
+    inputs, target, info = dataset()
+    assert set(dataset.task_ids) == {3, 16}
+    rules = inputs[..., -len(TASKS) :]
+    assert (rules.sum(axis=-1) == info["mask"]).all()
+    assert (rules[np.arange(32), 0].argmax(axis=-1) == dataset.task_ids).all()
+    assert (target[~info["mask"]] == 0).all()
+
+    # In 'stream' mode, the trials of each batch element follow each other without padding
+    dataset = yang19.MixedTaskDataset(batch_size=4, seq_len=50, trial_info=True, seed=0)
+    for _ in range(5):
+        inputs, _, info = dataset()
+        rules = inputs[..., -len(TASKS) :]
+        assert (rules.sum(axis=-1) == 1).all()
+        new_rule = np.any(rules[1:] != rules[:-1], axis=-1)
+        new_id = info["trial_id"][1:] != info["trial_id"][:-1]
+        assert (new_id == info["trial_start"][1:]).all()
+        assert not (new_rule & ~new_id).any()
+
+
+def test_mixed_task_dataset_seed():
+    datasets = [yang19.MixedTaskDataset(batch_size=4, seq_len=30, seed=1) for _ in range(2)]
+    datasets[1]()
+    datasets[1].seed(1)
+    for _ in range(3):
+        inputs_0, _ = datasets[0]()
+        inputs_1, _ = datasets[1]()
+        assert np.array_equal(inputs_0, inputs_1)